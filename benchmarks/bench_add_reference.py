@@ -0,0 +1,117 @@
+"""Per-call overhead of functions decorated with add_reference.
+
+Compares an undecorated function with the current decorator and with the
+previous implementation, which looked up the source file and line of the
+decorated function with ``inspect`` on every tracked call.
+
+With tracking off, it compares an undecorated function with a wrapped one and
+with one decorated in zero overhead mode.
+
+Usage:
+    python -m benchmarks.bench_add_reference [--number N]
+"""
+import argparse
+import inspect
+import timeit
+
+import wrapt
+
+from r2t2 import BIBLIOGRAPHY, add_reference
+from r2t2.core import FunctionReference
+
+
+def legacy_add_reference(*, short_purpose: str, reference: str):
+    """add_reference as it was before the source location was cached."""
+
+    @wrapt.decorator(enabled=lambda: BIBLIOGRAPHY.track_references)
+    def wrapper(wrapped, instance, args, kwargs):
+        source = inspect.getsourcefile(wrapped)
+        line = inspect.getsourcelines(wrapped)[1]
+        identifier = f"{source}:{line}"
+
+        if (
+            identifier in BIBLIOGRAPHY
+            and reference in BIBLIOGRAPHY[identifier].references
+        ):
+            return wrapped(*args, **kwargs)
+
+        if identifier not in BIBLIOGRAPHY:
+            BIBLIOGRAPHY[identifier] = FunctionReference(
+                wrapped.__name__, line, source, [], []
+            )
+
+        # records are read as copies now, so it is stored again
+        record = BIBLIOGRAPHY[identifier]
+        record.short_purpose.append(short_purpose)
+        record.references.append(reference)
+        BIBLIOGRAPHY[identifier] = record
+
+        return wrapped(*args, **kwargs)
+
+    return wrapper
+
+
+def kernel(x):
+    return x + 1
+
+
+@legacy_add_reference(short_purpose="benchmark", reference="Legacy, 2020")
+def legacy_kernel(x):
+    return x + 1
+
+
+@add_reference(short_purpose="benchmark", reference="Cached, 2020")
+def cached_kernel(x):
+    return x + 1
+
+
+def zero_overhead_kernel():
+    BIBLIOGRAPHY.zero_overhead_mode()
+    try:
+
+        @add_reference(short_purpose="benchmark", reference="Zero overhead, 2020")
+        def kernel(x):
+            return x + 1
+
+    finally:
+        BIBLIOGRAPHY.zero_overhead_mode(False)
+    return kernel
+
+
+def per_call(func, number: int) -> float:
+    """Best of three runs, in microseconds per call."""
+    timer = timeit.Timer(lambda: func(1))
+    return min(timer.repeat(repeat=3, number=number)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    BIBLIOGRAPHY.tracking()
+    try:
+        tracked = {
+            "undecorated": per_call(kernel, args.number),
+            "legacy (inspect per call)": per_call(legacy_kernel, args.number),
+            "cached location": per_call(cached_kernel, args.number),
+        }
+    finally:
+        BIBLIOGRAPHY.tracking(False)
+        BIBLIOGRAPHY.clear()
+
+    untracked = {
+        "undecorated": per_call(kernel, args.number * 100),
+        "wrapped, disabled": per_call(cached_kernel, args.number * 100),
+        "zero overhead": per_call(zero_overhead_kernel(), args.number * 100),
+    }
+
+    for title, results in (("Tracking", tracked), ("Not tracking", untracked)):
+        print(title)
+        baseline = results["undecorated"]
+        for name, value in results.items():
+            print(f"  {name:<28} {value:10.3f} us/call  (+{value - baseline:.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Memory taken by the records of a bibliography, measured with tracemalloc.
+
+Builds the same records as a plain dict of FunctionReference with their index of
+references, as the bibliography used to store them, and as a Biblio, which
+stores every string once and each record as an array of ids. The records come
+from a synthetic scan: the source file is shared by the records of a file, and
+the short purposes and references are new strings every time, as when parsed.
+
+Usage:
+    python -m benchmarks.bench_memory [--records N] [--references N]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator
+
+from r2t2.core import Biblio, FunctionReference, function_identifier
+from r2t2.docstring_reference_parser import DOCSTRING_SHORT_PURPOSE
+
+
+RECORDS_PER_FILE = 5
+
+PURPOSES = [f"Algorithm number {index} of the paper" for index in range(50)]
+
+
+def _copy(text: str) -> str:
+    """A new string equal to `text`, like those returned by the parsers."""
+    return (text + " ")[:-1]
+
+
+def generate_records(
+    count: int, references: int, seed: int = 0
+) -> Iterator[FunctionReference]:
+    """Yields records like those of a static scan including docstrings."""
+    rng = random.Random(seed)
+    dois = [
+        f"https://doi.org/10.{1000 + index % 9000}/r2t2.{index}"
+        for index in range(references)
+    ]
+    source = ""
+    for index in range(count):
+        if not index % RECORDS_PER_FILE:
+            source = f"/home/user/project/src/package_{index // 500}/module_{index}.py"
+        if rng.random() < 0.6:
+            short = DOCSTRING_SHORT_PURPOSE
+        else:
+            short = _copy(rng.choice(PURPOSES))
+        cited = [_copy(rng.choice(dois)) for _ in range(rng.choice((1, 1, 2)))]
+        yield FunctionReference(
+            f"function_{index}", index % 1000 + 1, source, [short] * len(cited), cited
+        )
+
+
+def legacy_bibliography(records: Iterator[FunctionReference]) -> Dict:
+    """The records as they used to be stored: lists in named tuples, and the index."""
+    biblio: Dict[str, FunctionReference] = {}
+    citations: Dict[str, Dict[str, None]] = {}
+    for record in records:
+        identifier = function_identifier(record.source, record.name, record.line)
+        stored = biblio.get(identifier)
+        if stored is None:
+            stored = biblio[identifier] = FunctionReference(
+                record.name, record.line, record.source, [], []
+            )
+        for short, ref in zip(record.short_purpose, record.references):
+            citing = citations.setdefault(ref, {})
+            if identifier not in citing:
+                citing[identifier] = None
+                stored.short_purpose.append(short)
+                stored.references.append(ref)
+    return dict(records=biblio, citations=citations)
+
+
+def compact_bibliography(records: Iterator[FunctionReference]) -> Biblio:
+    biblio = Biblio()
+    for record in records:
+        biblio.add(record)
+    return biblio
+
+
+def measure(build: Callable, count: int, references: int):
+    """Bytes taken by what `build` returns, and seconds taken to build it."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build(generate_records(count, references))
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del built
+
+    start = time.perf_counter()
+    built = build(generate_records(count, references))
+    seconds = time.perf_counter() - start
+    return built, size, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--references", type=int, default=5000)
+    args = parser.parse_args()
+
+    legacy, legacy_size, legacy_seconds = measure(
+        legacy_bibliography, args.records, args.references
+    )
+    compact, compact_size, compact_seconds = measure(
+        compact_bibliography, args.records, args.references
+    )
+
+    start = time.perf_counter()
+    for record in legacy["records"].values():
+        pass
+    legacy_read = time.perf_counter() - start
+    start = time.perf_counter()
+    for record in compact.values():
+        pass
+    compact_read = time.perf_counter() - start
+
+    print(f"{args.records} records citing {args.references} references")
+    for name, size, seconds, read in [
+        ("named tuples", legacy_size, legacy_seconds, legacy_read),
+        ("compact", compact_size, compact_seconds, compact_read),
+    ]:
+        print(
+            f"  {name:<14} {size / 2 ** 20:8.1f} MiB"
+            f"  {size / args.records:6.0f} B/record"
+            f"  build {seconds:6.2f} s  read all {read:6.2f} s"
+        )
+    print(f"  memory saved: {1 - compact_size / legacy_size:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Parsing of docstrings with the combined scanner against one search per kind.
+
+Usage:
+    python -m benchmarks.bench_plain_text [--texts N] [--repeat R]
+"""
+import argparse
+import random
+import time
+from typing import Callable, Iterable, List
+
+from r2t2.plain_text_parser import (
+    iter_doi,
+    iter_doxygen_reference_names,
+    iter_latex_reference_names,
+    iter_sphinx_reference_names,
+    parse_plain_text_references,
+    parse_plain_text_references_batch,
+)
+
+CITED = (
+    "Implements the method of :cite:`Author{index}` and 10.5281/zenodo.{index:07d}.\n"
+    "\n"
+    "See also \\cite{{Other{index}, Another{index}}} and \\cite Doxygen{index}.\n"
+)
+PLAIN = "Nothing to cite here, only a description of function {index}.\n" * 3
+
+
+def chained(text: str) -> List[str]:
+    """The former parser: one search for each kind in turn."""
+    references = list(iter_doi(text))
+    for raw_reference in list(iter_sphinx_reference_names(text)) + list(
+        iter_latex_reference_names(text)
+    ):
+        references.extend(name.strip() for name in raw_reference.split(","))
+    references.extend(iter_doxygen_reference_names(text))
+    return references
+
+
+def generate_texts(count: int, cited_share: float, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        (CITED if rng.random() < cited_share else PLAIN).format(index=i)
+        for i in range(count)
+    ]
+
+
+def best_of(repeat: int, func: Callable[[List[str]], Iterable]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(TEXTS)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+TEXTS: List[str] = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pathological = {
+        "unclosed LaTeX": "\\cite{" * 20000,
+        "unclosed Sphinx": ":cite:`a`" + ":cite:`" * 20000,
+    }
+    for cited_share in (0.2, 1.0):
+        TEXTS[:] = generate_texts(args.texts, cited_share)
+        expected = [chained(text) for text in TEXTS]
+        assert [parse_plain_text_references(t) for t in TEXTS] == expected
+        assert parse_plain_text_references_batch(TEXTS) == expected
+
+        print(f"{args.texts} docstrings, {cited_share:.0%} with citations:")
+        for name, func in [
+            ("one search per kind", lambda texts: [chained(t) for t in texts]),
+            ("combined scanner", lambda texts: [
+                parse_plain_text_references(t) for t in texts
+            ]),
+            ("batch", parse_plain_text_references_batch),
+        ]:
+            print(f"  {name:20s} {best_of(args.repeat, func):8.3f} s")
+
+    for name, text in pathological.items():
+        TEXTS[:] = [text]
+        print(f"{name}, {len(text)} characters:")
+        for label, func in [
+            ("one search per kind", lambda texts: chained(texts[0])),
+            ("combined scanner", lambda texts: parse_plain_text_references(texts[0])),
+        ]:
+            print(f"  {label:20s} {best_of(1, func):8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Share of files skipped by the byte-level prefilter, and the time it saves.
+
+Times ``r2t2 static --docstring`` on a synthetic tree with and without the
+prefilter, in a single process.
+
+Usage:
+    python -m benchmarks.bench_prefilter [--files N] [--referenced-share S]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from r2t2 import BIBLIOGRAPHY, static_parser
+from r2t2.prefilter import may_contain_references
+from r2t2.static_parser import locate_references
+
+from .synthetic import generate_tree
+
+
+def static_analysis(root: str) -> float:
+    """Seconds taken by the static analysis, including docstrings."""
+    BIBLIOGRAPHY.clear()
+    start = time.perf_counter()
+    locate_references(root, docstring=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--referenced-share", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(root, args.files, referenced_share=args.referenced_share)
+        filenames = sorted(Path(root).rglob("*.py"))
+
+        start = time.perf_counter()
+        skipped = sum(
+            not may_contain_references(name, docstrings=True) for name in filenames
+        )
+        search = time.perf_counter() - start
+
+        static_analysis(root)  # warm up the file system cache
+        with mock.patch.object(
+            static_parser, "may_contain_references", return_value=True
+        ):
+            without = static_analysis(root)
+        records = len(BIBLIOGRAPHY)
+        with_prefilter = static_analysis(root)
+        assert len(BIBLIOGRAPHY) == records
+
+    print(f"files skipped:     {skipped} / {len(filenames)}"
+          f" ({100 * skipped / len(filenames):.1f} %)")
+    print(f"search alone:      {search:8.3f} s")
+    print(f"without prefilter: {without:8.3f} s  ({records} records)")
+    print(f"with prefilter:    {with_prefilter:8.3f} s"
+          f"  saving {without - with_prefilter:.3f} s"
+          f" ({100 * (1 - with_prefilter / without):.1f} %)")
+    BIBLIOGRAPHY.clear()
+
+
+if __name__ == "__main__":
+    main()
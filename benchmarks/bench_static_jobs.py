@@ -0,0 +1,46 @@
+"""Scaling of the static analysis with the number of worker processes.
+
+Times ``r2t2 static --docstring`` on a synthetic tree for 1, 2, 4 and 8 jobs.
+
+Usage:
+    python -m benchmarks.bench_static_jobs [--files N]
+"""
+import argparse
+import tempfile
+import time
+
+from r2t2 import BIBLIOGRAPHY
+from r2t2.static_parser import locate_references
+
+from .synthetic import generate_tree
+
+
+def static_analysis(root: str, jobs: int) -> float:
+    """Seconds taken by the static analysis, including docstrings."""
+    BIBLIOGRAPHY.clear()
+    start = time.perf_counter()
+    locate_references(root, jobs=jobs, docstring=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(root, args.files)
+        static_analysis(root, 1)  # warm up the file system cache
+        serial = None
+        for jobs in (1, 2, 4, 8):
+            elapsed = static_analysis(root, jobs)
+            serial = serial or elapsed
+            print(
+                f"{jobs} jobs: {elapsed:8.3f} s  "
+                f"speed-up {serial / elapsed:5.2f}  ({len(BIBLIOGRAPHY)} records)"
+            )
+    BIBLIOGRAPHY.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Latency of static --watch after editing one file of a large synthetic tree.
+
+Each edit moves the objects of a file down a line, so all its records change,
+then times how long it takes to notice it, update the bibliography and write the
+markdown output again, against analysing the whole tree again.
+
+Usage:
+    python -m benchmarks.bench_watch [--files N] [--edits N] [--polling]
+"""
+import argparse
+import gc
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from r2t2.core import Biblio
+from r2t2.docstring_reference_parser import expand_file_list
+from r2t2.static_parser import IncrementalScan
+from r2t2.watcher import InotifyWatcher, PollingWatcher
+from r2t2.writers import markdown
+
+from .synthetic import generate_tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--edits", type=int, default=20)
+    parser.add_argument("--polling", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(root, args.files, notebooks=0)
+        files = expand_file_list(root)
+        output = Path(root) / "references"
+        if args.polling:
+            watcher = PollingWatcher(root, interval=0.05)
+        else:
+            watcher = InotifyWatcher(root)
+
+        biblio = Biblio()
+        scan = IncrementalScan(root, docstring=True, biblio=biblio)
+        start = time.perf_counter()
+        scan.scan()
+        markdown(output, biblio)
+        full = time.perf_counter() - start
+        # as static --watch does
+        gc.freeze()
+
+        latencies = []
+        for index in range(args.edits):
+            edited = files[index * len(files) // args.edits]
+            text = "\n" + edited.read_text()
+            started = []
+
+            def edit():
+                started.append(time.perf_counter())
+                edited.write_text(text)
+
+            threading.Timer(0.02, edit).start()
+            changed = watcher.wait(timeout=5)
+            scan.update(changed)
+            markdown(output, biblio)
+            latencies.append(time.perf_counter() - started[0])
+        watcher.close()
+
+    print(f"{args.files} files, {len(biblio)} records")
+    print(f"  full analysis and output: {full * 1000:8.1f} ms")
+    print(
+        f"  one-file edit, {'polling' if args.polling else 'inotify'}:"
+        f" median {statistics.median(latencies) * 1000:6.1f} ms,"
+        f" max {max(latencies) * 1000:6.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Benchmark suite on synthetic trees, with results saved as JSON.
+
+For each size of tree, it times the static analysis with and without
+docstrings, the docstring pipeline, the notebooks, the writers and the loading
+of snapshots. It also times the plain text parser and the per-call overhead of
+add_reference, with and without tracking.
+
+The results can be compared with those of a previous run, e.g. of the last
+release, to catch regressions: the exit status is 1 if some benchmark is
+slower than the baseline by more than the tolerance.
+
+Usage:
+    python -m benchmarks.suite [--sizes 100 10000 100000] [--output FILE]
+        [--baseline FILE] [--tolerance T]
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import r2t2
+from r2t2 import BIBLIOGRAPHY
+from r2t2.core import Biblio
+from r2t2.docstring_reference_parser import (
+    expand_file_list,
+    parse_and_add_docstring_references_from_files,
+)
+from r2t2.plain_text_parser import (
+    parse_plain_text_references,
+    parse_plain_text_references_batch,
+)
+from r2t2.static_parser import locate_references
+from r2t2.writers import csv_table, jsonl, markdown, snapshot, terminal
+
+from . import bench_add_reference
+from .bench_plain_text import generate_texts
+from .synthetic import generate_tree
+
+
+def timed(func: Callable[[], object], repeat: int = 3) -> float:
+    """Best time of a few runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def result(name: str, seconds: float, items: int, unit: str, **params) -> Dict:
+    return dict(
+        name=name,
+        params=params,
+        seconds=seconds,
+        items=items,
+        unit=unit,
+        throughput=items / seconds if seconds else None,
+    )
+
+
+def static_analysis(**kwargs) -> Callable[[], object]:
+    def run():
+        BIBLIOGRAPHY.clear()
+        locate_references(**kwargs)
+
+    return run
+
+
+def bench_tree(files: int, repeat: int) -> List[Dict]:
+    """Times the analysis of a tree of `files` Python files and a few notebooks."""
+    notebooks = max(1, files // 100)
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(root, files, notebooks=notebooks)
+        python_files = expand_file_list(root)
+        params = dict(files=files)
+
+        for name, kwargs in [
+            ("locate_references", {}),
+            ("locate_references_docstrings", dict(docstring=True)),
+        ]:
+            seconds = timed(static_analysis(path=root, **kwargs), repeat)
+            results.append(result(name, seconds, files, "files", **params))
+
+        seconds = timed(
+            lambda: parse_and_add_docstring_references_from_files(
+                python_files, biblio=Biblio()
+            ),
+            repeat,
+        )
+        results.append(result("docstring_pipeline", seconds, files, "files", **params))
+
+        seconds = timed(static_analysis(path=root, notebook=True), repeat)
+        results.append(
+            result("notebooks", seconds, notebooks, "notebooks", notebooks=notebooks)
+        )
+
+        # the writers are timed on the references of the Python files
+        static_analysis(path=root, docstring=True)()
+        records = len(BIBLIOGRAPHY)
+        for name, writer in [
+            ("writer_markdown", markdown),
+            ("writer_jsonl", jsonl),
+            ("writer_csv", csv_table),
+            ("writer_snapshot", snapshot),
+        ]:
+            seconds = timed(
+                lambda: writer(Path(root) / "references", BIBLIOGRAPHY), repeat
+            )
+            results.append(result(name, seconds, records, "records", **params))
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            seconds = timed(lambda: terminal(None, BIBLIOGRAPHY), repeat)
+        results.append(result("writer_terminal", seconds, records, "records", **params))
+        seconds = timed(
+            lambda: Biblio().load(Path(root) / "references.r2t2"), repeat
+        )
+        results.append(result("load_snapshot", seconds, records, "records", **params))
+        BIBLIOGRAPHY.clear()
+    return results
+
+
+def bench_plain_text(texts: int, repeat: int) -> List[Dict]:
+    docstrings = generate_texts(texts, cited_share=0.2)
+    return [
+        result(
+            "plain_text",
+            timed(lambda: [parse_plain_text_references(t) for t in docstrings], repeat),
+            texts,
+            "texts",
+            texts=texts,
+        ),
+        result(
+            "plain_text_batch",
+            timed(lambda: parse_plain_text_references_batch(docstrings), repeat),
+            texts,
+            "texts",
+            texts=texts,
+        ),
+    ]
+
+
+def bench_add_reference_calls(number: int) -> List[Dict]:
+    per_call = bench_add_reference.per_call
+    results = []
+    BIBLIOGRAPHY.tracking()
+    try:
+        for name, func in [
+            ("call_undecorated_tracked", bench_add_reference.kernel),
+            ("call_add_reference_tracked", bench_add_reference.cached_kernel),
+        ]:
+            seconds = per_call(func, number) * 1e-6
+            results.append(result(name, seconds, 1, "calls"))
+    finally:
+        BIBLIOGRAPHY.tracking(False)
+        BIBLIOGRAPHY.clear()
+    for name, func in [
+        ("call_undecorated", bench_add_reference.kernel),
+        ("call_add_reference_untracked", bench_add_reference.cached_kernel),
+        ("call_zero_overhead", bench_add_reference.zero_overhead_kernel()),
+    ]:
+        seconds = per_call(func, number * 100) * 1e-6
+        results.append(result(name, seconds, 1, "calls"))
+    return results
+
+
+def key(entry: Dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(entry["params"].items()))
+    return f"{entry['name']}[{params}]"
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> bool:
+    """Prints the ratio of each time to the baseline. False if any regressed."""
+    previous = {key(entry): entry["seconds"] for entry in baseline}
+    ok = True
+    for entry in results:
+        before = previous.get(key(entry))
+        if not before:
+            continue
+        ratio = entry["seconds"] / before
+        regressed = ratio > tolerance
+        ok = ok and not regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{key(entry):<55} {ratio:6.2f}x baseline{flag}")
+    return ok
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000])
+    parser.add_argument("--texts", type=int, default=100000)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=1.2)
+    args = parser.parse_args(argv)
+
+    results = []
+    for files in args.sizes:
+        results.extend(bench_tree(files, args.repeat))
+    results.extend(bench_plain_text(args.texts, args.repeat))
+    results.extend(bench_add_reference_calls(args.calls))
+
+    for entry in results:
+        print(
+            f"{key(entry):<55} {entry['seconds']:12.4g} s"
+            f"  {entry['throughput'] or 0:14.1f} {entry['unit']}/s"
+        )
+
+    Path(args.output).write_text(json.dumps(
+        dict(
+            r2t2=r2t2.__version__,
+            python=platform.python_version(),
+            platform=platform.platform(),
+            cpus=os.cpu_count(),
+            date=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            results=results,
+        ),
+        indent=2,
+    ))
+
+    if args.baseline is not None:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        if not compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
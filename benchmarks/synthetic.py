@@ -0,0 +1,161 @@
+"""Generator of synthetic source trees for the benchmarks.
+
+Usage:
+    python -m benchmarks.synthetic OUTPUT [--files N] [--notebooks N] [--seed S]
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Union
+
+DECORATED = '''
+@add_reference(short_purpose="Algorithm {index}", reference="Author {index}, 2020")
+def decorated_{index}(x):
+    return x + {index}
+'''
+
+CITED = '''
+def cited_{index}(x):
+    """Implements the method of :cite:`Author{index}` and 10.5281/zenodo.{index:07d}.
+
+    See also \\\\cite{{Other{index}, Another{index}}}.
+    """
+    return x * {index}
+'''
+
+PLAIN = '''
+def plain_{index}(x):
+    """Nothing to cite here."""
+    return x - {index}
+'''
+
+
+NOTEBOOK_CITED = [
+    "## Method {index}\n",
+    "\n",
+    "Following :cite:`Author{index}` and doi:10.5281/zenodo.{index:07d}.\n",
+]
+
+NOTEBOOK_PLAIN = ["Some explanation of step {index}.\n"]
+
+# a small PNG, repeated to make outputs much larger than the markdown cells
+IMAGE = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA"
+
+
+def generate_notebook(
+    path: Union[str, Path],
+    cells: int,
+    cited_share: float,
+    output_size: int,
+    rng: random.Random,
+) -> None:
+    """Writes a notebook alternating markdown cells and code cells with outputs."""
+    content = []
+    for i in range(cells):
+        template = NOTEBOOK_CITED if rng.random() < cited_share else NOTEBOOK_PLAIN
+        content.append({
+            "cell_type": "markdown",
+            "metadata": {},
+            "source": [line.format(index=i) for line in template],
+        })
+        content.append({
+            "cell_type": "code",
+            "execution_count": i,
+            "metadata": {},
+            "outputs": [{
+                "data": {"image/png": IMAGE * (output_size // len(IMAGE) + 1)},
+                "metadata": {},
+                "output_type": "display_data",
+            }],
+            "source": [f"plot({i})"],
+        })
+    notebook = {"cells": content, "metadata": {}, "nbformat": 4, "nbformat_minor": 4}
+    Path(path).write_text(json.dumps(notebook, indent=1))
+
+
+def generate_tree(
+    root: Union[str, Path],
+    files: int,
+    functions_per_file: int = 10,
+    referenced_share: float = 0.2,
+    seed: int = 0,
+    decorated_share: float = 1 / 3,
+    cited_share: float = 1 / 3,
+    notebooks: int = 0,
+    cells_per_notebook: int = 20,
+    output_size: int = 10000,
+) -> Path:
+    """Writes a tree of Python files with a share of referenced functions.
+
+    Args:
+        root (str, Path): Folder to create the tree in.
+        files (int): Number of Python files.
+        functions_per_file (int): Number of functions in each file.
+        referenced_share (float): Share of files with decorated functions or
+            docstring citations. The other files have no references at all.
+        seed (int): Seed of the random generator, for reproducible trees.
+        decorated_share (float): Share of the functions of referenced files
+            that are decorated with add_reference.
+        cited_share (float): Share of the functions of referenced files with
+            citations in their docstrings, and of the markdown cells with
+            citations in the notebooks.
+        notebooks (int): Number of Jupyter notebooks.
+        cells_per_notebook (int): Number of markdown cells in each notebook,
+            each followed by a code cell.
+        output_size (int): Size of the output of each code cell, in bytes.
+
+    Returns:
+        The root of the tree.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    for i in range(files):
+        folder = root / f"package_{i // 100}"
+        folder.mkdir(parents=True, exist_ok=True)
+        referenced = rng.random() < referenced_share
+        parts = ["from r2t2 import add_reference\n" if referenced else ""]
+        for j in range(functions_per_file):
+            index = i * functions_per_file + j
+            template = PLAIN
+            if referenced:
+                draw = rng.random()
+                if draw < decorated_share:
+                    template = DECORATED
+                elif draw < decorated_share + cited_share:
+                    template = CITED
+            parts.append(template.format(index=index))
+        (folder / f"module_{i}.py").write_text("\n".join(parts))
+
+    for i in range(notebooks):
+        folder = root / f"notebooks_{i // 100}"
+        folder.mkdir(parents=True, exist_ok=True)
+        generate_notebook(
+            folder / f"notebook_{i}.ipynb",
+            cells_per_notebook,
+            cited_share,
+            output_size,
+            rng,
+        )
+    return root
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--notebooks", type=int, default=0)
+    parser.add_argument("--referenced-share", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_tree(
+        args.output,
+        args.files,
+        referenced_share=args.referenced_share,
+        seed=args.seed,
+        notebooks=args.notebooks,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,16 @@
-from .core import add_reference, BIBLIOGRAPHY  # noqa:  F401
+import sys
 
 __version__ = "0.3.1"
+
+if sys.version_info < (3, 7):
+    from .core import add_reference, BIBLIOGRAPHY  # noqa:  F401
+else:
+
+    def __getattr__(name):
+        # the CLI imports submodules of the package, most of which need not load
+        # the core, so it is only imported once its names are used
+        if name in ("add_reference", "BIBLIOGRAPHY"):
+            from . import core
+
+            return getattr(core, name)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,23 +1,29 @@
 import argparse
+import gc
 import logging
 import os
+import signal
+import sys
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
 
-from .static_parser import locate_references
-from .runtime_tracker import runtime_tracker
+from .client import default_socket_path, send_request
+from .core import BIBLIOGRAPHY
+from .scan_cache import DEFAULT_CACHE_DIR
 from .writers import REGISTERED_WRITERS
-from .docstring_reference_parser import (
-    expand_file_list,
-    parse_and_add_docstring_references_from_files
-)
+
+# each sub command imports the modules it runs, so that the others, e.g. the
+# DOI resolver and its network stack, do not slow down the start of the rest
 
 
 LOGGER = logging.getLogger(__name__)
 
 
 class SubCommand(ABC):
+    writes_output = True
+    """Whether the bibliography is written out after the sub command runs."""
+
     def __init__(self, name, description):
         self.name = name
         self.description = description
@@ -27,8 +33,22 @@ class SubCommand(ABC):
         pass
 
     @abstractmethod
-    def run(self, args: argparse.Namespace):
-        pass
+    def run(self, args: argparse.Namespace) -> Optional[List[Path]]:
+        """Runs the sub command.
+
+        Returns:
+            The files analysed, if any. Their records replace those in the
+            database given with --db.
+        """
+
+    def refresh(self, args: argparse.Namespace) -> Iterator[List[Path]]:
+        """Updates the bibliography whenever the target changes, if supported.
+
+        Returns:
+            An iterator giving the files analysed again after each change. The
+            output is written again after each one.
+        """
+        return iter(())
 
 
 def add_common_arguments(parser: argparse.ArgumentParser):
@@ -53,6 +73,42 @@ def add_common_arguments(parser: argparse.ArgumentParser):
         help="File to save the references into. Ignored if format is 'Terminal'."
         " Default: [target folder]/references.",
     )
+    parser.add_argument(
+        "--bib",
+        action="append",
+        default=[],
+        help="BibTeX file in which to look up the citation keys, to show their"
+        " entries. Can be given several times.",
+    )
+    parser.add_argument(
+        "--resolve-doi",
+        action="store_true",
+        help="Show the title, authors and year of the DOI references, fetched"
+        " once and kept in a cache.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="With --resolve-doi, only use the DOIs already in the cache.",
+    )
+    parser.add_argument(
+        "--doi-endpoint",
+        default=None,
+        help="Resolver of the DOIs. Default: https://doi.org.",
+    )
+    parser.add_argument(
+        "--doi-cache",
+        default=None,
+        help="SQLite cache of the DOIs. Default: r2t2/doi.sqlite in the user"
+        " cache folder.",
+    )
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="SQLite database to also store the references in, to query them"
+        " later with r2t2 query. The records of the files analysed again replace"
+        " those already there, and those found at runtime are added.",
+    )
     parser.add_argument(
         "--debug",
         action="store_true",
@@ -60,6 +116,21 @@ def add_common_arguments(parser: argparse.ArgumentParser):
     )
 
 
+def shard(value: str) -> Tuple[int, int]:
+    """Parses a shard given as i/n, the i-th of n, counting from 1."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"shard must be given as i/n, e.g. 1/4, not {value!r}"
+        ) from None
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(
+            f"shard {value} must be between 1/{count} and {count}/{count}"
+        )
+    return index, count
+
+
 class RunSubCommand(SubCommand):
     def __init__(self):
         super().__init__("run", "Run script and use runtime tracking")
@@ -72,6 +143,25 @@ class RunSubCommand(SubCommand):
             help="This is run as a script and the references provided are those"
             " found at runtime.",
         )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Also count the calls of the referenced objects and the wall and"
+            " CPU time spent in them.",
+        )
+        parser.add_argument(
+            "--docstring",
+            action="store_true",
+            help="Also track the functions citing references in their docstrings.",
+        )
+        parser.add_argument(
+            "--docstring-path",
+            action="append",
+            default=[],
+            help="File or folder in which to look for the functions citing"
+            " references in their docstrings. Can be given several times."
+            " Default: the folder of the target.",
+        )
         parser.add_argument(
             "args",
             nargs=argparse.REMAINDER,
@@ -79,7 +169,15 @@ class RunSubCommand(SubCommand):
         )
 
     def run(self, args: argparse.Namespace):
-        runtime_tracker(args.target, args.args, encoding=args.encoding)
+        from .runtime_tracker import runtime_tracker
+
+        runtime_tracker(
+            args.target,
+            args.args,
+            encoding=args.encoding,
+            profile=args.profile,
+            docstring_paths=args.docstring_path if args.docstring else None,
+        )
 
 
 class StaticSubCommand(SubCommand):
@@ -96,7 +194,48 @@ class StaticSubCommand(SubCommand):
         parser.add_argument(
             "--notebook",
             action="store_true",
-            help="Parse markdown cells from Jupyter notebooks.",
+            help="Parse the markdown cells of a Jupyter notebook, or of all the"
+            " notebooks in the target folder.",
+        )
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            default=None,
+            type=int,
+            help="Number of processes used to parse the files. Default: 1, or the"
+            " number of CPUs for a folder of notebooks.",
+        )
+        parser.add_argument(
+            "--cache",
+            nargs="?",
+            const=DEFAULT_CACHE_DIR,
+            default=None,
+            type=str,
+            help="Keep the results in this folder to only parse the files that"
+            f" changed in the next runs. Default folder: {DEFAULT_CACHE_DIR}.",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Keep running, and write the output again whenever files change,"
+            " parsing only those again. Stop with Ctrl+C.",
+        )
+        parser.add_argument(
+            "--connect",
+            nargs="?",
+            const=str(default_socket_path()),
+            default=None,
+            help="Ask the server started with r2t2 serve, listening on this socket,"
+            " to analyse the target and write the output, or analyse it here if"
+            f" there is none. Default socket: {default_socket_path()}.",
+        )
+        parser.add_argument(
+            "--shard",
+            default=None,
+            type=shard,
+            help="Only analyse the i-th of n parts of the files, given as i/n."
+            " Each file is always in the same part. Save each part with"
+            " --format snapshot and combine them with r2t2 merge.",
         )
         parser.add_argument(
             "target",
@@ -107,21 +246,211 @@ class StaticSubCommand(SubCommand):
         )
 
     def run(self, args: argparse.Namespace):
+        from .static_parser import IncrementalScan, locate_references
+
+        jobs = args.jobs or 1
         if args.notebook:
-            if not args.target.endswith('.ipynb'):
+            if os.path.isdir(args.target):
+                # notebooks are few but large, and parsed independently
+                jobs = args.jobs or os.cpu_count() or 1
+            elif not args.target.endswith('.ipynb'):
                 raise Exception("If --notebook flag is passed, target must be a"
-                                " Jupyter notebook!")
-        locate_references(args.target, encoding=args.encoding)
-        if args.docstring or args.notebook:
-            parse_and_add_docstring_references_from_files(
-                expand_file_list(args.target),
-                encoding=args.encoding
+                                " Jupyter notebook or a folder!")
+        if args.watch:
+            from .watcher import create_watcher
+
+            # watching first, so no change made during the analysis is missed
+            self._watcher = create_watcher(args.target, notebook=args.notebook)
+            self._scan = IncrementalScan(
+                args.target,
+                encoding=args.encoding,
+                docstring=args.docstring,
+                notebook=args.notebook,
+                shard=args.shard,
+            )
+            analysed = self._scan.scan(jobs=jobs, cache=args.cache)
+            # the records live until the end, so the collections of the garbage
+            # made by each refresh need not go through them (Python 3.7+)
+            getattr(gc, "freeze", lambda: None)()
+            return analysed
+        return locate_references(
+            args.target,
+            encoding=args.encoding,
+            jobs=jobs,
+            docstring=args.docstring,
+            cache=args.cache,
+            notebook=args.notebook,
+            shard=args.shard,
+        )
+
+    def refresh(self, args: argparse.Namespace) -> Iterator[List[Path]]:
+        if not args.watch:
+            return
+        LOGGER.info("watching %s for changes", args.target)
+        try:
+            while True:
+                updated = self._scan.update(self._watcher.wait())
+                if updated:
+                    LOGGER.info("analysed again: %s", ", ".join(map(str, updated)))
+                    yield updated
+        finally:
+            self._watcher.close()
+
+
+class MergeSubCommand(SubCommand):
+    def __init__(self):
+        super().__init__("merge", "Merge bibliography snapshots")
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        add_common_arguments(parser)
+        parser.add_argument(
+            "snapshots",
+            nargs="+",
+            help="Snapshots written with --format snapshot, e.g. by the shards of"
+            " a static analysis. Records are kept in the order of the snapshots.",
+        )
+        # the output goes to the current folder by default
+        parser.set_defaults(target=os.curdir)
+
+    def run(self, args: argparse.Namespace):
+        from .snapshot import merge_snapshots
+
+        merge_snapshots(args.snapshots, BIBLIOGRAPHY)
+
+
+class ServeSubCommand(SubCommand):
+    writes_output = False
+
+    def __init__(self):
+        super().__init__(
+            "serve", "Keep analyses in memory to answer static --connect quickly"
+        )
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument(
+            "targets",
+            nargs="*",
+            help="Files or folders to analyse when starting. Others are analysed"
+            " when first requested.",
+        )
+        parser.add_argument(
+            "--socket",
+            default=str(default_socket_path()),
+            help=f"Unix domain socket to listen on. Default: {default_socket_path()}.",
+        )
+        parser.add_argument(
+            "--docstring",
+            action="store_true",
+            help="Also parse docstrings when analysing the targets when starting.",
+        )
+        parser.add_argument(
+            "--notebook",
+            action="store_true",
+            help="Parse notebooks when analysing the targets when starting.",
+        )
+        parser.add_argument(
+            "--encoding",
+            default="utf-8",
+            help="The encoding to use when parsing the targets when starting.",
+        )
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            default=1,
+            type=int,
+            help="Number of processes used for the first analysis of a target.",
+        )
+        parser.add_argument(
+            "--debug",
+            action="store_true",
+            help="Enable debug logging"
+        )
+
+    def run(self, args: argparse.Namespace):
+        from .server import ReferenceServer
+
+        server = ReferenceServer(args.socket, jobs=args.jobs)
+        for target in args.targets:
+            server.root(
+                target,
+                docstring=args.docstring,
+                notebook=args.notebook,
+                encoding=args.encoding,
             )
+        # stopped by a service manager, the socket must be removed too
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class QuerySubCommand(SubCommand):
+    writes_output = False
+
+    def __init__(self):
+        super().__init__("query", "Query the references stored in a database")
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument(
+            "db",
+            help="SQLite database written with --db by the other sub commands.",
+        )
+        parser.add_argument(
+            "--cites",
+            default=None,
+            help="Only the objects citing this reference. A DOI is found whether"
+            " it was cited bare or as a URL.",
+        )
+        parser.add_argument(
+            "--under",
+            default=None,
+            help="Only the objects in this file or folder.",
+        )
+        parser.add_argument(
+            "--function",
+            default=None,
+            help="Only the objects with this name.",
+        )
+        parser.add_argument(
+            "--references",
+            action="store_true",
+            help="Only list the references of the objects found, once each.",
+        )
+        parser.add_argument(
+            "--debug",
+            action="store_true",
+            help="Enable debug logging"
+        )
+
+    def run(self, args: argparse.Namespace):
+        from .database import BiblioDatabase
+
+        with BiblioDatabase(args.db) as database:
+            found = database.find(
+                reference=args.cites, path=args.under, name=args.function
+            )
+            if args.references:
+                references: Dict[str, None] = {}
+                for _, record in found:
+                    references.update(dict.fromkeys(record.references))
+                print("\n".join(references))
+                return
+            for _, record in found:
+                location = record.source
+                if record.line is not None:
+                    location += f":{record.line}"
+                print(f"{location} {record.name}")
+                for short, ref in zip(record.short_purpose, record.references):
+                    print(f"\t{short} - {ref}")
 
 
 SUB_COMMANDS: List[SubCommand] = [
     RunSubCommand(),
-    StaticSubCommand()
+    StaticSubCommand(),
+    MergeSubCommand(),
+    ServeSubCommand(),
+    QuerySubCommand(),
 ]
 
 SUB_COMMAND_BY_NAME: Dict[str, SubCommand] = {
@@ -144,6 +473,11 @@ def parse_args(argv: List[str] = None) -> argparse.Namespace:
 
 
 def run(args: argparse.Namespace):
+    sub_command = SUB_COMMAND_BY_NAME[args.command]
+    if not sub_command.writes_output:
+        sub_command.run(args)
+        return
+
     if args.output is None:
         if os.path.isdir(args.target):
             output = Path(args.target) / "references"
@@ -155,10 +489,80 @@ def run(args: argparse.Namespace):
     else:
         output = Path(args.output)
 
-    sub_command = SUB_COMMAND_BY_NAME[args.command]
-    sub_command.run(args)
+    if getattr(args, "connect", None) is not None and connect(args, output):
+        return
+
+    for bib in args.bib:
+        # each file is its own source, whatever package cites its keys
+        BIBLIOGRAPHY.add_source(bib, package=bib)
+
+    analysed = sub_command.run(args)
+    write_output(args, output, analysed)
+    try:
+        for analysed in sub_command.refresh(args):
+            write_output(args, output, analysed)
+    except KeyboardInterrupt:
+        pass
+
+
+def connect(args: argparse.Namespace, output: Path) -> bool:
+    """Has the server analyse the target and write the output.
+
+    Returns:
+        False if no server is listening, so the target must be analysed here.
+    """
+    unsupported = [
+        option
+        for option, given in [
+            ("--watch", args.watch),
+            ("--db", args.db),
+            ("--resolve-doi", args.resolve_doi),
+        ]
+        if given
+    ]
+    if unsupported:
+        raise ValueError(f"{', '.join(unsupported)} cannot be used with --connect")
+    request = dict(
+        command="static",
+        target=os.path.abspath(args.target),
+        format=args.format,
+        output=os.path.abspath(output),
+        docstring=args.docstring,
+        notebook=args.notebook,
+        encoding=args.encoding,
+        shard=args.shard,
+        bib=[os.path.abspath(bib) for bib in args.bib],
+    )
+    try:
+        response = send_request(args.connect, request)
+    except OSError as exc:
+        LOGGER.warning("analysing here, no server on %s: %s", args.connect, exc)
+        return False
+    if "report" in response:
+        sys.stdout.write(response["report"])
+    return True
+
+
+def write_output(
+    args: argparse.Namespace, output: Path, analysed: Optional[List[Path]]
+) -> None:
+    if args.resolve_doi:
+        from .doi import DEFAULT_ENDPOINT, DoiResolver, resolve_bibliography
+
+        resolver = DoiResolver(
+            args.doi_cache,
+            endpoint=args.doi_endpoint or DEFAULT_ENDPOINT,
+            offline=args.offline,
+        )
+        resolve_bibliography(BIBLIOGRAPHY, resolver)
+        resolver.cache.close()
+
+    if args.db is not None:
+        from .database import BiblioDatabase
 
-    REGISTERED_WRITERS[args.format](output)
+        with BiblioDatabase(args.db) as database:
+            database.store(BIBLIOGRAPHY, replace=analysed)
+    REGISTERED_WRITERS[args.format](output, BIBLIOGRAPHY)
 
 
 def main(argv: List[str] = None):
@@ -0,0 +1,162 @@
+import ast
+import itertools
+import logging
+from typing import Iterator, List, Optional, Set
+
+from .core import FunctionReference, reference_from
+from .docstring_reference_parser import DOCSTRING_SHORT_PURPOSE
+from .plain_text_parser import iter_parse_plain_text_references
+
+
+LOGGER = logging.getLogger(__name__)
+
+R2T2_MODULES = ("r2t2", "r2t2.core")
+"""Modules add_reference can be imported from."""
+
+_BLOCKS = ("body", "orelse", "finalbody", "handlers", "cases")
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_DECORATOR_ARGUMENTS = {"short_purpose", "reference", "doi"}
+
+
+class FileParseError(RuntimeError):
+    pass
+
+
+class FileReferenceParseError(FileParseError):
+    pass
+
+
+def _iter_statements(node: ast.AST) -> Iterator[ast.AST]:
+    """Yields the statements nested in a node, in source order.
+
+    Expressions are not visited: they cannot contain imports or definitions.
+    """
+    for field in _BLOCKS:
+        children = getattr(node, field, None)
+        if isinstance(children, list):
+            for child in children:
+                yield child
+                yield from _iter_statements(child)
+
+
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+class _Aliases:
+    """Names under which add_reference is reachable in a module."""
+
+    def __init__(self):
+        # a bare add_reference is always accepted, as it used to be
+        self.functions: Set[str] = {"add_reference"}
+        self.modules: Set[str] = set(R2T2_MODULES)
+
+    def add_import(self, node: ast.AST) -> None:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name in R2T2_MODULES:
+                    self.modules.add(alias.asname or alias.name)
+        elif (
+            isinstance(node, ast.ImportFrom)
+            and not node.level
+            and node.module in R2T2_MODULES
+        ):
+            for alias in node.names:
+                if alias.name == "add_reference":
+                    self.functions.add(alias.asname or alias.name)
+                elif alias.name == "core":
+                    self.modules.add(alias.asname or alias.name)
+
+    def is_add_reference(self, node: ast.AST) -> bool:
+        name = _dotted_name(node)
+        if name is None:
+            return False
+        if name in self.functions:
+            return True
+        module, _, attribute = name.rpartition(".")
+        return attribute == "add_reference" and module in self.modules
+
+
+def _parse_decorator(call: ast.Call) -> FunctionReference:
+    """Returns the short purpose and reference given to an add_reference call."""
+    if call.args:
+        raise ValueError("add_reference only takes keyword arguments")
+    kwargs = {}
+    for keyword in call.keywords:
+        if keyword.arg not in _DECORATOR_ARGUMENTS:
+            raise ValueError(f"unexpected argument {keyword.arg!r}")
+        # only literals are accepted, no code is ever evaluated
+        kwargs[keyword.arg] = ast.literal_eval(keyword.value)
+    ref = reference_from(reference=kwargs.get("reference"), doi=kwargs.get("doi"))
+    return FunctionReference("", None, "", [kwargs["short_purpose"]], [ref])
+
+
+def find_references_in_source(
+    text: str, filename: str, docstrings: bool = False
+) -> List[FunctionReference]:
+    """Finds the references of the objects defined in some Python source.
+
+    The source is parsed once. The arguments of the add_reference decorators,
+    however add_reference was imported, and optionally the citations in the
+    docstrings, are both taken from the same syntax tree.
+
+    Args:
+        text (str): The Python source.
+        filename (str): Name of the file the source comes from.
+        docstrings (bool): Whether to look for citations in docstrings too.
+
+    Raises:
+        FileReferenceParseError if the arguments of a decorator are not literals.
+
+    Returns:
+        A record for each object with references, in source order.
+    """
+    try:
+        tree = ast.parse(text, filename=filename)
+    except SyntaxError as exc:
+        LOGGER.warning("skipping %s, which is not valid Python: %s", filename, exc)
+        return []
+
+    aliases = _Aliases()
+    records = []
+    for node in itertools.chain([tree], _iter_statements(tree)):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            aliases.add_import(node)
+            continue
+        if not isinstance(node, (ast.Module,) + _DEFINITIONS):
+            continue
+
+        # the module has no line, so its docstring is reported at line 1
+        line = getattr(node, "lineno", 1)
+        name = getattr(node, "name", "")
+        record = FunctionReference(name, line, filename, [], [])
+
+        for decorator in getattr(node, "decorator_list", ()):
+            if isinstance(decorator, ast.Call) and aliases.is_add_reference(
+                decorator.func
+            ):
+                try:
+                    found = _parse_decorator(decorator)
+                except Exception as exc:
+                    raise FileReferenceParseError(
+                        "failed to process %s:%s due to %r" % (filename, line, exc)
+                    ) from exc
+                record.short_purpose.extend(found.short_purpose)
+                record.references.extend(found.references)
+
+        if docstrings:
+            docstring = ast.get_docstring(node)  # type: ignore
+            for ref in iter_parse_plain_text_references(docstring or ""):
+                record.short_purpose.append(DOCSTRING_SHORT_PURPOSE)
+                record.references.append(ref)
+
+        if record.references:
+            records.append(record)
+    return records
@@ -0,0 +1,179 @@
+import logging
+import mmap
+import os
+import re
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".r2t2-index"
+"""Suffix added to the name of a BibTeX file for its index, kept next to it."""
+
+# the index is a header, then a slot for each key, sorted by key, then the keys:
+# - header: format, modification time and size of the BibTeX file, number of keys
+# - slot: offset and length of the key after the slots, and of its entry in the
+#   BibTeX file
+_MAGIC = b"R2T2BIB1"
+_HEADER = struct.Struct("<8sqqI")
+_SLOT = struct.Struct("<QIQI")
+
+_ENTRY_START = re.compile(rb"@[ \t]*([A-Za-z]+)\s*([{(])")
+_KEY = re.compile(rb"\s*([^\s,{}()]+)\s*,")
+_DELIMITERS = re.compile(rb"[{}()]")
+_NOT_ENTRIES = {b"comment", b"preamble", b"string"}
+
+_Buffer = Union[bytes, mmap.mmap]
+
+
+def _find_entry_end(data: _Buffer, opening: int) -> int:
+    """Returns the position after the end of the entry opened at `opening`, or -1.
+
+    Braces must be balanced in BibTeX, so parentheses only count outside them.
+    """
+    parentheses = data[opening:opening + 1] == b"("
+    depth = 0
+    for delimiter in _DELIMITERS.finditer(data, opening + parentheses):
+        char = delimiter.group()
+        if char == b"{":
+            depth += 1
+        elif char == b"}":
+            depth -= 1
+            if not depth and not parentheses:
+                return delimiter.end()
+        elif char == b")" and parentheses and not depth:
+            return delimiter.end()
+    return -1
+
+
+def iter_entries(data: _Buffer) -> Iterator[Tuple[bytes, int, int]]:
+    """Yields the key, start and end of each entry of a BibTeX database.
+
+    Args:
+        data (bytes, mmap): The content of the BibTeX file.
+
+    Returns:
+        An iterator over the entries, skipping comments, preambles and strings.
+    """
+    position = 0
+    while True:
+        match = _ENTRY_START.search(data, position)
+        if match is None:
+            return
+        end = _find_entry_end(data, match.start(2))
+        if end < 0:
+            LOGGER.warning("unbalanced BibTeX entry at byte %d", match.start())
+            return
+        position = end
+        if match.group(1).lower() in _NOT_ENTRIES:
+            continue
+        key = _KEY.match(data, match.end())
+        if key is not None:
+            yield key.group(1), match.start(), end
+
+
+def build_index(data: _Buffer, mtime_ns: int, size: int) -> bytes:
+    """Returns the index of the entries of a BibTeX database, by key."""
+    entries: Dict[bytes, Tuple[int, int]] = {}
+    for key, start, end in iter_entries(data):
+        # the first entry with a key is the one BibTeX uses
+        entries.setdefault(key, (start, end - start))
+
+    slots = []
+    keys = []
+    keys_length = 0
+    for key in sorted(entries):
+        start, length = entries[key]
+        slots.append(_SLOT.pack(keys_length, len(key), start, length))
+        keys.append(key)
+        keys_length += len(key)
+    header = _HEADER.pack(_MAGIC, mtime_ns, size, len(entries))
+    return b"".join([header] + slots + keys)
+
+
+def _map(path: Path) -> _Buffer:
+    """Maps a file in memory, or returns its content if it is empty."""
+    with open(path, "rb") as f:
+        if not f.seek(0, 2):
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class BibIndex:
+    """Lookup of the entries of a BibTeX file by key.
+
+    The index is built the first time a key is looked up, and saved next to the
+    BibTeX file so that later runs only map it in memory and search it. It is
+    built again when the BibTeX file changes.
+
+    Args:
+        path (str, Path): The BibTeX file.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + INDEX_SUFFIX)
+        self._bib: _Buffer = b""
+        self._index: _Buffer = b""
+        self._count = 0
+        self._loaded = False
+
+    def _load(self) -> None:
+        self._loaded = True
+        stat = os.stat(self.path)
+        self._bib = _map(self.path)
+        try:
+            index = _map(self.index_path)
+            magic, mtime_ns, size, count = _HEADER.unpack_from(index)
+            complete = len(index) >= _HEADER.size + count * _SLOT.size
+            if complete and (magic, mtime_ns, size) == (
+                _MAGIC, stat.st_mtime_ns, stat.st_size
+            ):
+                self._index, self._count = index, count
+                return
+        except (OSError, struct.error):
+            pass
+
+        LOGGER.debug("indexing %s", self.path)
+        index = build_index(self._bib, stat.st_mtime_ns, stat.st_size)
+        self._index, self._count = index, _HEADER.unpack_from(index)[3]
+        temporary = self.index_path.with_name(
+            f"{self.index_path.name}.{os.getpid()}.tmp"
+        )
+        try:
+            with open(temporary, "wb") as f:
+                f.write(index)
+            os.replace(temporary, self.index_path)
+        except OSError as exc:
+            # e.g. a read-only installation: the index is kept for this run only
+            LOGGER.debug("could not save the index of %s: %r", self.path, exc)
+
+    def _find(self, key: bytes) -> Optional[Tuple[int, int]]:
+        """Returns the offset and length of the entry with a key, by binary search."""
+        keys = _HEADER.size + self._count * _SLOT.size
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            key_offset, key_length, start, length = _SLOT.unpack_from(
+                self._index, _HEADER.size + middle * _SLOT.size
+            )
+            candidate = self._index[keys + key_offset:keys + key_offset + key_length]
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return start, length
+        return None
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the text of the entry with a key, or None if there is none."""
+        if not self._loaded:
+            self._load()
+        found = self._find(key.encode("utf-8"))
+        if found is None:
+            return None
+        start, length = found
+        return self._bib[start:start + length].decode("utf-8", errors="replace")
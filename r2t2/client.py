@@ -0,0 +1,47 @@
+import json
+import os
+import socket
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+
+PROTOCOL = 1
+"""Version of the requests and responses, bumped when they change."""
+
+
+def default_socket_path() -> Path:
+    """Returns the socket of the server of the user, in their runtime folder."""
+    folder = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(folder) / f"r2t2-{os.getuid()}.sock"
+
+
+class ServerError(RuntimeError):
+    pass
+
+
+def send_request(
+    path: Union[str, Path], request: Dict, timeout: Optional[float] = None
+) -> Dict:
+    """Sends a request to a server and returns its response.
+
+    Requests and responses are each a line of JSON.
+
+    Raises:
+        OSError if no server listens on the socket.
+        ServerError if the server could not handle the request.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(str(path))
+        message = dict(request, protocol=PROTOCOL)
+        connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ServerError("the server closed the connection without answering")
+    response = json.loads(line)
+    if "error" in response:
+        raise ServerError(response["error"])
+    return response
@@ -1,9 +1,31 @@
-import inspect
-import wrapt
-from typing import NamedTuple, List, Optional, Callable, Dict, Union
-from functools import reduce
+import atexit
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import weakref
+from array import array
+from collections.abc import ItemsView, ValuesView
+from typing import (
+    Any,
+    NamedTuple,
+    List,
+    Iterable,
+    Iterator,
+    Optional,
+    Callable,
+    Sequence,
+    Dict,
+    Set,
+    Tuple,
+    Union,
+)
 from pathlib import Path
 
+from .bibtex import BibIndex
+
 
 class FunctionReference(NamedTuple):
     name: str
@@ -13,51 +35,787 @@ class FunctionReference(NamedTuple):
     references: List[str]
 
 
+class ReferenceTiming(NamedTuple):
+    """Calls of a referenced object, and the time spent in them, while profiling.
+
+    Times are in seconds and only count the outermost call of recursive calls.
+    """
+
+    calls: int
+    wall: float
+    cpu: float
+
+
+ZERO_OVERHEAD_ENV = "R2T2_ZERO_OVERHEAD"
+"""Environment variable that, if set to a non-empty value other than '0', makes
+add_reference return the decorated objects untouched when tracking is off."""
+
+CHILD_TRACKING_ENV = "R2T2_CHILD_TRACKING"
+"""Environment variable through which child processes learn that they must track
+references and where to send them, as '<parent pid>:<spool directory>'."""
+
+CHILD_PROFILING_ENV = "R2T2_CHILD_PROFILING"
+"""Environment variable through which child processes learn that they must profile
+the referenced objects too."""
+
+# CPU time of the current thread only (Python 3.7+), else of the whole process
+_thread_time = getattr(time, "thread_time", time.process_time)
+
+# counters of an object in a thread: calls, wall time, CPU time, overhead of r2t2,
+# number of active calls and slot in the file of the process (children only)
+_CALLS, _WALL, _CPU, _OVERHEAD, _ACTIVE, _SLOT = range(6)
+_TOTALS = 4
+
+
+def function_identifier(source: str, name: str, line: Optional[int]) -> str:
+    """Returns the key of a referenced object in the bibliography.
+
+    All the producers of records use it, so the same object found by the static
+    parser, in its docstring or at runtime ends up in a single record. `line` is
+    the line of the `def` or `class` statement, not of its decorators.
+    """
+    return "{source}:{name}:{line}".format(
+        source=os.path.normcase(os.path.abspath(source)) if source else "",
+        name=name,
+        line=line or "n/a",
+    )
+
+
+_Entry = Tuple[str, str, Optional[int], str, str, str]
+"""Identifier, name, line, source, short purpose and reference of a record."""
+
+
+class _ThreadRecorder:
+    """Buffer of the references hit by a single thread while tracking.
+
+    Only the owning thread writes to it, so recording needs no lock. Pending
+    records are moved into the bibliography whenever it is read.
+
+    While profiling, it also keeps the counters of each referenced object called
+    by the thread: its calls, the wall and CPU time spent in them and the time
+    spent by r2t2 itself.
+    """
+
+    __slots__ = ("thread", "seen", "pending", "timings")
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.seen: Set[Tuple[str, str]] = set()
+        self.pending: List[_Entry] = []
+        self.timings: Dict[str, List] = {}
+
+
+class _TimingSlots:
+    """Counters of the threads of a child process, in a file read by the parent.
+
+    Each counter has its slot in the memory mapped file, updated after every
+    outermost call, so the parent gets them even if the process is terminated.
+    Which object each slot is for is sent with the records.
+    """
+
+    SLOT = struct.Struct("<qddd")
+
+    def __init__(self, path: str):
+        self.pid = os.getpid()
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT)
+        self.capacity = 0
+        self.used = 0
+        # the previous mappings are kept, as other threads may still be using them
+        self.maps: List[mmap.mmap] = []
+
+    def allocate(self) -> int:
+        if self.used == self.capacity:
+            self.capacity = max(64, 2 * self.capacity)
+            os.ftruncate(self.fd, self.capacity * self.SLOT.size)
+            self.maps.append(mmap.mmap(self.fd, self.capacity * self.SLOT.size))
+        self.used += 1
+        return self.used - 1
+
+    def write(self, counters: List) -> None:
+        self.SLOT.pack_into(
+            self.maps[-1], counters[_SLOT] * self.SLOT.size, *counters[:_TOTALS]
+        )
+
+    @classmethod
+    def read(cls, path: Union[str, Path]) -> List[Tuple[int, float, float, float]]:
+        data = Path(path).read_bytes()
+        size = len(data) - len(data) % cls.SLOT.size
+        return list(cls.SLOT.iter_unpack(data[:size]))
+
+
+class _Strings:
+    """Table of the strings of a bibliography, each kept once and given an id."""
+
+    __slots__ = ("ids", "strings")
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def id(self, string: str) -> int:
+        index = self.ids.get(string)
+        if index is None:
+            index = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+    def clear(self) -> None:
+        self.ids.clear()
+        self.strings.clear()
+
+
+# a record is stored as an array of ids in the string table: the name, the source,
+# the line (the smallest integer if none), then the short purpose and reference of
+# each citation. Names are mostly unique, so they are not put in the table if the
+# key of the record has them, as usual.
+_NAME, _SOURCE, _LINE, _CITATIONS = 0, 1, 2, 3
+_NO_LINE = -(2 ** 31)
+_NAME_IN_KEY = -1
+
+
+def _name_in_key(key: str) -> str:
+    """Returns the name in a key made by function_identifier."""
+    return key.rsplit(":", 2)[-2]
+
+
+class _Values(ValuesView):
+    def __iter__(self):
+        biblio = self._mapping
+        for key, packed in dict.items(biblio):
+            yield biblio._unpack(key, packed)
+
+
+class _Items(ItemsView):
+    def __iter__(self):
+        biblio = self._mapping
+        for key, packed in dict.items(biblio):
+            yield key, biblio._unpack(key, packed)
+
+
 class Biblio(dict):
+    """The referenced objects, by identifier, and their references.
+
+    Records are kept compact: every string, e.g. a source file, a short purpose
+    or a reference, is stored once in a table, and each record is an array of ids
+    in that table. A FunctionReference is built whenever a record is read, so
+    changing it does not change the bibliography: records are changed with `add`
+    or by setting them again.
+    """
+
     track_references: bool = False
+    profiling: bool = False
+    zero_overhead: bool = os.environ.get(ZERO_OVERHEAD_ENV, "0") not in ("", "0")
 
     def __init__(self):
         super().__init__()
+        self._strings = _Strings()
         self._sources: Dict[str, Path] = {}
+        self._bib_indexes: Dict[Path, BibIndex] = {}
+        self._descriptions: Dict[str, str] = {}
+        # every reference, in order of appearance, with the keys of the records
+        # citing it (dicts used as ordered sets)
+        self._citations: Dict[str, Dict[str, None]] = {}
+        self._local = threading.local()
+        self._recorders: List[_ThreadRecorder] = []
+        self._merge_lock = threading.Lock()
+        self._spool: Optional[Tuple[str, int]] = None
+        self._spool_fd: Optional[Tuple[int, int]] = None
+        # timings of the threads that ended and of the child processes
+        self._timings: Dict[str, List] = {}
+        self._timing_slots: Optional[_TimingSlots] = None
+
+    def __getitem__(self, key):
+        self.merge_pending()
+        return self._unpack(key, super().__getitem__(key))
+
+    def __contains__(self, key):
+        self.merge_pending()
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self.merge_pending()
+        return super().__iter__()
+
+    def __len__(self):
+        self.merge_pending()
+        return super().__len__()
+
+    def __reversed__(self):
+        self.merge_pending()
+        return super().__reversed__()
+
+    def __setitem__(self, key, value):
+        self.merge_pending()
+        if super().__contains__(key):
+            self._unindex(key, super().__getitem__(key))
+        packed = self._pack(key, value.name, value.line, value.source)
+        for short, ref in zip(value.short_purpose, value.references):
+            packed.append(self._strings.id(short))
+            packed.append(self._strings.id(ref))
+        super().__setitem__(key, packed)
+        self._index(key, value.references)
+
+    def __delitem__(self, key):
+        self.merge_pending()
+        self._unindex(key, super().__getitem__(key))
+        super().__delitem__(key)
+        self._forget(key)
+
+    def __eq__(self, other):
+        if not isinstance(other, dict):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def get(self, key, default=None):
+        self.merge_pending()
+        packed = super().get(key)
+        return default if packed is None else self._unpack(key, packed)
+
+    def keys(self):
+        self.merge_pending()
+        return super().keys()
+
+    def values(self):
+        self.merge_pending()
+        return _Values(self)
+
+    def items(self):
+        self.merge_pending()
+        return _Items(self)
+
+    def copy(self):
+        return dict(self.items())
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    _MISSING = object()
+
+    def pop(self, key, default=_MISSING):
+        self.merge_pending()
+        if not super().__contains__(key):
+            if default is self._MISSING:
+                raise KeyError(key)
+            return default
+        value = super().pop(key)
+        self._unindex(key, value)
+        self._forget(key)
+        return self._unpack(key, value)
+
+    def popitem(self):
+        self.merge_pending()
+        key, value = super().popitem()
+        self._unindex(key, value)
+        self._forget(key)
+        return key, self._unpack(key, value)
+
+    def _pack(
+        self, key: str, name: str, line: Optional[int], source: str
+    ) -> array:
+        """Returns a record without references, as stored in the bibliography."""
+        if isinstance(key, str) and ":" in key and _name_in_key(key) == name:
+            name_id = _NAME_IN_KEY
+        else:
+            name_id = self._strings.id(name)
+        return array(
+            "i",
+            [name_id, self._strings.id(source), _NO_LINE if line is None else line],
+        )
+
+    def _unpack(self, key: str, packed: array) -> FunctionReference:
+        strings = self._strings.strings
+        line = packed[_LINE]
+        name_id = packed[_NAME]
+        return FunctionReference(
+            _name_in_key(key) if name_id == _NAME_IN_KEY else strings[name_id],
+            None if line == _NO_LINE else line,
+            strings[packed[_SOURCE]],
+            [strings[index] for index in packed[_CITATIONS::2]],
+            [strings[index] for index in packed[_CITATIONS + 1::2]],
+        )
+
+    def sort(self, key: Optional[Callable[[str], Any]] = None) -> None:
+        """Sorts the records in place, by identifier or by `key(identifier)`.
+
+        Records are moved, not copied, so this is much faster than building the
+        bibliography again. The references are then listed in the order they are
+        first cited in the sorted records.
+        """
+        self.merge_pending()
+        with self._merge_lock:
+            get = super().__getitem__
+            entries = [(k, get(k)) for k in sorted(super().keys(), key=key)]
+            super().clear()
+            super().update(entries)
+            strings = self._strings.strings
+            citations: Dict[str, Dict[str, None]] = {}
+            for identifier, packed in entries:
+                for index in packed[_CITATIONS + 1::2]:
+                    citations.setdefault(strings[index], {})[identifier] = None
+            self._citations = citations
+
+    def _index(self, identifier: str, references: Iterable[str]) -> None:
+        for ref in references:
+            self._citations.setdefault(ref, {})[identifier] = None
+
+    def _unindex(self, identifier: str, packed: array) -> None:
+        strings = self._strings.strings
+        for ref in (strings[index] for index in packed[_CITATIONS + 1::2]):
+            citing = self._citations.get(ref)
+            if citing is not None:
+                citing.pop(identifier, None)
+                if not citing:
+                    del self._citations[ref]
+
+    def _forget(self, identifier) -> None:
+        """Lets every thread record again the references of a removed key."""
+        with self._merge_lock:
+            for recorder in self._recorders:
+                # the owning thread may be adding to the set meanwhile
+                seen = list(recorder.seen)
+                for key in [key for key in seen if key[0] == identifier]:
+                    recorder.seen.discard(key)
 
     def __str__(self):
-        def add_record(out, record):
-            index = 1
-            out += f"Referenced in: {record.name}\n"
-            out += f"Source file: {record.source}\n"
-            if record.line is not None:
-                out += f"Line: {record.line}\n"
-            for short, ref in zip(record.short_purpose, record.references):
-                out += f"\t[{index}] {short} - {ref}\n"
-                index += 1
-            out += "\n"
-            return out
+        return "".join(self.iter_report())
 
-        return reduce(add_record, self.values(), "")
+    def iter_report(self) -> Iterator[str]:
+        """Renders the report of the references, one record at a time.
+
+        Writers can stream the chunks to their output, so the whole report is
+        never held in memory. While profiling, each record shows the calls and time
+        spent in the object, and the report ends with the overhead of r2t2.
+        """
+        timings = self.timings
+        for identifier, record in self.items():
+            lines = [
+                f"Referenced in: {record.name}\n",
+                f"Source file: {record.source}\n",
+            ]
+            if record.line is not None:
+                lines.append(f"Line: {record.line}\n")
+            for index, (short, ref) in enumerate(
+                zip(record.short_purpose, record.references), 1
+            ):
+                lines.append(f"\t[{index}] {short} - {ref}\n")
+                entry = self.citation(ref)
+                if entry is not None:
+                    lines.extend(f"\t\t{line}\n" for line in entry.splitlines())
+            timing = timings.get(identifier)
+            if timing is not None:
+                lines.append(
+                    f"Calls: {timing.calls}, wall time: {timing.wall:.6f} s,"
+                    f" CPU time: {timing.cpu:.6f} s\n"
+                )
+            lines.append("\n")
+            yield "".join(lines)
+        if timings:
+            yield f"Overhead of r2t2: {self.overhead:.6f} s\n"
 
     def clear(self) -> None:
-        super().clear()
+        with self._merge_lock:
+            for recorder in self._recorders:
+                recorder.seen.clear()
+                recorder.pending.clear()
+                # the active calls of the owning thread still need their count
+                for counters in recorder.timings.values():
+                    counters[:_TOTALS] = [0, 0.0, 0.0, 0.0]
+            super().clear()
+            self._citations.clear()
+            self._strings.clear()
+            self._timings.clear()
         self._sources.clear()
+        self._bib_indexes.clear()
+        self._descriptions.clear()
+
+    def add(
+        self, record: FunctionReference, identifier: Optional[str] = None
+    ) -> str:
+        """Adds the references of a referenced object to the bibliography.
+
+        If the object is already there, its new references are appended to the
+        existing record, skipping those it already has.
+
+        Args:
+            record (FunctionReference): The object and its references.
+            identifier (Optional, str): Key of the record. By default, it is
+                built from the source, name and line of the record.
+
+        Returns:
+            The key of the record.
+        """
+        if identifier is None:
+            identifier = function_identifier(record.source, record.name, record.line)
+        self.merge_pending()
+        with self._merge_lock:
+            self._merge_entries(
+                (identifier, record.name, record.line, record.source, short, ref)
+                for short, ref in zip(record.short_purpose, record.references)
+            )
+            if not super().__contains__(identifier):
+                super().__setitem__(
+                    identifier,
+                    self._pack(identifier, record.name, record.line, record.source),
+                )
+        return identifier
+
+    def add_timing(
+        self,
+        identifier: str,
+        calls: int,
+        wall: float,
+        cpu: float,
+        overhead: float = 0.0,
+    ) -> None:
+        """Adds calls and times, e.g. measured by another process, to a record.
+
+        Args:
+            identifier (str): Key of the record.
+            calls (int): Number of calls.
+            wall (float): Wall time spent in the calls, in seconds.
+            cpu (float): CPU time spent in the calls, in seconds.
+            overhead (float): Time spent by r2t2 in the calls, in seconds.
+        """
+        with self._merge_lock:
+            _add_counters(self._timings, identifier, (calls, wall, cpu, overhead))
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Saves the records and timings to a binary snapshot, see r2t2.snapshot.
+
+        Args:
+            path (str, Path): The snapshot file.
+        """
+        from .snapshot import write_snapshot
+
+        self.merge_pending()
+        with self._merge_lock:
+            timings = self._total_timings()
+        write_snapshot(path, self.items(), timings)
+
+    def load(self, path: Union[str, Path]) -> None:
+        """Adds the records and timings of a snapshot written by `save`.
+
+        Args:
+            path (str, Path): The snapshot file.
+
+        Raises:
+            SnapshotError if the file is not a complete snapshot.
+        """
+        from .snapshot import merge_snapshots
+
+        merge_snapshots([path], self)
+
+    def cited_by(self, reference: str) -> List[FunctionReference]:
+        """Returns the records of the objects citing a reference."""
+        self.merge_pending()
+        return [
+            self._unpack(identifier, super(Biblio, self).__getitem__(identifier))
+            for identifier in self._citations.get(reference, ())
+        ]
+
+    def record(
+        self,
+        identifier: str,
+        name: str,
+        line: int,
+        source: str,
+        short_purpose: str,
+        reference: str,
+    ) -> None:
+        """Records that a referenced object has been used by the current thread.
+
+        The record is kept in a buffer private to the calling thread, so no lock
+        is taken. Buffers are merged into the bibliography when it is read.
+        """
+        try:
+            recorder = self._local.recorder
+        except AttributeError:
+            recorder = self._local.recorder = _ThreadRecorder()
+            with self._merge_lock:
+                self._recorders.append(recorder)
+
+        key = (identifier, reference)
+        if key in recorder.seen:
+            return
+        recorder.seen.add(key)
+        entry = (identifier, name, line, source, short_purpose, reference)
+        recorder.pending.append(entry)
+        if self._spool is not None:
+            self._send_to_parent(entry)
+
+    def profiled_call(
+        self,
+        identifier: str,
+        entered: float,
+        wrapped: Callable,
+        args: tuple,
+        kwargs: dict,
+    ):
+        """Calls a referenced object, counting the call and the time spent in it.
+
+        The counters belong to the calling thread, like its records, so no lock is
+        taken. The time spent here and in the wrapper since `entered` is counted
+        as the overhead of r2t2. The object must have been recorded first.
+
+        Args:
+            identifier (str): Key of the record of the object.
+            entered (float): Value of `time.perf_counter` when the wrapper started.
+            wrapped (Callable): The referenced object.
+            args (tuple): Positional arguments of the call.
+            kwargs (dict): Keyword arguments of the call.
+
+        Returns:
+            What the object returns.
+        """
+        recorder = self._local.recorder
+        counters = recorder.timings.get(identifier)
+        if counters is None:
+            counters = recorder.timings[identifier] = self._new_counters(identifier)
+        counters[_ACTIVE] += 1
+        wall = time.perf_counter()
+        cpu = _thread_time()
+        try:
+            return wrapped(*args, **kwargs)
+        finally:
+            cpu = _thread_time() - cpu
+            end = time.perf_counter()
+            counters[_CALLS] += 1
+            counters[_ACTIVE] -= 1
+            if not counters[_ACTIVE]:
+                # recursive calls are already in the time of the outermost one
+                counters[_WALL] += end - wall
+                counters[_CPU] += cpu
+            counters[_OVERHEAD] += wall - entered + time.perf_counter() - end
+            if counters[_SLOT] >= 0 and not counters[_ACTIVE]:
+                self._timing_slots.write(counters)  # type: ignore
+
+    def _new_counters(self, identifier: str) -> List:
+        counters = [0, 0.0, 0.0, 0.0, 0, -1]
+        if self._spool is None or os.getpid() == self._spool[1]:
+            return counters
+        # in a child process, the counters are shared with the parent
+        with self._merge_lock:
+            slots = self._timing_slots
+            if slots is None or slots.pid != os.getpid():
+                slots = self._timing_slots = _TimingSlots(
+                    os.path.join(self._spool[0], f"{os.getpid()}.timings")
+                )
+            counters[_SLOT] = slots.allocate()
+        self._write_to_spool(dict(slot=counters[_SLOT], identifier=identifier))
+        return counters
+
+    @property
+    def timings(self) -> Dict[str, ReferenceTiming]:
+        """The calls and time spent in each referenced object while profiling."""
+        with self._merge_lock:
+            totals = self._total_timings()
+        return {
+            identifier: ReferenceTiming(
+                int(counters[_CALLS]), counters[_WALL], counters[_CPU]
+            )
+            for identifier, counters in totals.items()
+            # cleared, or still in their first call
+            if counters[_CALLS]
+        }
+
+    @property
+    def overhead(self) -> float:
+        """The time spent by r2t2 in the referenced calls while profiling."""
+        with self._merge_lock:
+            totals = self._total_timings()
+        return sum(counters[_OVERHEAD] for counters in totals.values())
+
+    def _total_timings(self) -> Dict[str, List]:
+        totals = {key: counters[:] for key, counters in self._timings.items()}
+        for recorder in self._recorders:
+            # the owning thread may be adding objects meanwhile
+            for identifier, counters in list(recorder.timings.items()):
+                _add_counters(totals, identifier, counters)
+        return totals
+
+    def merge_pending(self) -> None:
+        """Moves the records buffered by every thread into the bibliography."""
+        for recorder in self._recorders:
+            if recorder.pending:
+                break
+        else:
+            return
+
+        with self._merge_lock:
+            for recorder in self._recorders:
+                # The owning thread may still be appending, so only take what is
+                # there now and leave anything added meanwhile for the next merge.
+                count = len(recorder.pending)
+                entries = recorder.pending[:count]
+                del recorder.pending[:count]
+                self._merge_entries(entries)
+
+            alive = []
+            for recorder in self._recorders:
+                if recorder.thread.is_alive() or recorder.pending:
+                    alive.append(recorder)
+                else:
+                    for identifier, counters in recorder.timings.items():
+                        _add_counters(self._timings, identifier, counters)
+            self._recorders = alive
+
+    def _merge_entries(
+        self, entries: Iterable[_Entry]
+    ) -> None:
+        strings = self._strings
+        for identifier, name, line, source, short, ref in entries:
+            packed = super().get(identifier)
+            if packed is None:
+                packed = self._pack(identifier, name, line, source)
+                super().__setitem__(identifier, packed)
+            ref_id = strings.id(ref)
+            # the index shares the string of the table
+            citing = self._citations.setdefault(strings.strings[ref_id], {})
+            if identifier not in citing:
+                citing[identifier] = None
+                packed.append(strings.id(short))
+                packed.append(ref_id)
+
+    def track_child_processes(self, directory: Union[str, Path]) -> None:
+        """Makes child processes track references and send them to the parent.
+
+        Processes started afterwards, either forked or spawned, turn tracking on
+        and append every new record to a file of their own in `directory`. These
+        are merged back by `collect_child_processes`. Records are written as soon
+        as they are first seen, so they are not lost if a worker is terminated.
+
+        Args:
+            directory (str, Path): Existing directory for the child records.
+        """
+        self._spool = (str(directory), os.getpid())
+        os.environ[CHILD_TRACKING_ENV] = f"{os.getpid()}:{directory}"
+        if self.profiling:
+            os.environ[CHILD_PROFILING_ENV] = "1"
+
+    def collect_child_processes(self) -> None:
+        """Merges the references sent by child processes and stops tracking them."""
+        if self._spool is None:
+            return
+        directory = Path(self._spool[0])
+        self._spool = None
+        os.environ.pop(CHILD_TRACKING_ENV, None)
+        os.environ.pop(CHILD_PROFILING_ENV, None)
+
+        with self._merge_lock:
+            for filename in sorted(directory.glob("*.jsonl")):
+                with open(filename, encoding="utf-8") as f:
+                    # a terminated worker might have left a partial last line
+                    lines = [line for line in f if line.endswith("\n")]
+                entries = []
+                slots = {}
+                for line in lines:
+                    item = json.loads(line)
+                    if isinstance(item, dict):
+                        slots[item["slot"]] = item["identifier"]
+                    else:
+                        entries.append(tuple(item))
+                self._merge_entries(entries)
+                if slots:
+                    counters = _TimingSlots.read(filename.with_suffix(".timings"))
+                    for slot, identifier in slots.items():
+                        if slot < len(counters):
+                            _add_counters(self._timings, identifier, counters[slot])
+
+    def _send_to_parent(self, entry: _Entry) -> None:
+        assert self._spool is not None
+        if os.getpid() != self._spool[1]:
+            self._write_to_spool(entry)
+
+    def _write_to_spool(self, item: Union[_Entry, dict]) -> None:
+        assert self._spool is not None
+        directory = self._spool[0]
+        pid = os.getpid()
+        if self._spool_fd is None or self._spool_fd[0] != pid:
+            fd = os.open(
+                os.path.join(directory, f"{pid}.jsonl"),
+                os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+            )
+            self._spool_fd = (pid, fd)
+            # workers of multiprocessing leave through os._exit, which skips
+            # atexit but runs the multiprocessing finalizers
+            from multiprocessing.util import Finalize
+
+            atexit.register(self._close_spool)
+            Finalize(None, self._close_spool, exitpriority=0)
+        # a single write to a file opened for appending is not interleaved with
+        # the writes of other threads, so no lock is needed
+        os.write(self._spool_fd[1], (json.dumps(item) + "\n").encode("utf-8"))
+
+    def _close_spool(self) -> None:
+        if self._spool_fd is not None and self._spool_fd[0] == os.getpid():
+            os.close(self._spool_fd[1])
+            self._spool_fd = None
+
+    def _after_fork(self) -> None:
+        self._merge_lock = threading.Lock()
+        current = threading.current_thread()
+        self._recorders = [r for r in self._recorders if r.thread is current]
+        # the child sends only its own timings to the parent
+        for recorder in self._recorders:
+            recorder.timings.clear()
+        self._timings.clear()
 
     @property
     def references(self):
         """Return a list of unique references."""
-        output = []
-        for record in self.values():
-            output.extend(ref for ref in record.references if ref not in output)
-
-        return output
+        self.merge_pending()
+        return list(self._citations)
 
     def tracking(self, enabled=True):
         """Enable the tracking of references."""
         self.track_references = enabled
 
-    def add_source(self, source: Union[str, Path]) -> None:
+    def profile(self, enabled=True):
+        """Enable the profiling of the referenced objects while tracking.
+
+        Each call of a referenced object is then counted and timed, in wall and
+        CPU time, as is the time spent by r2t2 itself, see `timings` and
+        `overhead`. For generators and coroutines, only the call creating them is
+        timed.
+        """
+        self.profiling = enabled
+
+    def zero_overhead_mode(self, enabled=True):
+        """Enable the zero overhead mode.
+
+        While enabled and not tracking, add_reference returns the decorated
+        objects untouched and only keeps their references in REGISTRY, so they
+        cost nothing to call but can never be tracked at runtime. It must
+        therefore be chosen before importing the code to be decorated.
+        """
+        self.zero_overhead = enabled
+
+    def add_source(
+        self, source: Union[str, Path], package: Optional[str] = None
+    ) -> None:
         """Adds a bibliography source to the list of known sources.
 
+        The citation keys found in the references are looked up in the sources, so
+        that the reports show the full entries.
+
         Args:
             source (str, Path): Path to the references source file. This must be a
                 bibtex file.
+            package (Optional, str): Name of the package the source is for. By
+                default, it is the top level package of the caller.
 
         Raises:
             ValueError if the file is not bibtex.
@@ -67,11 +825,14 @@ class Biblio(dict):
         Returns:
             None
         """
-        module = inspect.getmodule(inspect.stack()[1][0])
-        if module is not None:
-            package = module.__name__.split(".")[0]
-        else:
-            package = ""
+        if package is None:
+            import inspect
+
+            module = inspect.getmodule(inspect.stack()[1][0])
+            if module is not None:
+                package = module.__name__.split(".")[0]
+            else:
+                package = ""
         src = Path(source)
         if src.suffix != ".bib":
             raise ValueError("References sources must be in bibtex format '.bib'")
@@ -83,9 +844,112 @@ class Biblio(dict):
             )
         self._sources[package] = src
 
+    def describe(self, reference: str, description: str) -> None:
+        """Sets the full citation of a reference, e.g. the metadata of a DOI."""
+        self._descriptions[reference] = description
+
+    def citation(self, reference: str) -> Optional[str]:
+        """Returns the full citation of a reference.
+
+        That is its description, if it was given one, or else its BibTeX entry
+        from the sources. The sources are searched in the order they were added.
+        Each one is indexed the first time it is searched, see BibIndex.
+
+        Args:
+            reference (str): A reference, e.g. the key of a Sphinx citation.
+
+        Returns:
+            The text of the citation, or None if there is none.
+        """
+        description = self._descriptions.get(reference)
+        if description is not None:
+            return description
+        for source in self._sources.values():
+            index = self._bib_indexes.get(source)
+            if index is None:
+                index = self._bib_indexes[source] = BibIndex(source)
+            entry = index.get(reference)
+            if entry is not None:
+                return entry
+        return None
+
+
+def _add_counters(
+    totals: Dict[str, List], identifier: str, counters: Sequence
+) -> None:
+    """Adds the calls, times and overhead of a referenced object to the totals."""
+    total = totals.get(identifier)
+    if total is None:
+        totals[identifier] = list(counters[:_TOTALS])
+    else:
+        for index in range(_TOTALS):
+            total[index] += counters[index]
+
 
 BIBLIOGRAPHY: Biblio = Biblio()
 
+REGISTRY: "weakref.WeakKeyDictionary[Callable, List[Tuple[str, str]]]" = (
+    weakref.WeakKeyDictionary()
+)
+"""Short purposes and references of the objects decorated in zero overhead mode.
+
+Static and class methods are registered by their underlying function."""
+
+
+def _inherit_tracking() -> None:
+    """Turns tracking on in child processes started by a tracked parent."""
+    inherited = os.environ.get(CHILD_TRACKING_ENV)
+    if not inherited:
+        return
+    parent, directory = inherited.split(":", 1)
+    if int(parent) != os.getpid():
+        BIBLIOGRAPHY.tracking()
+        BIBLIOGRAPHY._spool = (directory, int(parent))
+        if os.environ.get(CHILD_PROFILING_ENV):
+            BIBLIOGRAPHY.profile()
+
+
+_inherit_tracking()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=BIBLIOGRAPHY._after_fork)
+
+
+def _locate(wrapped: Callable) -> Tuple[str, str, str, int]:
+    """Finds the identifier, name, source file and line of a referenced object.
+
+    Reading the source is expensive, so this is done only the first time each
+    referenced object is called while tracking, and the result is cached.
+    """
+    import inspect
+
+    source = inspect.getsourcefile(wrapped) or inspect.getfile(wrapped)
+    lines, line = inspect.getsourcelines(wrapped)
+    # skip the decorators, to use the same line as the static parsers
+    for offset, text in enumerate(lines):
+        if text.lstrip().startswith(("def ", "async def ", "class ")):
+            line += offset
+            break
+    name = wrapped.__name__
+    return function_identifier(source, name, line), name, source, line
+
+
+def reference_from(
+    *, reference: Optional[str] = None, doi: Optional[str] = None
+) -> str:
+    """Returns the reference given to add_reference, as a DOI URL if it is a DOI.
+
+    Raises:
+        ValueError if both or none of `reference` and `doi` are given.
+    """
+    if reference and doi:
+        raise ValueError("Only one method for providing the reference is allowed.")
+    elif reference:
+        return reference
+    elif doi:
+        return doi if "doi.org" in doi else f"https://doi.org/{doi}"
+    else:
+        raise ValueError("No reference information provided!")
+
 
 def add_reference(
     *, short_purpose: str, reference: Optional[str] = None, doi: Optional[str] = None
@@ -105,34 +969,50 @@ def add_reference(
         doi (Optional, str): DOI of the reference.
 
     Returns:
-        The decorated function.
+        The decorated function, or the function itself if the zero overhead mode
+        is enabled and tracking is off.
     """
-    if reference and doi:
-        raise ValueError("Only one method for providing the reference is allowed.")
-    elif reference:
-        ref = reference
-    elif doi:
-        ref = doi if "doi.org" in doi else f"https://doi.org/{doi}"
-    else:
-        raise ValueError("No reference information provided!")
+    # wrapt is only needed by the code that cites references, not by the CLI
+    import wrapt
 
-    @wrapt.decorator(enabled=lambda: BIBLIOGRAPHY.track_references)
-    def wrapper(wrapped, instance, args, kwargs):
-        source = inspect.getsourcefile(wrapped)
-        line = inspect.getsourcelines(wrapped)[1]
-        identifier = f"{source}:{line}"
+    from .wrappers import ReferenceWrapper
 
-        if identifier in BIBLIOGRAPHY and ref in BIBLIOGRAPHY[identifier].references:
-            return wrapped(*args, **kwargs)
+    ref = reference_from(reference=reference, doi=doi)
 
-        if identifier not in BIBLIOGRAPHY:
-            BIBLIOGRAPHY[identifier] = FunctionReference(
-                wrapped.__name__, line, source, [], []
-            )
+    locations: Dict[Callable, Tuple[str, str, str, int]] = {}
 
-        BIBLIOGRAPHY[identifier].short_purpose.append(short_purpose)
-        BIBLIOGRAPHY[identifier].references.append(ref)
+    @wrapt.decorator(
+        enabled=lambda: BIBLIOGRAPHY.track_references, proxy=ReferenceWrapper
+    )
+    def wrapper(wrapped, instance, args, kwargs):
+        profiling = BIBLIOGRAPHY.profiling
+        entered = time.perf_counter() if profiling else 0.0
+        # methods arrive bound to their instance, so cache the plain function
+        function = getattr(wrapped, "__func__", wrapped)
+        try:
+            identifier, name, source, line = locations[function]
+        except KeyError:
+            identifier, name, source, line = locations[function] = _locate(function)
 
+        BIBLIOGRAPHY.record(identifier, name, line, source, short_purpose, ref)
+        if profiling:
+            return BIBLIOGRAPHY.profiled_call(
+                identifier, entered, wrapped, args, kwargs
+            )
         return wrapped(*args, **kwargs)
 
+    if BIBLIOGRAPHY.zero_overhead and not BIBLIOGRAPHY.track_references:
+
+        def register(wrapped):
+            # static and class methods are registered by their function
+            function = getattr(wrapped, "__func__", wrapped)
+            try:
+                REGISTRY.setdefault(function, []).append((short_purpose, ref))
+            except TypeError:
+                # it cannot be weakly referenced, so it is wrapped as usual
+                return wrapper(wrapped)
+            return wrapped
+
+        return register
+
     return wrapper
@@ -0,0 +1,183 @@
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .core import Biblio, FunctionReference
+from .doi import DOI_URL_PREFIXES, doi_from_reference
+
+
+# SQLite limits the number of parameters of a query
+_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS record (
+    identifier TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    line INTEGER
+);
+CREATE INDEX IF NOT EXISTS record_path ON record (path);
+CREATE INDEX IF NOT EXISTS record_name ON record (name);
+CREATE TABLE IF NOT EXISTS citation (
+    identifier TEXT NOT NULL,
+    short_purpose TEXT NOT NULL,
+    reference TEXT NOT NULL,
+    UNIQUE (identifier, reference)
+);
+CREATE INDEX IF NOT EXISTS citation_reference ON citation (reference);
+"""
+
+
+def _normalise(source: str) -> str:
+    return os.path.normcase(os.path.abspath(source))
+
+
+def reference_variants(reference: str) -> List[str]:
+    """Returns the ways a reference may have been written.
+
+    A DOI may be cited bare or as any of the DOI URLs, so asking for one finds
+    the others. Other references are only found as they are.
+    """
+    doi = doi_from_reference(reference)
+    if doi is None:
+        if not reference.startswith("10."):
+            return [reference]
+        doi = reference
+    return [doi] + [prefix + doi for prefix in DOI_URL_PREFIXES]
+
+
+class BiblioDatabase:
+    """Records of bibliographies stored in a SQLite database.
+
+    Records are indexed by source file, name and reference, so they can be
+    queried without scanning the code again, see `find`. The database is updated
+    with each bibliography stored in it, see `store`.
+
+    Args:
+        path (str, Path): The database. It is created if needed.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._connection = sqlite3.connect(str(path))
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def store(
+        self, biblio: Biblio, replace: Optional[Iterable[Union[str, Path]]] = None
+    ) -> None:
+        """Adds the records of a bibliography, in a single transaction.
+
+        The references of records already in the database are added to them, as
+        in Biblio.add, so runs of different scripts accumulate.
+
+        Args:
+            biblio (Biblio): The bibliography.
+            replace (list): Files that were analysed again. Their records in the
+                database are removed first, so the records of code that was
+                changed or removed are not kept.
+        """
+        with self._connection as connection:
+            if replace is not None:
+                replaced = [_normalise(str(source)) for source in replace]
+                for start in range(0, len(replaced), _CHUNK):
+                    chunk = replaced[start:start + _CHUNK]
+                    marks = ",".join("?" * len(chunk))
+                    connection.execute(
+                        "DELETE FROM citation WHERE identifier IN"
+                        f" (SELECT identifier FROM record WHERE path IN ({marks}))",
+                        chunk,
+                    )
+                    connection.execute(
+                        f"DELETE FROM record WHERE path IN ({marks})", chunk
+                    )
+
+            paths: Dict[str, str] = {}
+            records: List[Tuple[str, str, str, str, Optional[int]]] = []
+            citations: List[Tuple[str, str, str]] = []
+            for identifier, record in biblio.items():
+                path = paths.get(record.source)
+                if path is None:
+                    path = paths[record.source] = _normalise(record.source)
+                records.append(
+                    (identifier, record.name, record.source, path, record.line)
+                )
+                citations.extend(
+                    (identifier, short, ref)
+                    for short, ref in zip(record.short_purpose, record.references)
+                )
+            connection.executemany(
+                "INSERT OR IGNORE INTO record VALUES (?, ?, ?, ?, ?)", records
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO citation VALUES (?, ?, ?)", citations
+            )
+
+    def find(
+        self,
+        reference: Optional[str] = None,
+        path: Optional[Union[str, Path]] = None,
+        name: Optional[str] = None,
+    ) -> Iterator[Tuple[str, FunctionReference]]:
+        """Finds the records matching all the criteria given.
+
+        Args:
+            reference (str): A reference the records cite, see
+                `reference_variants`.
+            path (str, Path): File or folder the records are in.
+            name (str): Name of the referenced objects.
+
+        Returns:
+            The identifier and record of each object, sorted by source file and
+            line, with all the references of the object.
+        """
+        conditions = []
+        parameters: List[object] = []
+        if path is not None:
+            folder = _normalise(str(path))
+            # a range over the index of the paths, rather than LIKE
+            conditions.append("(r.path = ? OR (r.path > ? AND r.path < ?))")
+            parameters.extend(
+                [folder, folder + os.sep, folder + chr(ord(os.sep) + 1)]
+            )
+        if name is not None:
+            conditions.append("r.name = ?")
+            parameters.append(name)
+        if reference is not None:
+            variants = reference_variants(reference)
+            conditions.append(
+                "r.identifier IN (SELECT identifier FROM citation"
+                f" WHERE reference IN ({','.join('?' * len(variants))}))"
+            )
+            parameters.extend(variants)
+
+        rows = self._connection.execute(
+            "SELECT r.identifier, r.name, r.source, r.line, c.short_purpose,"
+            " c.reference FROM record r LEFT JOIN citation c"
+            " ON c.identifier = r.identifier"
+            + (" WHERE " + " AND ".join(conditions) if conditions else "")
+            + " ORDER BY r.path, r.line, r.identifier, c.rowid",
+            parameters,
+        )
+        current: Optional[Tuple[str, FunctionReference]] = None
+        for identifier, found, source, line, short, ref in rows:
+            if current is None or current[0] != identifier:
+                if current is not None:
+                    yield current
+                current = identifier, FunctionReference(found, line, source, [], [])
+            if ref is not None:
+                current[1].short_purpose.append(short)
+                current[1].references.append(ref)
+        if current is not None:
+            yield current
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "BiblioDatabase":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
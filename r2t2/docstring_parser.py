@@ -1,16 +1,12 @@
 import ast
 import logging
-import json
 from pathlib import Path
 from typing import Iterable, NamedTuple, Union, Optional
 
+from .notebook import iter_markdown_cells
+
 
 LOGGER = logging.getLogger(__name__)
-FAKE_FUNC = """def cell_{}():
-    \"\"\"
-    {}
-    \"\"\"
-"""
 
 
 DEFAULT_ENCODING = 'utf-8'
@@ -55,25 +51,29 @@ def iter_extract_docstring_from_lines(
     return iter_extract_docstring_from_text('\n'.join(lines))
 
 
+def iter_extract_docstring_from_notebook(
+    path: Union[str, Path],
+    encoding: str = DEFAULT_ENCODING
+) -> Iterable[CodeDocumentComment]:
+    """Yields the text of each markdown cell, named after its index, without line."""
+    for index, text in iter_markdown_cells(path, encoding=encoding):
+        yield CodeDocumentComment(
+            filename=str(path),
+            lineno=None,
+            name=f'cell_{index}',
+            text=text
+        )
+
+
 def iter_extract_docstring_from_file(
     path: Union[str, Path],
     encoding: str = DEFAULT_ENCODING
 ) -> Iterable[CodeDocumentComment]:
     path = Path(path)
-    txt = path.read_text(encoding=encoding)
-    notebook = False
     if path.suffix == ".ipynb":
-        cells = json.loads(txt)["cells"]
-        txt_parts = []
-        # extract the markdown text from all markdown cells, and make each of
-        # them look like the docstring of a separate function
-        for i, c in enumerate(cells):
-            if c["cell_type"] == "markdown":
-                txt_parts.append(FAKE_FUNC.format(i, "    ".join(c["source"])))
-        txt = "\n".join(txt_parts)
-        notebook = True
-    return iter_extract_docstring_from_text(txt, filename=str(path),
-                                            notebook=notebook)
+        return iter_extract_docstring_from_notebook(path, encoding=encoding)
+    txt = path.read_text(encoding=encoding)
+    return iter_extract_docstring_from_text(txt, filename=str(path))
 
 
 def iter_extract_docstring_from_files(
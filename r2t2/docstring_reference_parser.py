@@ -3,10 +3,17 @@ import os
 from pathlib import Path
 from typing import Iterable, List, Tuple, Union
 
-from r2t2.core import Biblio, BIBLIOGRAPHY, FunctionReference
-from r2t2.plain_text_parser import iter_parse_plain_text_references
+from r2t2.core import Biblio, BIBLIOGRAPHY, FunctionReference, function_identifier
+from r2t2.parallel import map_files
+from r2t2.plain_text_parser import (
+    parse_plain_text_references,
+    parse_plain_text_references_batch
+)
+from r2t2.prefilter import may_contain_references
 from r2t2.docstring_parser import (
+    DEFAULT_ENCODING,
     CodeDocumentComment,
+    iter_extract_docstring_from_file,
     iter_extract_docstring_from_files
 )
 
@@ -18,25 +25,58 @@ DOCSTRING_SHORT_PURPOSE = 'automatically parsed from docstring'
 NOTEBOOK_SHORT_PURPOSE = 'automatically parsed from markdown cell'
 
 
-def expand_file_list(path: Union[Path, str]) -> List[Path]:
+NOTEBOOK_CHECKPOINTS = '.ipynb_checkpoints'
+
+
+def expand_file_list(path: Union[Path, str], notebook: bool = False) -> List[Path]:
+    """Returns the files to parse for a target file or folder.
+
+    In a folder, the Python files are found recursively or, if `notebook` is
+    True, the Jupyter notebooks, leaving out the copies saved by Jupyter in
+    checkpoint folders.
+    """
     if os.path.isdir(path):
-        return sorted(Path(path).rglob("*.py"))
+        pattern = '*.ipynb' if notebook else '*.py'
+        return sorted(
+            filename for filename in Path(path).rglob(pattern)
+            if NOTEBOOK_CHECKPOINTS not in filename.parts
+        )
     else:
         return [Path(path)]
 
 
 def get_function_reference_identifier(function_reference: FunctionReference) -> str:
-    return "{source}:{name}:{line_num}".format(
-        source=function_reference.source,
-        line_num=function_reference.line or "n/a",
-        name=function_reference.name,
+    return function_identifier(
+        function_reference.source,
+        function_reference.name,
+        function_reference.line,
     )
 
 
 def get_function_reference_from_docstring(
     docstring: CodeDocumentComment
 ) -> FunctionReference:
-    references = list(iter_parse_plain_text_references(docstring.text))
+    references = parse_plain_text_references(docstring.text)
+    return _get_function_reference(docstring, references)
+
+
+def get_function_references_from_docstrings(
+    docstrings: Iterable[CodeDocumentComment]
+) -> List[FunctionReference]:
+    """Returns a record for each docstring, parsing all their texts in one call."""
+    docstrings = list(docstrings)
+    return [
+        _get_function_reference(docstring, references)
+        for docstring, references in zip(
+            docstrings,
+            parse_plain_text_references_batch(d.text for d in docstrings)
+        )
+    ]
+
+
+def _get_function_reference(
+    docstring: CodeDocumentComment, references: List[str]
+) -> FunctionReference:
     if docstring.lineno is not None:
         purpose = DOCSTRING_SHORT_PURPOSE
     else:
@@ -61,15 +101,37 @@ def iter_parse_docstring_function_references_from_files(
             yield identifier, function_reference
 
 
+def get_docstring_function_references_from_file(
+    filename: Union[str, Path],
+    **kwargs
+) -> List[Tuple[str, FunctionReference]]:
+    references: List[Tuple[str, FunctionReference]] = []
+    if Path(filename).suffix == '.py' and not may_contain_references(
+        filename, kwargs.get('encoding', DEFAULT_ENCODING), docstrings=True
+    ):
+        return references
+    for function_reference in get_function_references_from_docstrings(
+        iter_extract_docstring_from_file(filename, **kwargs)
+    ):
+        if function_reference.references:
+            identifier = get_function_reference_identifier(function_reference)
+            references.append((identifier, function_reference))
+    return references
+
+
 def parse_and_add_docstring_references_from_files(
     filenames: Iterable[Union[str, Path]],
     biblio: Biblio = None,
+    jobs: int = 1,
     **kwargs
 ):
     if biblio is None:
         biblio = BIBLIOGRAPHY
-    for key, ref in iter_parse_docstring_function_references_from_files(
-        filenames, **kwargs
+    for references in map_files(
+        get_docstring_function_references_from_file,
+        list(filenames),
+        jobs=jobs,
+        **kwargs
     ):
-        if key not in biblio:
-            biblio[key] = ref
+        for key, ref in references:
+            biblio.add(ref, key)
@@ -0,0 +1,211 @@
+import ast
+import logging
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .core import BIBLIOGRAPHY, Biblio, function_identifier
+from .docstring_parser import DEFAULT_ENCODING
+from .docstring_reference_parser import DOCSTRING_SHORT_PURPOSE
+from .plain_text_parser import parse_plain_text_references_batch
+from .prefilter import may_contain_references
+
+
+LOGGER = logging.getLogger(__name__)
+
+_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+# tools ids free for general use come first, see sys.monitoring
+_TOOL_IDS = (3, 4, 2, 1)
+
+CodeKey = Tuple[str, int, str]
+"""Source file, first line and name of the code object of a function."""
+
+CitedFunction = Tuple[str, str, int, str, List[str]]
+"""Identifier, name, line, source file and references of a function."""
+
+
+def _normalise(filename: str) -> str:
+    return os.path.normcase(os.path.abspath(filename))
+
+
+def find_cited_functions(
+    text: str, filename: str
+) -> List[Tuple[CodeKey, CitedFunction]]:
+    """Finds the functions citing references in their docstring in some source.
+
+    Args:
+        text (str): The Python source.
+        filename (str): Name of the file the source comes from.
+
+    Returns:
+        The key of the code object of each function, and the function. The first
+        line of a code object is that of its first decorator, while the line of
+        the function is that of its `def`, like in the other records.
+    """
+    try:
+        tree = ast.parse(text, filename=filename)
+    except SyntaxError as exc:
+        LOGGER.warning("skipping %s, which is not valid Python: %s", filename, exc)
+        return []
+
+    nodes = [
+        node
+        for node in ast.walk(tree)
+        if isinstance(node, _FUNCTIONS) and ast.get_docstring(node)
+    ]
+    source = _normalise(filename)
+    found = []
+    for node, references in zip(
+        nodes,
+        parse_plain_text_references_batch(
+            ast.get_docstring(node) or "" for node in nodes
+        ),
+    ):
+        if not references:
+            continue
+        first_line = min(
+            [node.lineno] + [decorator.lineno for decorator in node.decorator_list]
+        )
+        identifier = function_identifier(filename, node.name, node.lineno)
+        found.append((
+            (source, first_line, node.name),
+            (identifier, node.name, node.lineno, filename, references),
+        ))
+    return found
+
+
+def index_cited_functions(
+    filenames: Iterable[Union[str, Path]], encoding: str = DEFAULT_ENCODING
+) -> Dict[CodeKey, CitedFunction]:
+    """Indexes the functions citing references in their docstring, by code object.
+
+    Files without any reference token are skipped without being parsed.
+
+    Args:
+        filenames (list): The Python files.
+        encoding (str): Encoding of the files.
+
+    Returns:
+        The functions, by source file, first line and name of their code object.
+    """
+    index: Dict[CodeKey, CitedFunction] = {}
+    for filename in filenames:
+        if not may_contain_references(filename, encoding, docstrings=True):
+            continue
+        with open(filename, encoding=encoding) as f:
+            text = f.read()
+        index.update(find_cited_functions(text, str(filename)))
+    LOGGER.debug("indexed %d functions citing references", len(index))
+    return index
+
+
+class DocstringTracker:
+    """Records the functions citing references in their docstring when they run.
+
+    The first execution of each code object is looked up in the index. On Python
+    3.12 and later, sys.monitoring then stops reporting that code object, so the
+    functions run at full speed afterwards. On older versions, a profile function
+    is set for all threads instead, until every indexed function has run.
+
+    Args:
+        index (dict): The functions to track, see `index_cited_functions`.
+        biblio (Biblio): Where the functions are recorded. The bibliography must
+            be tracking references.
+    """
+
+    def __init__(
+        self, index: Dict[CodeKey, CitedFunction], biblio: Biblio = BIBLIOGRAPHY
+    ):
+        self.index = index
+        self.biblio = biblio
+        self._remaining = len(index)
+        self._paths: Dict[str, str] = {}
+        self._tool: Optional[int] = None
+        self._seen: set = set()
+        self._found: set = set()
+        self._lock = threading.Lock()
+
+    def _check(self, code) -> None:
+        """Records the function of a code object that runs for the first time."""
+        path = self._paths.get(code.co_filename)
+        if path is None:
+            path = self._paths[code.co_filename] = _normalise(code.co_filename)
+        key = (path, code.co_firstlineno, code.co_name)
+        cited = self.index.get(key)
+        if cited is None:
+            return
+        # several threads may start running the same code object
+        with self._lock:
+            if key not in self._found:
+                self._found.add(key)
+                self._remaining -= 1
+        identifier, name, line, source, references = cited
+        for ref in references:
+            self.biblio.record(
+                identifier, name, line, source, DOCSTRING_SHORT_PURPOSE, ref
+            )
+
+    def _on_start(self, code, offset):
+        self._check(code)
+        if self._remaining <= 0:
+            sys.monitoring.set_events(self._tool, 0)  # type: ignore
+        return sys.monitoring.DISABLE  # type: ignore
+
+    def _profile(self, frame, event, arg):
+        if self._remaining <= 0:
+            # every function was found, so each thread stops at its next event
+            sys.setprofile(None)
+            threading.setprofile(None)  # type: ignore
+            return
+        if event != "call":
+            return
+        code = frame.f_code
+        if code in self._seen:
+            return
+        self._seen.add(code)
+        self._check(code)
+
+    def start(self) -> None:
+        if not self.index:
+            return
+        monitoring = getattr(sys, "monitoring", None)
+        if monitoring is None:
+            threading.setprofile(self._profile)
+            sys.setprofile(self._profile)
+            return
+        for tool in _TOOL_IDS:
+            try:
+                monitoring.use_tool_id(tool, "r2t2")
+            except ValueError:
+                continue
+            self._tool = tool
+            break
+        else:
+            raise RuntimeError("no sys.monitoring tool id is free for r2t2")
+        monitoring.register_callback(
+            self._tool, monitoring.events.PY_START, self._on_start
+        )
+        monitoring.set_events(self._tool, monitoring.events.PY_START)
+
+    def stop(self) -> None:
+        if self._tool is not None:
+            monitoring = sys.monitoring  # type: ignore
+            monitoring.set_events(self._tool, 0)
+            monitoring.register_callback(
+                self._tool, monitoring.events.PY_START, None
+            )
+            monitoring.free_tool_id(self._tool)
+            self._tool = None
+        elif self.index:
+            sys.setprofile(None)
+            threading.setprofile(None)  # type: ignore
+
+    def __enter__(self) -> "DocstringTracker":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_ENDPOINT = "https://doi.org"
+"""Resolver queried for the metadata of a DOI, as '<endpoint>/<DOI>'."""
+
+DEFAULT_CONCURRENCY = 8
+
+CSL_JSON = "application/vnd.citationstyles.csl+json"
+
+DOI_URL_PREFIXES = ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/")
+
+
+def default_cache_path() -> Path:
+    """Returns the cache shared by all runs of the user, in the XDG cache folder."""
+    root = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(root) / "r2t2" / "doi.sqlite"
+
+
+def doi_from_reference(reference: str) -> Optional[str]:
+    """Returns the DOI of a reference given as a DOI URL, or None."""
+    for prefix in DOI_URL_PREFIXES:
+        if reference.startswith(prefix):
+            return reference[len(prefix):]
+    return None
+
+
+class DoiMetadata(NamedTuple):
+    doi: str
+    title: str
+    authors: List[str]
+    year: Optional[int]
+
+    def __str__(self) -> str:
+        year = f" ({self.year})" if self.year is not None else ""
+        return f"{', '.join(self.authors)}{year}. {self.title}"
+
+
+def _metadata_from_csl(doi: str, csl: dict) -> DoiMetadata:
+    title = csl.get("title") or ""
+    if isinstance(title, list):
+        title = title[0] if title else ""
+    authors = [
+        " ".join(filter(None, [author.get("given"), author.get("family")]))
+        or author.get("literal", "")
+        for author in csl.get("author", [])
+    ]
+    year = None
+    for field in ("issued", "published-print", "published-online", "created"):
+        parts = csl.get(field, {}).get("date-parts") or [[None]]
+        if parts[0] and parts[0][0] is not None:
+            year = int(parts[0][0])
+            break
+    return DoiMetadata(doi, title, authors, year)
+
+
+class DoiCache:
+    """Metadata of the DOIs already resolved, in a SQLite database.
+
+    DOIs the resolver does not know are remembered too, so that no DOI is
+    requested twice.
+
+    Args:
+        path (str, Path): The database. It is created if needed.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(path))
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS doi ("
+                " doi TEXT PRIMARY KEY, metadata TEXT, fetched REAL)"
+            )
+
+    def get(self, dois: Iterable[str]) -> Dict[str, Optional[DoiMetadata]]:
+        """Returns the metadata of the DOIs in the cache, None for unknown DOIs."""
+        found: Dict[str, Optional[DoiMetadata]] = {}
+        dois = list(dois)
+        # SQLite limits the number of parameters of a query
+        for start in range(0, len(dois), 500):
+            chunk = dois[start:start + 500]
+            rows = self._connection.execute(
+                "SELECT doi, metadata FROM doi WHERE doi IN (%s)"
+                % ",".join("?" * len(chunk)),
+                chunk,
+            )
+            for doi, metadata in rows:
+                found[doi] = None if metadata is None else DoiMetadata(
+                    *json.loads(metadata)
+                )
+        return found
+
+    def put(self, doi: str, metadata: Optional[DoiMetadata]) -> None:
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO doi VALUES (?, ?, ?)",
+                (doi, None if metadata is None else json.dumps(metadata), time.time()),
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class DoiResolver:
+    """Fetches the title, authors and year of DOIs, at most once each.
+
+    Requests are made concurrently, up to `concurrency` at a time, and the
+    requests for a DOI already being fetched wait for that one. Results are kept
+    in a DoiCache, so each DOI is only ever requested once.
+
+    Args:
+        cache (str, Path): The SQLite cache. By default, it is shared by all the
+            runs of the user.
+        endpoint (str): URL of the resolver, queried for CSL JSON at
+            '<endpoint>/<DOI>'.
+        concurrency (int): Maximum number of simultaneous requests.
+        timeout (float): Timeout of each request, in seconds.
+        offline (bool): If True, the DOIs are only looked up in the cache.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[Union[str, Path]] = None,
+        endpoint: str = DEFAULT_ENDPOINT,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: float = 10.0,
+        offline: bool = False,
+    ):
+        self.cache = DoiCache(cache or default_cache_path())
+        self.endpoint = endpoint.rstrip("/")
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.offline = offline
+        self.requests = 0
+        self._in_flight: Dict[str, "asyncio.Future[Optional[DoiMetadata]]"] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _fetch(self, doi: str) -> Optional[DoiMetadata]:
+        """Requests the metadata of a DOI. Blocking, so run in an executor."""
+        url = f"{self.endpoint}/{urllib.parse.quote(doi, safe='/')}"
+        request = urllib.request.Request(url, headers={"Accept": CSL_JSON})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return _metadata_from_csl(doi, json.load(response))
+        except urllib.error.HTTPError as exc:
+            if exc.code == 404:
+                return None
+            raise
+
+    async def _resolve_uncached(self, doi: str) -> Optional[DoiMetadata]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_event_loop()
+            self.requests += 1
+            try:
+                metadata = await loop.run_in_executor(None, self._fetch, doi)
+            except (OSError, ValueError) as exc:
+                # not cached, so that it is tried again in the next runs
+                LOGGER.warning("could not resolve DOI %s: %r", doi, exc)
+                return None
+        self.cache.put(doi, metadata)
+        return metadata
+
+    async def resolve(self, doi: str) -> Optional[DoiMetadata]:
+        """Returns the metadata of a DOI, or None if it cannot be resolved."""
+        cached = self.cache.get([doi])
+        if doi in cached or self.offline:
+            return cached.get(doi)
+        future = self._in_flight.get(doi)
+        if future is None:
+            # later requests for the same DOI wait for this one
+            future = asyncio.ensure_future(self._resolve_uncached(doi))
+            self._in_flight[doi] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(doi, None))
+        return await asyncio.shield(future)
+
+    async def resolve_many(
+        self, dois: Iterable[str]
+    ) -> Dict[str, Optional[DoiMetadata]]:
+        """Returns the metadata of each DOI, looking up the cache in one query."""
+        dois = list(dict.fromkeys(dois))
+        results = self.cache.get(dois)
+        missing = [doi for doi in dois if doi not in results]
+        if missing and not self.offline:
+            fetched = await asyncio.gather(*(self.resolve(doi) for doi in missing))
+            results.update(zip(missing, fetched))
+        return {doi: results.get(doi) for doi in dois}
+
+    def resolve_all(self, dois: Iterable[str]) -> Dict[str, Optional[DoiMetadata]]:
+        """Blocking version of resolve_many, for code that is not asynchronous."""
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(self.concurrency)
+        loop.set_default_executor(executor)
+        try:
+            return loop.run_until_complete(self.resolve_many(dois))
+        finally:
+            self._semaphore = None
+            loop.close()
+            executor.shutdown()
+
+
+def resolve_bibliography(biblio, resolver: DoiResolver) -> int:
+    """Describes the DOI references of a bibliography with their metadata.
+
+    Args:
+        biblio (Biblio): The bibliography, whose writers then show the title,
+            authors and year of each DOI they can.
+        resolver (DoiResolver): The resolver of the DOIs.
+
+    Returns:
+        The number of DOIs resolved.
+    """
+    dois = {}
+    for reference in biblio.references:
+        doi = doi_from_reference(reference)
+        if doi is not None:
+            dois[reference] = doi
+    metadata = resolver.resolve_all(dois.values())
+    resolved = 0
+    for reference, doi in dois.items():
+        if metadata.get(doi) is not None:
+            biblio.describe(reference, str(metadata[doi]))
+            resolved += 1
+    return resolved
@@ -0,0 +1,210 @@
+import json
+import re
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple, Union
+
+
+DEFAULT_ENCODING = 'utf-8'
+
+_CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_ESCAPED_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_NESTED_BODY = re.compile(r'[^"{}\[\]]*')
+_SCALAR = re.compile(r'[^,:{}\[\]\s"]*')
+
+
+class _JsonStream:
+    """Pull parser reading a JSON document a chunk at a time.
+
+    Values can be skipped without being kept in memory, however large they are,
+    so only the chunk being read and the values actually read take memory.
+    """
+
+    def __init__(self, f: IO[str]):
+        self._file = f
+        self._buffer = ''
+        self._pos = 0
+        self._found: Dict[str, int] = {}
+
+    def _fill(self) -> bool:
+        """Reads the next chunk, dropping what was consumed. False at the end."""
+        chunk = self._file.read(_CHUNK_SIZE)
+        if not chunk:
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        self._found.clear()
+        return True
+
+    def peek(self) -> str:
+        """Returns the next character that is not whitespace, without consuming it."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()  # type: ignore
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError('unexpected end of JSON document')
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f'expected {char!r} in JSON document, found {found!r}')
+        self._pos += 1
+
+    def _find(self, char: str) -> int:
+        """Returns the position of the next char in the buffer, or its length.
+
+        Positions are remembered, so that many escape sequences before a distant
+        quote do not make each search go up to it again.
+        """
+        found = self._found.get(char, -1)
+        if found < self._pos:
+            found = self._buffer.find(char, self._pos)
+            if found < 0:
+                found = len(self._buffer)
+            self._found[char] = found
+        return found
+
+    def _read_string(self, keep: bool) -> Optional[str]:
+        self.expect('"')
+        parts = []
+        while True:
+            end = self._find('"')
+            if self._find('\\') < end:
+                # escape sequences are rare and skipped in C, up to a lone
+                # backslash at the end of the buffer
+                match = _ESCAPED_STRING_BODY.match(self._buffer, self._pos)
+                end = match.end()  # type: ignore
+            if keep:
+                parts.append(self._buffer[self._pos:end])
+            self._pos = end
+            if end < len(self._buffer) and self._buffer[end] == '"':
+                self._pos += 1
+                break
+            if not self._fill():
+                raise ValueError('unterminated string in JSON document')
+        if not keep:
+            return None
+        return json.loads('"' + ''.join(parts) + '"')
+
+    def _read_scalar(self) -> Any:
+        parts = []
+        while True:
+            end = _SCALAR.match(self._buffer, self._pos).end()  # type: ignore
+            parts.append(self._buffer[self._pos:end])
+            self._pos = end
+            if end < len(self._buffer) or not self._fill():
+                return json.loads(''.join(parts))
+
+    def read_value(self) -> Any:
+        """Reads the next value, which should be small."""
+        char = self.peek()
+        if char == '"':
+            return self._read_string(keep=True)
+        if char == '[':
+            return [self.read_value() for _ in self.iter_array()]
+        if char == '{':
+            return {key: self.read_value() for key in self.iter_object()}
+        return self._read_scalar()
+
+    def skip_value(self):
+        """Skips the next value, keeping no more than a chunk of it in memory."""
+        char = self.peek()
+        if char == '"':
+            self._read_string(keep=False)
+            return
+        if char not in '{[':
+            self._read_scalar()
+            return
+        depth = 0
+        while True:
+            end = _NESTED_BODY.match(self._buffer, self._pos).end()  # type: ignore
+            self._pos = end
+            if end == len(self._buffer):
+                if not self._fill():
+                    raise ValueError('unexpected end of JSON document')
+                continue
+            char = self._buffer[end]
+            if char == '"':
+                self._read_string(keep=False)
+                continue
+            self._pos += 1
+            depth += 1 if char in '{[' else -1
+            if not depth:
+                return
+
+    def iter_object(self) -> Iterator[str]:
+        """Yields the keys of the next object; each value must then be consumed."""
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self._read_string(keep=True)
+            self.expect(':')
+            yield key  # type: ignore
+            if self.peek() != ',':
+                self.expect('}')
+                return
+            self._pos += 1
+
+    def iter_array(self) -> Iterator[int]:
+        """Yields the index of each item of the next array, which must be consumed."""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            if self.peek() != ',':
+                self.expect(']')
+                return
+            self._pos += 1
+            index += 1
+
+
+def _join_source(source: Union[str, List[str]]) -> str:
+    return source if isinstance(source, str) else ''.join(source)
+
+
+def iter_markdown_cells(
+    path: Union[str, Path], encoding: str = DEFAULT_ENCODING
+) -> Iterator[Tuple[int, str]]:
+    """Yields the text of the markdown cells of a Jupyter notebook.
+
+    The notebook is streamed: the outputs and attachments of the cells, like the
+    sources of the other cells, are skipped without being kept in memory, so the
+    memory used does not depend on their size.
+
+    Args:
+        path (str, Path): The notebook.
+        encoding (str): Encoding of the notebook.
+
+    Raises:
+        ValueError if the notebook is not valid JSON.
+
+    Returns:
+        An iterator over the index of each markdown cell among all the cells, and
+        its text.
+    """
+    with open(path, encoding=encoding) as f:
+        stream = _JsonStream(f)
+        for key in stream.iter_object():
+            if key != 'cells':
+                stream.skip_value()
+                continue
+            for index in stream.iter_array():
+                cell_type = None
+                source = None
+                for cell_key in stream.iter_object():
+                    if cell_key == 'cell_type':
+                        cell_type = stream.read_value()
+                    elif cell_key == 'source' and cell_type in (None, 'markdown'):
+                        # the keys are usually sorted, cell_type coming first
+                        source = stream.read_value()
+                    else:
+                        stream.skip_value()
+                if cell_type == 'markdown' and source:
+                    yield index, _join_source(source)
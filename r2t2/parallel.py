@@ -0,0 +1,46 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterator, Sequence, TypeVar, Union
+
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def map_files(
+    func: Callable[..., T],
+    filenames: Sequence[Union[str, Path]],
+    jobs: int = 1,
+    **kwargs
+) -> Iterator[T]:
+    """Applies a function to each file, spreading the work across processes.
+
+    Results are yielded in the order of `filenames`, whatever the number of jobs,
+    so the output does not depend on it.
+
+    Args:
+        func (Callable): Function taking a filename and `kwargs`. It must be
+            picklable, i.e. defined at module level, if `jobs` is more than 1.
+        filenames (Sequence): Files to process.
+        jobs (int): Number of worker processes. With 1, files are processed in
+            the current process.
+
+    Returns:
+        An iterator over the results of `func`.
+    """
+    if jobs <= 1 or len(filenames) < 2:
+        for filename in filenames:
+            yield func(filename, **kwargs)
+        return
+
+    # a few chunks per worker amortise the communication while keeping the
+    # workers busy until the end
+    chunksize = max(1, len(filenames) // (jobs * 4))
+    LOGGER.debug("processing %d files in %d jobs", len(filenames), jobs)
+    with ProcessPoolExecutor(jobs) as executor:
+        yield from executor.map(
+            partial(func, **kwargs), filenames, chunksize=chunksize
+        )
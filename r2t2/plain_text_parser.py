@@ -1,6 +1,6 @@
 import re
 
-from typing import Iterable, List
+from typing import Dict, Iterable, Iterator, List, Tuple
 
 
 DOI_URL_HTTPS_PREFIX = 'https://doi.org/'
@@ -37,11 +37,151 @@ def iter_parse_plain_text_bib_references(text: str) -> Iterable[str]:
             yield ref_name.strip()
 
 
+# the start of every kind of reference: a DOI, a Sphinx citation, and a LaTeX or
+# Doxygen citation, told apart by their first character; they cannot overlap, so
+# none is hidden by another (without groups, the search is also much faster)
+_TRIGGERS = re.compile(r'10\.|:cite:`|\\cite')
+_DOI = re.compile(r'\b10\.\d{4,}/\S+')
+_DOXYGEN = re.compile(r'\\cite\s(\S+)')
+_SPHINX_PREFIX_LENGTH = len(':cite:`')
+_LATEX_PREFIX_LENGTH = len('\\cite')
+
+
+class _Closers:
+    """Finds the next closing characters in a text, never searching twice.
+
+    A citation without its closing character, repeated many times, would
+    otherwise make each attempt search up to the end of the text.
+    """
+
+    def __init__(self, text: str, end: int):
+        self.text = text
+        self.end = end
+        # character -> (start of the last search, position found or -1)
+        self._found: Dict[str, Tuple[int, int]] = {}
+
+    def find(self, char: str, start: int) -> int:
+        known = self._found.get(char)
+        if known is not None and known[0] <= start and (
+            known[1] == -1 or known[1] >= start
+        ):
+            return known[1]
+        found = self.text.find(char, start, self.end)
+        self._found[char] = (start, found)
+        return found
+
+
+def _match_latex(text: str, start: int, closers: _Closers) -> Tuple[str, int]:
+    """Returns the names and end of `\\cite[...]{...}` at start, or ('', -1)."""
+    position = start + _LATEX_PREFIX_LENGTH
+    if text.startswith('[', position, closers.end):
+        position = closers.find(']', position + 1) + 1
+        if not position:
+            return '', -1
+    if not text.startswith('{', position, closers.end):
+        return '', -1
+    close = closers.find('}', position + 1)
+    if close <= position + 1:
+        return '', -1
+    return text[position + 1:close], close + 1
+
+
+def _split_names(raw_references: List[str]) -> Iterator[str]:
+    for raw_reference in raw_references:
+        for ref_name in raw_reference.split(','):
+            yield ref_name.strip()
+
+
+def _scan(text: str, start: int, end: int, triggers: Iterable) -> List[str]:
+    """Finds the references of all kinds in text[start:end] in one pass.
+
+    Each kind keeps the position its next match may start from, so the matches
+    are those of a separate search for each kind, and they are returned in the
+    same order: DOIs, Sphinx and LaTeX citations, then Doxygen ones.
+    """
+    dois: List[str] = []
+    sphinx: List[str] = []
+    latex: List[str] = []
+    doxygen: List[str] = []
+    doi_from = sphinx_from = latex_from = doxygen_from = start
+    closers = _Closers(text, end)
+    for trigger in triggers:
+        position = trigger.start()
+        kind = text[position]
+        if kind == '1':
+            if position >= doi_from:
+                match = _DOI.match(text, position, end)
+                if match:
+                    dois.append(DOI_URL_HTTPS_PREFIX + match.group())
+                    doi_from = match.end()
+        elif kind == ':':
+            if position >= sphinx_from:
+                body = position + _SPHINX_PREFIX_LENGTH
+                close = closers.find('`', body)
+                if close > body:
+                    sphinx.append(text[body:close])
+                    sphinx_from = close + 1
+        else:
+            if position >= latex_from:
+                names, latex_end = _match_latex(text, position, closers)
+                if latex_end >= 0:
+                    latex.append(names)
+                    latex_from = latex_end
+            if position >= doxygen_from:
+                match = _DOXYGEN.match(text, position, end)
+                if match:
+                    doxygen.append(match.group(1))
+                    doxygen_from = match.end()
+    if sphinx:
+        dois.extend(_split_names(sphinx))
+    if latex:
+        dois.extend(_split_names(latex))
+    if doxygen:
+        dois.extend(doxygen)
+    return dois
+
+
 def iter_parse_plain_text_references(text: str) -> Iterable[str]:
-    yield from iter_doi(text)
-    yield from iter_parse_plain_text_bib_references(text)
-    yield from iter_doxygen_reference_names(text)
+    yield from parse_plain_text_references(text)
 
 
 def parse_plain_text_references(text: str) -> List[str]:
-    return list(iter_parse_plain_text_references(text))
+    """Returns the DOIs and citations in a text, scanning it once.
+
+    The result is the same as running the search for each kind in turn, but the
+    time taken is linear in the length of the text, whatever its content.
+    """
+    first = _TRIGGERS.search(text)
+    if first is None:
+        return []
+    return _scan(text, 0, len(text), _TRIGGERS.finditer(text, first.start()))
+
+
+def parse_plain_text_references_batch(texts: Iterable[str]) -> List[List[str]]:
+    """Returns the references in each of many texts, e.g. the docstrings of a file.
+
+    The texts are joined and searched for the start of references at once, and
+    only those containing some are scanned further. No reference spans two texts.
+
+    Args:
+        texts (Iterable[str]): The texts to parse.
+
+    Returns:
+        The references of each text, in the order of `texts`.
+    """
+    texts = list(texts)
+    # a line break ends the DOIs and Doxygen names, which cannot contain spaces
+    joined = '\n'.join(texts)
+    triggers = iter(_TRIGGERS.finditer(joined))
+    trigger = next(triggers, None)
+    results = []
+    start = 0
+    for text in texts:
+        end = start + len(text)
+        in_text = []
+        while trigger is not None and trigger.start() < end:
+            in_text.append(trigger)
+            trigger = next(triggers, None)
+        results.append(_scan(joined, start, end, in_text) if in_text else [])
+        start = end + 1
+    return results
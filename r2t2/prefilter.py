@@ -0,0 +1,52 @@
+import codecs
+import mmap
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+
+# every way of importing or calling the decorator spells its name out
+DECORATOR_TRIGGERS = re.compile(rb"add_reference")
+
+# the same, or the start of a citation in a docstring: Sphinx and LaTeX or Doxygen
+# citations, and DOIs, without the word boundary so that no DOI can be missed
+DOCSTRING_TRIGGERS = re.compile(rb"add_reference|:cite:|\\cite|10\.\d{4,}/")
+
+
+@lru_cache(maxsize=None)
+def is_ascii_compatible(encoding: str) -> bool:
+    """Whether the trigger tokens are encoded as ASCII in `encoding`."""
+    try:
+        return codecs.encode("add_reference", encoding) == b"add_reference"
+    except LookupError:
+        return False
+
+
+def may_contain_references(
+    filename: Union[str, Path], encoding: str = "utf-8", docstrings: bool = False
+) -> bool:
+    """Whether a source file may contain references, from a search of its bytes.
+
+    The file is memory mapped and searched for the tokens every reference starts
+    with, without being decoded. False positives are possible, e.g. if the tokens
+    are in a comment, but a file with references always passes.
+
+    Args:
+        filename (str, Path): The Python source file.
+        encoding (str): Encoding of the file. Files in encodings other than ASCII
+            compatible ones, like UTF-16, always pass.
+        docstrings (bool): Whether the citations in docstrings count too.
+
+    Returns:
+        False if the file certainly has no references.
+    """
+    if not is_ascii_compatible(encoding):
+        return True
+    triggers = DOCSTRING_TRIGGERS if docstrings else DECORATOR_TRIGGERS
+    with open(filename, "rb") as f:
+        # empty files cannot be mapped
+        if not f.seek(0, 2):
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return triggers.search(mapped) is not None  # type: ignore
@@ -1,19 +1,51 @@
 import logging
+import shutil
 import sys
 import os
-from typing import List
+import tempfile
+import types
+from typing import List, Optional
 
 from .core import BIBLIOGRAPHY
+from .docstring_reference_parser import expand_file_list
+from .docstring_tracker import DocstringTracker, index_cited_functions
 
 
 LOGGER = logging.getLogger(__name__)
 
 
-def runtime_tracker(script: str, args: List[str], encoding: str):
+def runtime_tracker(
+    script: str,
+    args: List[str],
+    encoding: str,
+    profile: bool = False,
+    docstring_paths: Optional[List[str]] = None,
+):
     BIBLIOGRAPHY.tracking()
+    BIBLIOGRAPHY.profile(profile)
+
+    # the functions citing references in their docstrings, found in these files
+    # or folders, are recorded the first time they run
+    index = {}
+    if docstring_paths is not None:
+        filenames = [
+            filename
+            for path in docstring_paths or [os.path.dirname(os.path.abspath(script))]
+            for filename in expand_file_list(path)
+        ]
+        index = index_cited_functions(filenames, encoding=encoding)
+    docstring_tracker = DocstringTracker(index)
 
     sys.argv = [script, *args]
     sys.path[0] = os.path.dirname(script)
+    # spawned workers start from this path, and must be able to import r2t2 too
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if package_root not in sys.path:
+        sys.path.append(package_root)
+
+    # references hit in worker processes are sent back through this directory
+    spool = tempfile.mkdtemp(prefix="r2t2-")
+    BIBLIOGRAPHY.track_child_processes(spool)
 
     try:
         LOGGER.debug(
@@ -25,16 +57,28 @@ def runtime_tracker(script: str, args: List[str], encoding: str):
 
         # try to emulate __main__ namespace as much as possible
         # What trace python module uses https://docs.python.org/3.7/library/trace.html
-        globs = {
+        # The script also runs in a real __main__ module, so that functions defined
+        # in it can be pickled and found by spawned multiprocessing workers.
+        main_module = types.ModuleType("__main__")
+        main_module.__dict__.update({
             "__file__": script,
-            "__name__": "__main__",
             "__package__": None,
             "__cached__": None,
-        }
-        exec(code, globs, globs)
+        })
+        saved_main = sys.modules["__main__"]
+        sys.modules["__main__"] = main_module
+        try:
+            with docstring_tracker:
+                exec(code, main_module.__dict__)
+        finally:
+            sys.modules["__main__"] = saved_main
 
     except OSError as err:
         sys.exit("Cannot run file %r because: %s" % (sys.argv[0], err))
 
     except SystemExit:
         pass
+
+    finally:
+        BIBLIOGRAPHY.collect_child_processes()
+        shutil.rmtree(spool, ignore_errors=True)
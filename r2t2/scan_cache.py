@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .core import FunctionReference
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".r2t2_cache"
+
+CACHE_FORMAT = 1
+"""Version of the layout of the cache files, to be bumped when it changes."""
+
+# files modified this recently might change again within the resolution of their
+# modification time, so their content is always checked on the next run
+_RACY_SECONDS = 2.0
+
+
+class ScanCache:
+    """Persistent per-file results of the static analysis.
+
+    Results are stored by content hash, so files with identical content share
+    them, and files are recognised by their path, modification time and size,
+    so unchanged files are not even read again. Each set of options has its own
+    cache file in `directory`.
+
+    Args:
+        directory (str, Path): Folder of the cache. It is created if needed.
+        options (Dict): Options the results depend on, e.g. whether docstrings
+            are parsed.
+    """
+
+    def __init__(self, directory: Union[str, Path], **options):
+        from . import __version__
+
+        self.directory = Path(directory)
+        key = json.dumps(
+            dict(options, format=CACHE_FORMAT, version=__version__), sort_keys=True
+        )
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+        self.path = self.directory / f"scan-{digest}.json"
+        # absolute path -> (modification time, size, content hash)
+        self._files: Dict[str, Tuple[Optional[int], int, str]] = {}
+        # content hash -> [name, line, short purposes, references] of each record
+        self._results: Dict[str, List[list]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._files = {k: tuple(v) for k, v in data["files"].items()}
+            self._results = data["results"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as exc:
+            LOGGER.warning("ignoring invalid cache %s: %r", self.path, exc)
+
+    def digest(self, filename: Union[str, Path]) -> str:
+        """Returns the content hash of a file, from the cache if it is unchanged."""
+        key = os.path.abspath(filename)
+        stat = os.stat(filename)
+        known = self._files.get(key)
+        if known is not None and tuple(known[:2]) == (stat.st_mtime_ns, stat.st_size):
+            return known[2]
+
+        with open(filename, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        racy = time.time() - stat.st_mtime < _RACY_SECONDS
+        self._files[key] = (None if racy else stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def get(
+        self, digest: str, filename: Union[str, Path]
+    ) -> Optional[List[FunctionReference]]:
+        """Returns the records of a file from the hash of its content, if known."""
+        results = self._results.get(digest)
+        if results is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [
+            FunctionReference(name, line, str(filename), list(short), list(refs))
+            for name, line, short, refs in results
+        ]
+
+    def put(self, digest: str, records: List[FunctionReference]) -> None:
+        """Stores the records found in a file with the given content hash."""
+        self._results[digest] = [
+            [record.name, record.line, record.short_purpose, record.references]
+            for record in records
+        ]
+
+    def save(self) -> None:
+        """Writes the cache, dropping the results no known file has any more."""
+        used = {digest for _, _, digest in self._files.values()}
+        results = {k: v for k, v in self._results.items() if k in used}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"files": self._files, "results": results}, f)
+        # replacing the file keeps it whole if several runs save at once
+        os.replace(temporary, self.path)
+        LOGGER.debug(
+            "scan cache %s: %d hits, %d misses", self.path, self.hits, self.misses
+        )
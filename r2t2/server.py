@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple, Union
+
+from .client import PROTOCOL, ServerError, send_request
+from .core import Biblio
+from .static_parser import DEFAULT_ENCODING, IncrementalScan
+from .watcher import create_watcher
+
+
+LOGGER = logging.getLogger(__name__)
+
+CONNECTION_TIMEOUT = 10.0
+"""Seconds the server waits for a client to send its request or read the response."""
+
+
+_RootKey = Tuple[str, bool, bool, str, Optional[Tuple[int, int]]]
+"""Target, whether docstrings and notebooks are parsed, encoding and shard."""
+
+
+class _Root:
+    """Analysis of a target, kept up to date with the changes of its files."""
+
+    def __init__(self, key: _RootKey, jobs: int = 1):
+        target, docstring, notebook, encoding, shard = key
+        self.biblio = Biblio()
+        self.bibs: Set[str] = set()
+        # watching first, so no change made during the analysis is missed
+        self.watcher = create_watcher(target, notebook=notebook)
+        self.scan = IncrementalScan(
+            target,
+            encoding=encoding,
+            docstring=docstring,
+            notebook=notebook,
+            shard=shard,
+            biblio=self.biblio,
+        )
+        self.scan.scan(jobs=jobs)
+
+    def refresh(self) -> int:
+        """Analyses again the files that changed since the last refresh."""
+        return len(self.scan.update(self.watcher.wait(timeout=0)))
+
+    def close(self) -> None:
+        self.watcher.close()
+
+
+class ReferenceServer:
+    """Answers static analysis requests from analyses kept in memory.
+
+    Each target is analysed in full the first time it is requested, or when the
+    server starts, and then watched: each request only analyses again the files
+    that changed since the previous one. Requests are lines of JSON, see
+    `send_request`, with a "command":
+
+    - "static": writes the output of the analysis of a "target", an absolute
+      path, as `r2t2 static` would. Its other keys are the "format", the
+      absolute "output" path, "docstring", "notebook", "encoding", "shard" as
+      [i, n] and "bib", the absolute paths of the BibTeX files. The response has
+      the "report" when the format is "terminal".
+    - "ping": returns the targets analysed.
+    - "shutdown": stops the server.
+
+    Args:
+        path (str, Path): The Unix domain socket. Only the user can connect.
+        jobs (int): Number of processes for the full analyses.
+    """
+
+    def __init__(self, path: Union[str, Path], jobs: int = 1):
+        self.path = Path(path)
+        self.jobs = jobs
+        self._roots: Dict[_RootKey, _Root] = {}
+        self._stopped = False
+
+    def root(
+        self,
+        target: Union[str, Path],
+        docstring: bool = False,
+        notebook: bool = False,
+        encoding: str = DEFAULT_ENCODING,
+        shard: Optional[Tuple[int, int]] = None,
+    ) -> _Root:
+        """Returns the up to date analysis of a target, analysing it if needed."""
+        key = (os.path.abspath(target), docstring, notebook, encoding, shard)
+        root = self._roots.get(key)
+        if root is None:
+            LOGGER.info("analysing %s", key[0])
+            root = self._roots[key] = _Root(key, self.jobs)
+        else:
+            refreshed = root.refresh()
+            if refreshed:
+                LOGGER.info("analysed %d files again in %s", refreshed, key[0])
+        return root
+
+    def handle(self, request: Dict) -> Dict:
+        """Returns the response to a request."""
+        if request.get("protocol") != PROTOCOL:
+            return dict(error=f"unsupported protocol {request.get('protocol')!r}")
+        command = request.get("command")
+        if command == "ping":
+            return dict(roots=sorted({key[0] for key in self._roots}))
+        if command == "shutdown":
+            self._stopped = True
+            return {}
+        if command != "static":
+            return dict(error=f"unknown command {command!r}")
+
+        from .writers import REGISTERED_WRITERS
+
+        try:
+            root = self.root(
+                request["target"],
+                docstring=request.get("docstring", False),
+                notebook=request.get("notebook", False),
+                encoding=request.get("encoding", DEFAULT_ENCODING),
+                shard=tuple(request["shard"]) if request.get("shard") else None,
+            )
+            for bib in request.get("bib", []):
+                if bib not in root.bibs:
+                    root.biblio.add_source(bib, package=bib)
+                    root.bibs.add(bib)
+            if request["format"] == "terminal":
+                return dict(report="".join(root.biblio.iter_report()) + "\n")
+            REGISTERED_WRITERS[request["format"]](request["output"], root.biblio)
+            return {}
+        except Exception as exc:
+            LOGGER.exception("failed to handle %s", request)
+            return dict(error=f"{type(exc).__name__}: {exc}")
+
+    def _bind(self) -> socket.socket:
+        if self.path.exists():
+            try:
+                send_request(self.path, dict(command="ping"), timeout=1)
+            except OSError:
+                # left by a server that was killed
+                self.path.unlink()
+            else:
+                raise ServerError(f"a server already listens on {self.path}")
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            listener.bind(str(self.path))
+        finally:
+            os.umask(old_umask)
+        listener.listen()
+        return listener
+
+    def serve_forever(self) -> None:
+        """Answers the requests, one at a time, until a shutdown request."""
+        listener = self._bind()
+        LOGGER.info("listening on %s", self.path)
+        try:
+            while not self._stopped:
+                connection, _ = listener.accept()
+                # a client that does not send its request must not block the others
+                connection.settimeout(CONNECTION_TIMEOUT)
+                try:
+                    with connection, connection.makefile("rwb") as f:
+                        try:
+                            response = self.handle(json.loads(f.readline()))
+                        except ValueError as exc:
+                            response = dict(error=f"invalid request: {exc}")
+                        f.write(json.dumps(response).encode("utf-8") + b"\n")
+                except OSError as exc:
+                    LOGGER.warning("lost a client: %r", exc)
+        finally:
+            listener.close()
+            self.path.unlink()
+            for root in self._roots.values():
+                root.close()
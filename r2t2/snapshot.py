@@ -0,0 +1,248 @@
+import heapq
+import itertools
+import mmap
+import os
+import struct
+from pathlib import Path, PurePath
+from typing import (
+    Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+)
+
+from .core import Biblio, FunctionReference
+
+
+SNAPSHOT_SUFFIX = ".r2t2"
+"""Suffix of the snapshot files written by the snapshot writer."""
+
+# a snapshot is the header, then items, each starting with its tag:
+# - string: its length and UTF-8 bytes, it gets the next id
+# - record: ids of its identifier, name (-1 if it is that of the identifier) and
+#   source, its line, number of references, then the ids of the short purpose and
+#   reference of each one
+# - timing: id of the identifier, calls, wall and CPU time and overhead
+# - end: so that truncated snapshots are noticed
+_MAGIC = b"R2T2SNP1"
+_HEADER = struct.Struct("<8sI")
+_SORTED = 1
+_STRING = struct.Struct("<cI")
+_RECORD = struct.Struct("<ciiiiI")
+_CITATION = struct.Struct("<ii")
+_TIMING = struct.Struct("<ciqddd")
+_END = b"E"
+
+_NO_LINE = -(2 ** 31)
+_NAME_IN_KEY = -1
+
+_BUFFER_SIZE = 1 << 16
+
+_Record = Tuple[str, FunctionReference]
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class _SourceOrder:
+    """Sort key of records by source file, in the order of the static scan."""
+
+    def __init__(self):
+        self._paths: Dict[str, PurePath] = {}
+
+    def __call__(self, source: str) -> PurePath:
+        path = self._paths.get(source)
+        if path is None:
+            path = self._paths[source] = PurePath(source)
+        return path
+
+
+def write_snapshot(
+    path: Union[str, Path],
+    records: Iterable[_Record],
+    timings: Optional[Mapping[str, Sequence]] = None,
+) -> None:
+    """Writes records, and their timings, to a snapshot file, one at a time.
+
+    Each string is written once, the first time it is used. The file is written
+    under another name first, so a snapshot is always complete.
+
+    Args:
+        path (str, Path): The snapshot.
+        records (iterable): The identifier and record of each referenced object.
+        timings (dict): The calls, wall and CPU time and overhead of the objects
+            that were profiled, by identifier.
+    """
+    path = Path(path)
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    ids: Dict[str, int] = {}
+    order = _SourceOrder()
+    is_sorted = True
+    previous: Optional[PurePath] = None
+
+    with open(temporary, "wb", buffering=_BUFFER_SIZE) as f:
+
+        def string_id(string: str) -> int:
+            index = ids.get(string)
+            if index is None:
+                index = ids[string] = len(ids)
+                data = string.encode("utf-8", errors="surrogatepass")
+                f.write(_STRING.pack(b"S", len(data)))
+                f.write(data)
+            return index
+
+        # the flags are only known at the end
+        f.write(_HEADER.pack(_MAGIC, 0))
+        for identifier, record in records:
+            source = order(record.source)
+            if previous is not None and source < previous:
+                is_sorted = False
+            previous = source
+
+            key = string_id(identifier)
+            if identifier.rsplit(":", 2)[-2:-1] == [record.name]:
+                name = _NAME_IN_KEY
+            else:
+                name = string_id(record.name)
+            citations = [
+                _CITATION.pack(string_id(short), string_id(ref))
+                for short, ref in zip(record.short_purpose, record.references)
+            ]
+            f.write(_RECORD.pack(
+                b"R",
+                key,
+                name,
+                string_id(record.source),
+                _NO_LINE if record.line is None else record.line,
+                len(citations),
+            ))
+            f.writelines(citations)
+
+        for identifier, counters in (timings or {}).items():
+            calls, wall, cpu, overhead = counters[:4]
+            key = string_id(identifier)
+            f.write(_TIMING.pack(b"T", key, int(calls), wall, cpu, overhead))
+        f.write(_END)
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, _SORTED if is_sorted else 0))
+    os.replace(temporary, path)
+
+
+class Snapshot:
+    """Reader of a snapshot file, one record at a time.
+
+    The file is memory mapped, so records are read without loading the whole
+    snapshot. The timings are read after the records, into `timings`.
+
+    Args:
+        path (str, Path): The snapshot.
+
+    Raises:
+        SnapshotError if the file is not a snapshot.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            try:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError(f"{path} is empty, not a snapshot") from None
+        try:
+            magic, flags = _HEADER.unpack_from(self._data)
+        except struct.error:
+            magic, flags = b"", 0
+        if magic != _MAGIC:
+            raise SnapshotError(f"{path} is not a snapshot of a bibliography")
+        self.sorted = bool(flags & _SORTED)
+        """Whether the records are sorted by source file, as by the static scan."""
+        self.timings: Dict[str, Tuple[int, float, float, float]] = {}
+
+    def __iter__(self) -> Iterator[_Record]:
+        data = self._data
+        strings: List[str] = []
+        position = _HEADER.size
+        try:
+            while True:
+                tag = data[position:position + 1]
+                if tag == b"S":
+                    _, length = _STRING.unpack_from(data, position)
+                    position += _STRING.size
+                    strings.append(
+                        data[position:position + length].decode(
+                            "utf-8", errors="surrogatepass"
+                        )
+                    )
+                    position += length
+                elif tag == b"R":
+                    _, key, name, source, line, count = _RECORD.unpack_from(
+                        data, position
+                    )
+                    position += _RECORD.size
+                    citations = [
+                        _CITATION.unpack_from(data, position + index * _CITATION.size)
+                        for index in range(count)
+                    ]
+                    position += count * _CITATION.size
+                    identifier = strings[key]
+                    yield identifier, FunctionReference(
+                        identifier.rsplit(":", 2)[-2]
+                        if name == _NAME_IN_KEY
+                        else strings[name],
+                        None if line == _NO_LINE else line,
+                        strings[source],
+                        [strings[short] for short, _ in citations],
+                        [strings[ref] for _, ref in citations],
+                    )
+                elif tag == b"T":
+                    _, key, calls, wall, cpu, overhead = _TIMING.unpack_from(
+                        data, position
+                    )
+                    position += _TIMING.size
+                    self.timings[strings[key]] = (calls, wall, cpu, overhead)
+                elif tag == _END:
+                    return
+                else:
+                    raise SnapshotError(f"{self.path} is truncated or corrupted")
+        except (struct.error, IndexError) as exc:
+            raise SnapshotError(f"{self.path} is truncated or corrupted") from exc
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def merge_snapshots(paths: Iterable[Union[str, Path]], biblio: Biblio) -> None:
+    """Adds the records and timings of snapshots to a bibliography.
+
+    The snapshots are read one record at a time. If they are all sorted by source
+    file, like those of the shards of a static scan, they are merged by source
+    file, so the records end up in the same order as if the files had been
+    scanned at once. Otherwise, they are read one after the other. Either way,
+    the order only depends on the order of the snapshots.
+
+    Args:
+        paths (list): The snapshots.
+        biblio (Biblio): The bibliography the records are added to. The records
+            of an object found in several snapshots are merged.
+    """
+    snapshots = [Snapshot(path) for path in paths]
+    try:
+        records: Iterable[_Record]
+        if all(snapshot.sorted for snapshot in snapshots):
+            order = _SourceOrder()
+            # ties keep the order of the snapshots, and of the records in each
+            records = heapq.merge(*snapshots, key=lambda item: order(item[1].source))
+        else:
+            records = itertools.chain.from_iterable(snapshots)
+        for identifier, record in records:
+            biblio.add(record, identifier)
+        for snapshot in snapshots:
+            for identifier, counters in snapshot.timings.items():
+                biblio.add_timing(identifier, *counters)
+    finally:
+        for snapshot in snapshots:
+            snapshot.close()
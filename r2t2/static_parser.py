@@ -1,97 +1,311 @@
-from pathlib import Path
-import re
-from typing import Union, List
+import bisect
+import logging
 import os
-from functools import reduce
-
-from .core import BIBLIOGRAPHY, FunctionReference
-
-
-class FileParseError(RuntimeError):
-    pass
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Union, List, Optional, Tuple
 
+from .ast_parser import (  # noqa: F401
+    FileParseError,
+    FileReferenceParseError,
+    find_references_in_source,
+)
+from .core import BIBLIOGRAPHY, Biblio, FunctionReference
+from .docstring_reference_parser import (
+    expand_file_list,
+    get_docstring_function_references_from_file,
+)
+from .parallel import map_files
+from .prefilter import may_contain_references
+from .scan_cache import ScanCache
 
-class FileReferenceParseError(FileParseError):
-    pass
 
+LOGGER = logging.getLogger(__name__)
 
 DEFAULT_ENCODING = 'utf-8'
 
 
-def locate_references(path: Union[Path, str], encoding: str = DEFAULT_ENCODING):
+def locate_references(
+    path: Union[Path, str],
+    encoding: str = DEFAULT_ENCODING,
+    jobs: int = 1,
+    docstring: bool = False,
+    cache: Optional[Union[Path, str]] = None,
+    notebook: bool = False,
+    shard: Optional[Tuple[int, int]] = None,
+) -> List[Path]:
     """Locates add_reference in path.
 
     It looks recursively for add_reference markers, taking note of the module, line
-    short_purpose and actual reference string.
+    short_purpose and actual reference string. Each file is read and parsed once,
+    also collecting the references in docstrings if `docstring` is True.
+
+    Files are processed in `jobs` worker processes, and the references are added
+    in the same order whatever the number of jobs.
+
+    If `cache` is given, the results are kept in that folder between runs, so only
+    the files that changed are parsed again, and files with the same content are
+    parsed only once.
+
+    If `notebook` is True, the Jupyter notebooks in path are parsed instead of the
+    Python files, reporting the citations of each markdown cell as a separate
+    record.
+
+    If `shard` is given, as (i, n), only the i-th of n disjoint parts of the files
+    is parsed, see `select_shard`. The snapshots of the n parts can then be merged
+    with `r2t2 merge`.
 
     Returns
-        None
+        The files analysed.
     """
-    if os.path.isdir(path):
-        filenames = sorted(Path(path).rglob("*.py"))
-    else:
-        filenames = [Path(path)]
+    filenames = expand_file_list(path, notebook=notebook)
+    if shard is not None:
+        filenames = select_shard(filenames, path, *shard)
+    # the markdown cells of notebooks are parsed like docstrings
+    results = _find_records(
+        filenames, encoding, jobs, docstring or notebook, cache
+    )
+    for records in results:
+        for record in records:
+            BIBLIOGRAPHY.add(record)
+    return filenames
 
-    for filename in filenames:
-        locate_references_in_file(filename, encoding=encoding)
 
+class IncrementalScan:
+    """Static analysis kept up to date by parsing again only the files that change.
 
-def locate_references_in_file(filename: Union[Path, str], encoding: str):
-    ref_located = False
-    ref_lines = []
-    code_str = []
-    try:
-        with open(filename, "r", encoding=encoding) as f:
-            for num, line in enumerate(f):
-                if line.strip().startswith("@add_reference"):
-                    ref_located = True
-                    ref_lines.append(num)
-                    code_str.append(line.strip())
+    The keys of the records of each file are kept, so updating the bibliography
+    only means replacing those of the changed files. The records stay in the order
+    of a full analysis. See `locate_references` for the arguments.
+
+    Args:
+        biblio (Biblio): The bibliography updated. Default: the global one.
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        encoding: str = DEFAULT_ENCODING,
+        docstring: bool = False,
+        notebook: bool = False,
+        shard: Optional[Tuple[int, int]] = None,
+        biblio: Optional[Biblio] = None,
+    ):
+        self.path = Path(path)
+        self.encoding = encoding
+        self.docstring = docstring or notebook
+        self.notebook = notebook
+        self.shard = shard
+        self.biblio = BIBLIOGRAPHY if biblio is None else biblio
+        self._folder = self.path.absolute()
+        # absolute path of each file analysed -> keys of its records
+        self._keys: Dict[Path, List[str]] = {}
+        # the same files, in the order of the analysis
+        self._files: List[Path] = []
+
+    def scan(
+        self, jobs: int = 1, cache: Optional[Union[Path, str]] = None
+    ) -> List[Path]:
+        """Analyses all the files, see `locate_references`.
+
+        Returns:
+            The files analysed.
+        """
+        filenames = expand_file_list(self.path, notebook=self.notebook)
+        if self.shard is not None:
+            filenames = select_shard(filenames, self.path, *self.shard)
+        results = _find_records(filenames, self.encoding, jobs, self.docstring, cache)
+        for filename, records in zip(filenames, results):
+            self._add(filename, records)
+        return filenames
+
+    def _add(self, filename: Path, records: List[FunctionReference]) -> None:
+        path = filename.absolute()
+        if path not in self._keys:
+            bisect.insort(self._files, path)
+        # the records of an object in a docstring and a decorator are merged
+        keys = dict.fromkeys(self.biblio.add(record) for record in records)
+        self._keys[path] = list(keys)
+
+    def _name(self, path: Path) -> Path:
+        """The path of a file as if found by expanding the target."""
+        if self._folder.is_dir():
+            return self.path / path.relative_to(self._folder)
+        return self.path
+
+    def _is_analysed(self, path: Path) -> bool:
+        if not path.is_file():
+            return False
+        if not self._folder.is_dir():
+            return path == self._folder
+        if path.suffix != (".ipynb" if self.notebook else ".py"):
+            return False
+        name = self._name(path)
+        return self.shard is None or bool(select_shard([name], self.path, *self.shard))
+
+    def update(self, paths: Iterable[Union[Path, str]]) -> List[Path]:
+        """Analyses again the files that were created, changed or removed.
+
+        Files that cannot be parsed any more keep their previous records.
+
+        Args:
+            paths (list): The files, and the folders that were created, changed or
+                removed, all of whose files are then analysed again.
+
+        Returns:
+            The files analysed again or removed.
+        """
+        changed = set()
+        for path in map(Path, paths):
+            path = path.absolute()
+            if path in self._keys or path.is_file():
+                changed.add(path)
+                continue
+            changed.update(known for known in self._keys if path in known.parents)
+            if path.is_dir():
+                changed.update(
+                    found.absolute()
+                    for found in expand_file_list(path, notebook=self.notebook)
+                )
+
+        updated = []
+        for path in sorted(changed):
+            records: List[FunctionReference] = []
+            analysed = self._is_analysed(path)
+            if analysed:
+                try:
+                    records = find_references_in_file(
+                        self._name(path), self.encoding, docstring=self.docstring
+                    )
+                except FileParseError as exc:
+                    LOGGER.warning("keeping the previous records: %s", exc)
                     continue
+            elif path not in self._keys:
+                continue
+            for key in self._keys.get(path, []):
+                if key in self.biblio:
+                    del self.biblio[key]
+            if analysed:
+                self._add(path, records)
+            else:
+                del self._keys[path]
+                self._files.remove(path)
+            updated.append(self._name(path))
 
-                if ref_located and (
-                    line.strip().startswith("def ") or line.strip().startswith("class ")
-                ):
-                    ref_lines.append(num)
-                    ref_lines = [r - ref_lines[0] for r in ref_lines]
-                    parse_references(str(filename), line, num + 1, code_str, ref_lines)
-                    ref_located = False
-                    ref_lines = []
-                    code_str = []
-
-                elif ref_located:
-                    code_str.append(line.strip())
-    except FileParseError:
-        raise
-    except Exception as exc:
-        raise FileParseError(
-            'failed to process %s due to %r' % (filename, exc)
-        ) from exc
+        if updated:
+            order = [key for path in self._files for key in self._keys[path]]
+            # anything else, e.g. found at runtime, stays after the analysis
+            rank = dict.fromkeys(self.biblio.keys(), len(order))
+            rank.update(zip(order, range(len(order))))
+            self.biblio.sort(key=rank.__getitem__)
+        return updated
+
+
+def _find_records(
+    filenames: List[Path],
+    encoding: str,
+    jobs: int,
+    docstring: bool,
+    cache: Optional[Union[Path, str]],
+) -> Iterable[List[FunctionReference]]:
+    """Returns the records of each file, from the cache if one is given."""
+    if cache is None:
+        return map_files(
+            find_references_in_file,
+            filenames,
+            jobs=jobs,
+            encoding=encoding,
+            docstring=docstring,
+        )
+    return _find_references_with_cache(
+        ScanCache(cache, encoding=encoding, docstring=docstring),
+        filenames,
+        jobs=jobs,
+        encoding=encoding,
+        docstring=docstring,
+    )
+
+
+def select_shard(
+    filenames: List[Path], root: Union[Path, str], index: int, count: int
+) -> List[Path]:
+    """Returns the files of the index-th of count shards, counting from 1.
+
+    Files are assigned by a hash of their path relative to `root`, so each file is
+    in the same shard on every machine and whatever files are added or removed.
 
+    Raises:
+        ValueError if index is not between 1 and count.
+    """
+    if not 1 <= index <= count:
+        raise ValueError(f"shard {index}/{count} must be between 1 and {count}")
+    base = root if os.path.isdir(root) else os.path.dirname(root) or os.curdir
+    return [
+        filename
+        for filename in filenames
+        if zlib.crc32(
+            Path(os.path.relpath(filename, base)).as_posix().encode("utf-8")
+        ) % count == index - 1
+    ]
+
+
+def _find_references_with_cache(
+    cache: ScanCache, filenames: List[Path], jobs: int, **kwargs
+) -> List[List[FunctionReference]]:
+    """Returns the records of each file, parsing only those not in the cache."""
+    results: List[Optional[List[FunctionReference]]] = []
+    # content hash -> position of the files with that content that are not cached
+    missing: Dict[str, List[int]] = {}
+    for filename in filenames:
+        digest = cache.digest(filename)
+        results.append(cache.get(digest, filename))
+        if results[-1] is None:
+            missing.setdefault(digest, []).append(len(results) - 1)
 
-def _add_reference(**kwargs):
-    return kwargs
+    to_parse = [filenames[positions[0]] for positions in missing.values()]
+    parsed = map_files(find_references_in_file, to_parse, jobs=jobs, **kwargs)
+    for (digest, positions), records in zip(missing.items(), parsed):
+        cache.put(digest, records)
+        results[positions[0]] = records
+        for position in positions[1:]:
+            results[position] = cache.get(digest, filenames[position])
+    cache.save()
+    return results  # type: ignore
 
 
-def parse_references(
-    source: str, current: str, line_num: int, ref_raw: List[str], ref_lines: List[int]
+def locate_references_in_file(
+    filename: Union[Path, str], encoding: str, docstring: bool = False
 ):
-    """Extracts all references added to a function or class."""
-    identifier = f"{source}:{line_num}"
-    try:
-        name = re.findall(r"[\w']+", current)[1]
+    for record in find_references_in_file(filename, encoding, docstring=docstring):
+        BIBLIOGRAPHY.add(record)
 
-        BIBLIOGRAPHY[identifier] = FunctionReference(name, line_num, source, [], [])
 
-        def add_ref(i, j):
-            one_ref = " ".join(ref_raw[i:j]).replace("@", "_")
-            kwargs = eval(one_ref)
-            BIBLIOGRAPHY[identifier].short_purpose.append(kwargs["short_purpose"])
-            BIBLIOGRAPHY[identifier].references.append(kwargs["reference"])
-            return j
+def find_references_in_file(
+    filename: Union[Path, str], encoding: str, docstring: bool = False
+) -> List[FunctionReference]:
+    """Returns the objects with references in a file.
 
-        reduce(add_ref, ref_lines)
+    Jupyter notebooks have no decorators, so only the citations in their markdown
+    cells are returned, if `docstring` is True. Python files whose bytes do not
+    contain any reference token are skipped without being decoded or parsed.
+    """
+    if Path(filename).suffix == ".ipynb":
+        if not docstring:
+            return []
+        return [
+            record
+            for _, record in get_docstring_function_references_from_file(
+                filename, encoding=encoding
+            )
+        ]
+
+    try:
+        if not may_contain_references(filename, encoding, docstrings=docstring):
+            return []
+        with open(filename, "r", encoding=encoding) as f:
+            text = f.read()
     except Exception as exc:
-        raise FileReferenceParseError(
-            'failed to process %s due to %r' % (identifier, exc)
+        raise FileParseError(
+            'failed to process %s due to %r' % (filename, exc)
         ) from exc
+    return find_references_in_source(text, str(filename), docstrings=docstring)
@@ -0,0 +1,255 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple, Union
+
+from .docstring_reference_parser import NOTEBOOK_CHECKPOINTS
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 0.5
+"""Seconds between two scans of the tree by the PollingWatcher."""
+
+DEBOUNCE = 0.01
+"""Seconds without events after which a change is reported.
+
+Editors often save a file in several steps, e.g. by writing a copy and renaming
+it, which are thus reported as one change."""
+
+# see inotify(7)
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_MASK = (
+    _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_EVENT = struct.Struct("iIII")
+
+
+class _Filter:
+    """Tells which files are those of the analysis of a target."""
+
+    def __init__(self, target: Union[str, Path], notebook: bool = False):
+        self.target = Path(target).absolute()
+        self.folder = self.target.is_dir()
+        self.root = self.target if self.folder else self.target.parent
+        self.suffix = ".ipynb" if notebook else ".py"
+
+    def __call__(self, path: Path) -> bool:
+        if not self.folder:
+            return path == self.target
+        return path.suffix == self.suffix and NOTEBOOK_CHECKPOINTS not in path.parts
+
+
+class PollingWatcher:
+    """Finds the files that changed by comparing their modification time and size.
+
+    Args:
+        target (str, Path): File or folder analysed.
+        notebook (bool): Whether the notebooks are analysed, or the Python files.
+        interval (float): Seconds between two scans of the files.
+    """
+
+    def __init__(
+        self,
+        target: Union[str, Path],
+        notebook: bool = False,
+        interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        self._filter = _Filter(target, notebook)
+        self.interval = interval
+        self._stats = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        if self._filter.folder:
+            paths: Iterable[Path] = self._filter.root.rglob(f"*{self._filter.suffix}")
+        else:
+            paths = [self._filter.target]
+        stats = {}
+        for path in paths:
+            if not self._filter(path):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            stats[path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Waits for files to change.
+
+        Args:
+            timeout (float): Seconds after which to give up. Default: no limit.
+
+        Returns:
+            The files created, changed or removed since the last call, if any.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            stats = self._scan()
+            changed = {
+                path
+                for path in stats.keys() | self._stats.keys()
+                if stats.get(path) != self._stats.get(path)
+            }
+            self._stats = stats
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Gets the files that changed from the kernel, through inotify (Linux only).
+
+    Every folder of the tree is watched, including those created later, so no
+    time is spent scanning it.
+
+    Args:
+        target (str, Path): File or folder analysed.
+        notebook (bool): Whether the notebooks are analysed, or the Python files.
+
+    Raises:
+        OSError if inotify is not available, or if there are too many folders to
+        watch.
+    """
+
+    def __init__(self, target: Union[str, Path], notebook: bool = False):
+        self._filter = _Filter(target, notebook)
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        try:
+            self._add_watch = libc.inotify_add_watch
+            init = libc.inotify_init1
+        except AttributeError:
+            raise OSError("inotify is not available") from None
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = init(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._folders: Dict[int, Path] = {}
+        try:
+            self._watch_tree(self._filter.root)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def _watch(self, folder: Path) -> None:
+        descriptor = self._add_watch(self._fd, os.fsencode(folder), _MASK)
+        if descriptor < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"cannot watch {folder}: {os.strerror(errno)}")
+        self._folders[descriptor] = folder
+
+    def _watch_tree(self, root: Path) -> Set[Path]:
+        """Watches a folder and its subfolders, returning the files in them."""
+        self._watch(root)
+        if not self._filter.folder:
+            return set()
+        found: Set[Path] = set()
+        for folder, folders, files in os.walk(root):
+            for name in folders:
+                self._watch(Path(folder, name))
+            found.update(Path(folder, name) for name in files)
+        return found
+
+    def _read(self, changed: Set[Path], removed: Set[Path]) -> None:
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return
+        position = 0
+        while position < len(data):
+            descriptor, mask, _, length = _EVENT.unpack_from(data, position)
+            position += _EVENT.size
+            name = data[position:position + length].rstrip(b"\0")
+            position += length
+            if mask & _IN_Q_OVERFLOW:
+                # events were lost, so anything may have changed
+                removed.add(self._filter.target)
+            folder = self._folders.get(descriptor)
+            if folder is None or not name:
+                continue
+            path = folder / os.fsdecode(name)
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO) and self._filter.folder:
+                    # files may have been added before the folder was watched
+                    changed.update(self._watch_tree(path))
+                elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                    removed.add(path)
+            else:
+                changed.add(path)
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Waits for files to change.
+
+        Args:
+            timeout (float): Seconds after which to give up. Default: no limit.
+
+        Returns:
+            The files created, changed or removed since the last call, if any, and
+            the folders removed, whose files are not reported. The whole target
+            is reported if the kernel dropped events.
+        """
+        changed: Set[Path] = set()
+        removed: Set[Path] = set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                return changed
+            self._read(changed, removed)
+            # the other events of the same save
+            while select.select([self._fd], [], [], DEBOUNCE)[0]:
+                self._read(changed, removed)
+            changed = {path for path in changed if self._filter(path)} | removed
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def create_watcher(
+    target: Union[str, Path],
+    notebook: bool = False,
+    interval: float = DEFAULT_POLL_INTERVAL,
+) -> Union[InotifyWatcher, PollingWatcher]:
+    """Returns an InotifyWatcher on Linux, or else a PollingWatcher.
+
+    Args:
+        target (str, Path): File or folder analysed.
+        notebook (bool): Whether the notebooks are analysed, or the Python files.
+        interval (float): Seconds between two scans of the PollingWatcher.
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(target, notebook)
+        except OSError as exc:
+            LOGGER.warning("polling for changes, inotify failed: %s", exc)
+    return PollingWatcher(target, notebook, interval)
@@ -0,0 +1,34 @@
+import importlib
+
+import wrapt
+
+
+def _import_qualname(module: str, qualname: str):
+    """Finds an object from the name of its module and its qualified name."""
+    obj = importlib.import_module(module)
+    for name in qualname.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+class BoundReferenceWrapper(wrapt.BoundFunctionWrapper):
+    """Bound method wrapper that is pickled as its instance and name."""
+
+    def __reduce_ex__(self, protocol):
+        if self._self_instance is None:
+            return _import_qualname, (self.__module__, self.__qualname__)
+        return getattr, (self._self_instance, self.__name__)
+
+
+class ReferenceWrapper(wrapt.FunctionWrapper):
+    """Function wrapper that can be pickled by name, like the wrapped function.
+
+    This is needed to send referenced functions and methods to multiprocessing
+    workers. As for plain functions, they must be reachable by their qualified
+    name in their module.
+    """
+
+    __bound_function_wrapper__ = BoundReferenceWrapper
+
+    def __reduce_ex__(self, protocol):
+        return _import_qualname, (self.__module__, self.__qualname__)
@@ -1,12 +1,38 @@
+import csv
+import functools
+import json
 import os
+import sys
 from pathlib import Path
-from typing import Union, Callable, Optional
+from typing import Union, Callable, Dict, Iterator, Optional
 
 from r2t2 import BIBLIOGRAPHY
+from r2t2.core import Biblio
+from r2t2.snapshot import SNAPSHOT_SUFFIX
 
 
 REGISTERED_WRITERS = dict()
-"""Available writers to produce the output."""
+"""Available writers to produce the output.
+
+Each writer is called with the output file and the bibliography to write, the
+global one by default."""
+
+BUFFER_SIZE = 1 << 16
+"""Size of the buffer of the files written, in bytes."""
+
+CSV_COLUMNS = [
+    "identifier",
+    "name",
+    "source",
+    "line",
+    "short_purpose",
+    "reference",
+    "citation",
+    "calls",
+    "wall_time",
+    "cpu_time",
+]
+"""Columns of the CSV output, which has a row per reference of each record."""
 
 
 def register_writer(fun: Optional[Callable] = None, name: Optional[str] = None):
@@ -18,35 +44,171 @@ def register_writer(fun: Optional[Callable] = None, name: Optional[str] = None):
     return fun
 
 
+@functools.lru_cache(maxsize=8)
+def relative_paths(root: Union[Path, str]) -> Callable[[str], str]:
+    """Returns a function giving paths relative to `root`.
+
+    Records of the same source file are usually many, so the path of each file
+    is only computed once. The function is kept for the next outputs written in
+    the same folder, e.g. by static --watch.
+    """
+    cache: Dict[str, str] = {}
+
+    def relative(source: str) -> str:
+        path = cache.get(source)
+        if path is None:
+            path = cache[source] = os.path.relpath(source, root)
+        return path
+
+    return relative
+
+
+def _with_suffix(output: Union[Path, str], suffix: str) -> str:
+    output = str(output)
+    return output if output.endswith(suffix) else output + suffix
+
+
+def iter_markdown(
+    root: Union[Path, str], biblio: Optional[Biblio] = None
+) -> Iterator[str]:
+    """Renders the references as markdown, one record at a time.
+
+    Args:
+        root (str, Path): Folder the links to the source files are relative to.
+        biblio (Biblio): The bibliography. Default: the global one.
+    """
+    if biblio is None:
+        biblio = BIBLIOGRAPHY
+    relative = relative_paths(root)
+    timings = biblio.timings
+    for identifier, record in biblio.items():
+        source = relative(record.source)
+        # notebook cells have no line, their name tells where they are
+        link = source if record.line is None else f"{source}:{record.line}"
+        chunk = [
+            f"Referenced in: {record.name}  \n"
+            f"Source: [{source}]({link})  \n"
+            f"Line: {record.line or 'n/a'}\n\n"
+        ]
+        for i, (short, ref) in enumerate(zip(record.short_purpose, record.references)):
+            chunk.append(f"\t[{i + 1}] {short} - {ref}  \n")
+            entry = biblio.citation(ref)
+            if entry is not None:
+                chunk.extend(f"\t\t{line}  \n" for line in entry.splitlines())
+        timing = timings.get(identifier)
+        if timing is not None:
+            chunk.append(
+                f"\nCalls: {timing.calls}, wall time: {timing.wall:.6f} s,"
+                f" CPU time: {timing.cpu:.6f} s  \n"
+            )
+        yield "".join(chunk)
+    if timings:
+        yield f"\nOverhead of r2t2: {biblio.overhead:.6f} s\n"
+
+
+def iter_json_lines(
+    root: Union[Path, str], biblio: Optional[Biblio] = None
+) -> Iterator[str]:
+    """Renders each record as a line of JSON.
+
+    Each line is an object with the identifier, name, source file, relative to
+    `root`, and line of the record, and its references. These have their short
+    purpose and full citation, if known. While profiling, the object also has the
+    calls and the wall and CPU time spent in the referenced object, in seconds.
+
+    Args:
+        root (str, Path): Folder the source files are relative to.
+        biblio (Biblio): The bibliography. Default: the global one.
+    """
+    if biblio is None:
+        biblio = BIBLIOGRAPHY
+    relative = relative_paths(root)
+    timings = biblio.timings
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for identifier, record in biblio.items():
+        line = dict(
+            identifier=identifier,
+            name=record.name,
+            source=relative(record.source),
+            line=record.line,
+            references=[
+                dict(short_purpose=short, reference=ref, citation=biblio.citation(ref))
+                for short, ref in zip(record.short_purpose, record.references)
+            ],
+        )
+        timing = timings.get(identifier)
+        if timing is not None:
+            line.update(calls=timing.calls, wall_time=timing.wall, cpu_time=timing.cpu)
+        yield encode(line) + "\n"
+
+
 @register_writer(name="markdown")
-def markdown(mdfile: Union[Path, str]) -> None:
+def markdown(mdfile: Union[Path, str], biblio: Optional[Biblio] = None) -> None:
     """Converts the references dictionary into a markdown file."""
-    template_name = (
-        "Referenced in: {name}  \n"
-        "Source: [{source}]({source}:{line})  \n"
-        "Line: {line}\n\n"
-    )
-    template_ref = "\t[{index}] {short} - {ref}  \n"
-
-    if not str(mdfile).endswith(".md"):
-        mdfile = str(mdfile) + ".md"
-
-    root = Path(mdfile).parent
-    with open(mdfile, mode="w") as f:
-        for record in BIBLIOGRAPHY.values():
-            source = os.path.relpath(record.source, root)
-            f.write(
-                template_name.format(
-                    name=record.name, source=source, line=record.line or "n/a"
-                )
-            )
-            for i, (short, ref) in enumerate(
-                zip(record.short_purpose, record.references)
-            ):
-                f.write(template_ref.format(index=i + 1, short=short, ref=ref))
+    mdfile = _with_suffix(mdfile, ".md")
+    with open(mdfile, mode="w", buffering=BUFFER_SIZE) as f:
+        f.writelines(iter_markdown(Path(mdfile).parent, biblio))
 
 
 @register_writer(name="terminal")
-def terminal(mdfile: Union[Path, str]) -> None:
+def terminal(mdfile: Union[Path, str], biblio: Optional[Biblio] = None) -> None:
     """The output is just the Bibliography printed into the terminal."""
-    print(BIBLIOGRAPHY)
+    if biblio is None:
+        biblio = BIBLIOGRAPHY
+    sys.stdout.writelines(biblio.iter_report())
+    sys.stdout.write("\n")
+
+
+@register_writer(name="jsonl")
+def jsonl(output: Union[Path, str], biblio: Optional[Biblio] = None) -> None:
+    """Writes a JSON object per record in a JSON Lines file, see iter_json_lines."""
+    output = _with_suffix(output, ".jsonl")
+    with open(output, "w", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+        f.writelines(iter_json_lines(Path(output).parent, biblio))
+
+
+@register_writer(name="csv")
+def csv_table(output: Union[Path, str], biblio: Optional[Biblio] = None) -> None:
+    """Writes a row per reference of each record in a CSV file, see CSV_COLUMNS.
+
+    The source files are relative to the folder of the file. The calls and times
+    are only filled while profiling.
+    """
+    if biblio is None:
+        biblio = BIBLIOGRAPHY
+    output = _with_suffix(output, ".csv")
+    relative = relative_paths(Path(output).parent)
+    timings = biblio.timings
+    with open(
+        output, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE
+    ) as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for identifier, record in biblio.items():
+            source = relative(record.source)
+            timing = timings.get(identifier)
+            measured = ("", "", "") if timing is None else timing
+            writer.writerows(
+                (
+                    identifier,
+                    record.name,
+                    source,
+                    "" if record.line is None else record.line,
+                    short,
+                    ref,
+                    biblio.citation(ref) or "",
+                    *measured,
+                )
+                for short, ref in zip(record.short_purpose, record.references)
+            )
+
+
+@register_writer(name="snapshot")
+def snapshot(output: Union[Path, str], biblio: Optional[Biblio] = None) -> None:
+    """Saves the records and timings in a binary snapshot, see r2t2.snapshot.
+
+    Unlike the other formats, snapshots can be read back, e.g. by `r2t2 merge`.
+    """
+    if biblio is None:
+        biblio = BIBLIOGRAPHY
+    biblio.save(_with_suffix(output, SNAPSHOT_SUFFIX))
@@ -1,3 +1,6 @@
+import subprocess
+import sys
+
 import pytest
 
 from r2t2.__main__ import (
@@ -9,6 +12,28 @@ from r2t2.__main__ import (
 VALID_FORMAT = 'markdown'
 INVALID_FORMAT = 'other'
 
+LAZY_MODULES = [
+    'asyncio',
+    'urllib.request',
+    'sqlite3',
+    'wrapt',
+    'inspect',
+    'ast',
+    'concurrent.futures',
+    'ctypes',
+    'r2t2.database',
+    'r2t2.doi',
+    'r2t2.runtime_tracker',
+    'r2t2.server',
+    'r2t2.static_parser',
+    'r2t2.watcher',
+]
+"""Modules imported by the sub commands that need them, not when the CLI starts."""
+
+STARTUP_BUDGET = 0.6
+"""Import time of the CLI, as a fraction of that of all the modules of its sub
+commands. It does not depend on the speed of the machine, unlike a duration."""
+
 
 class TestParseArgs:
     def test_should_not_fail_on_valid_format(self):
@@ -47,12 +72,49 @@ class TestMain:
             'docs/examples'
         ])
 
+    def test_should_not_fail_on_static_analysis_of_examples_with_jobs(self):
+        main([
+            'static',
+            '--docstring',
+            '--jobs=2',
+            'docs/examples'
+        ])
+
     def test_should_not_fail_on_runtime_analysis_of_examples(self):
         main([
             'run',
             'docs/examples/minimal.py'
         ])
 
+    def test_should_show_timings_when_profiling(self, bibliography, capsys):
+        try:
+            main([
+                'run',
+                '--profile',
+                'docs/examples/minimal.py'
+            ])
+        finally:
+            bibliography.tracking(False)
+            bibliography.profile(False)
+        output = capsys.readouterr().out
+        assert 'Calls: 1, wall time: ' in output
+        assert 'Overhead of r2t2: ' in output
+
+    def test_should_show_bibtex_entries(self, bibliography, capsys, temp_dir):
+        bib = temp_dir / 'references.bib'
+        bib.write_text('@book{1987:nelson, title = {Radically Elementary}}\n')
+        main([
+            'static',
+            '--docstring',
+            '--bib',
+            str(bib),
+            'docs/examples/docstring_sphinx_cite.py'
+        ])
+        assert (
+            '\t\t@book{1987:nelson, title = {Radically Elementary}}\n'
+            in capsys.readouterr().out
+        )
+
     def test_should_not_fail_on_notebook(self):
         main([
             'static',
@@ -60,6 +122,13 @@ class TestMain:
             'tests/fixtures/notebook_doi.ipynb'
         ])
 
+    def test_should_not_fail_on_notebook_folder(self):
+        main([
+            'static',
+            '--notebook',
+            'tests/fixtures'
+        ])
+
     def test_should_fail_on_non_notebook(self):
         with pytest.raises(Exception):
             main([
@@ -67,3 +136,52 @@ class TestMain:
                 '--notebook',
                 'docs/examples/docstring_doi.py'
             ])
+
+
+def import_time(modules):
+    """Returns the shortest time taken by a few processes importing modules.
+
+    That is all the time spent importing, including the start of Python, in
+    microseconds.
+    """
+    times = []
+    for _ in range(5):
+        stderr = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {modules}'],
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        ).stderr
+        # the imports of each module are indented below it, and counted in its
+        # cumulative time, the second column
+        times.append(sum(
+            int(cumulative)
+            for _, cumulative, name in (
+                line.split('|') for line in stderr.splitlines()[1:]
+            )
+            if not name.startswith('  ')
+        ))
+    return min(times)
+
+
+class TestStartup:
+    def test_should_not_import_modules_of_other_sub_commands(self):
+        loaded = subprocess.run(
+            [
+                sys.executable,
+                '-c',
+                'import sys, r2t2.__main__; print(*sys.modules)',
+            ],
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        ).stdout.split()
+
+        assert not set(LAZY_MODULES) & set(loaded)
+
+    @pytest.mark.skipif(sys.version_info < (3, 7), reason='-X importtime is 3.7+')
+    def test_should_import_within_budget(self):
+        cli = import_time('r2t2.__main__')
+        everything = import_time(', '.join(['r2t2.__main__'] + LAZY_MODULES))
+
+        assert cli < STARTUP_BUDGET * everything
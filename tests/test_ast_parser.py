@@ -0,0 +1,84 @@
+import pytest
+
+from r2t2.ast_parser import FileReferenceParseError, find_references_in_source
+from r2t2.docstring_reference_parser import DOCSTRING_SHORT_PURPOSE
+
+
+DOI_1 = '10.1234/zenodo.1234567'
+
+
+def find(lines, **kwargs):
+    return find_references_in_source('\n'.join(lines), 'test.py', **kwargs)
+
+
+class TestFindReferencesInSource:
+    def test_should_find_decorator_references(self):
+        records = find([
+            'from r2t2 import add_reference',
+            '',
+            '@add_reference(short_purpose="p1", reference="Reference 1")',
+            '@add_reference(',
+            '    short_purpose="p2",',
+            '    doi="' + DOI_1 + '",',
+            ')',
+            'def some_function():',
+            '    pass',
+        ])
+        assert len(records) == 1
+        assert records[0].name == 'some_function'
+        assert records[0].line == 8
+        assert records[0].source == 'test.py'
+        assert records[0].short_purpose == ['p1', 'p2']
+        assert records[0].references == [
+            'Reference 1', 'https://doi.org/' + DOI_1
+        ]
+
+    @pytest.mark.parametrize('imports, decorator', [
+        ('from r2t2 import add_reference as cite', 'cite'),
+        ('import r2t2', 'r2t2.add_reference'),
+        ('import r2t2 as rr', 'rr.add_reference'),
+        ('from r2t2 import core', 'core.add_reference'),
+        ('import r2t2.core', 'r2t2.core.add_reference'),
+    ])
+    def test_should_resolve_imports(self, imports, decorator):
+        records = find([
+            imports,
+            'class Outer:',
+            '    @' + decorator + '(short_purpose="p", reference="Reference 1")',
+            '    async def method(self):',
+            '        pass',
+        ])
+        assert [r.name for r in records] == ['method']
+
+    def test_should_ignore_other_decorators(self):
+        assert find([
+            'from other import cite',
+            '@cite(short_purpose="p", reference="Reference 1")',
+            'def some_function():',
+            '    pass',
+        ]) == []
+
+    def test_should_not_evaluate_code(self):
+        with pytest.raises(FileReferenceParseError):
+            find([
+                '@add_reference(short_purpose="p", reference=open("x").read())',
+                'def some_function():',
+                '    pass',
+            ])
+
+    def test_should_merge_decorator_and_docstring_references(self):
+        records = find([
+            '"""Module citing ' + DOI_1 + '"""',
+            '@add_reference(short_purpose="p", reference="Reference 1")',
+            'def some_function():',
+            '    """See :cite:`Smith2001`."""',
+        ], docstrings=True)
+        assert [(r.name, r.line) for r in records] == [('', 1), ('some_function', 3)]
+        assert records[1].references == ['Reference 1', 'Smith2001']
+        assert records[1].short_purpose == ['p', DOCSTRING_SHORT_PURPOSE]
+
+    def test_should_skip_docstrings_by_default(self):
+        assert find(['"""Module citing ' + DOI_1 + '"""']) == []
+
+    def test_should_skip_invalid_python(self):
+        assert find(['print "python 2"']) == []
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from r2t2 import bibtex
+from r2t2.bibtex import INDEX_SUFFIX, BibIndex, iter_entries
+
+
+SMITH = """@article{Smith2001,
+  title = {A {Nested} title},
+  author = {Smith, John},
+}"""
+
+JOHNSON = """@Book(Johnson2002, title = {Parentheses (and braces)}, year = 2002)"""
+
+BIB = f"""% a comment with an email@example.com
+@string{{jan = "January"}}
+@comment{{Smith2001 is not here}}
+{SMITH}
+
+{JOHNSON}
+@misc{{Smith2001, note = {{duplicate, ignored}}}}
+"""
+
+
+@pytest.fixture
+def bib_file(temp_dir):
+    path = temp_dir / "references.bib"
+    path.write_text(BIB)
+    return path
+
+
+class TestIterEntries:
+    def test_should_find_entries_with_braces_or_parentheses(self):
+        data = BIB.encode()
+        assert [
+            (key, data[start:end].decode()) for key, start, end in iter_entries(data)
+        ] == [
+            (b"Smith2001", SMITH),
+            (b"Johnson2002", JOHNSON),
+            (b"Smith2001", "@misc{Smith2001, note = {duplicate, ignored}}"),
+        ]
+
+    def test_should_stop_at_unbalanced_entry(self):
+        assert list(iter_entries(b"@article{A, title = {x}")) == []
+
+
+class TestBibIndex:
+    def test_should_return_entries_by_key(self, bib_file):
+        index = BibIndex(bib_file)
+        assert index.get("Smith2001") == SMITH
+        assert index.get("Johnson2002") == JOHNSON
+        assert index.get("Unknown") is None
+
+    def test_should_accept_empty_file(self, temp_dir):
+        (temp_dir / "empty.bib").write_text("")
+        assert BibIndex(temp_dir / "empty.bib").get("Smith2001") is None
+
+    def test_should_reuse_saved_index(self, bib_file, monkeypatch):
+        BibIndex(bib_file).get("Smith2001")
+        assert (bib_file.parent / (bib_file.name + INDEX_SUFFIX)).is_file()
+
+        monkeypatch.setattr(bibtex, "build_index", None)
+        assert BibIndex(bib_file).get("Johnson2002") == JOHNSON
+
+    def test_should_index_again_when_file_changes(self, bib_file):
+        BibIndex(bib_file).get("Smith2001")
+        bib_file.write_text(JOHNSON)
+        stat = bib_file.stat()
+        os.utime(bib_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+        index = BibIndex(bib_file)
+        assert index.get("Smith2001") is None
+        assert index.get("Johnson2002") == JOHNSON
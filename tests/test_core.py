@@ -1,5 +1,33 @@
-from r2t2.core import add_reference
-from pytest import raises
+import gc
+import os
+import subprocess
+import sys
+import threading
+import time
+import weakref
+
+from r2t2.core import (
+    REGISTRY,
+    ZERO_OVERHEAD_ENV,
+    FunctionReference,
+    add_reference,
+    function_identifier,
+)
+from pytest import fixture, raises
+
+
+@fixture
+def zero_overhead(bibliography):
+    bibliography.zero_overhead_mode()
+    yield bibliography
+    bibliography.zero_overhead_mode(False)
+
+
+@fixture
+def bib_with_profiling(bib_with_tracking):
+    bib_with_tracking.profile()
+    yield bib_with_tracking
+    bib_with_tracking.profile(False)
 
 
 class TestAddReference:
@@ -84,6 +112,392 @@ class TestAddReference:
         decorated_with_doi()
         assert "https://doi.org/" in bib_with_tracking.references[-1]
 
+    def test_locates_source_only_once(
+        self, monkeypatch, bib_with_tracking, decorated_function
+    ):
+        import r2t2.core
+
+        calls = []
+        locate = r2t2.core._locate
+
+        def counting_locate(wrapped):
+            calls.append(wrapped)
+            return locate(wrapped)
+
+        monkeypatch.setattr(r2t2.core, "_locate", counting_locate)
+        decorated_function()
+        decorated_function()
+        bib_with_tracking.clear()
+        decorated_function()
+
+        assert len(calls) == 1
+        assert "Great British Roasts, 2019" in bib_with_tracking.references
+
+    def test_locates_method_once_for_all_instances(
+        self, monkeypatch, bib_with_tracking
+    ):
+        import r2t2.core
+
+        calls = []
+        locate = r2t2.core._locate
+
+        def counting_locate(wrapped):
+            calls.append(wrapped)
+            return locate(wrapped)
+
+        monkeypatch.setattr(r2t2.core, "_locate", counting_locate)
+
+        class Recipe:
+            @add_reference(short_purpose="testing", reference="Reference 1")
+            def cook(self):
+                pass
+
+        instances = [Recipe() for _ in range(5)]
+        for instance in instances:
+            instance.cook()
+        references = [weakref.ref(instance) for instance in instances]
+        del instance, instances
+        gc.collect()
+
+        assert len(calls) == 1
+        assert all(reference() is None for reference in references)
+        assert bib_with_tracking.references == ["Reference 1"]
+
+
+class TestZeroOverhead:
+    def test_returns_function_untouched(self, zero_overhead):
+        def my_func():
+            pass
+
+        decorated = add_reference(short_purpose="testing", reference="Reference 1")(
+            my_func
+        )
+
+        assert decorated is my_func
+        assert REGISTRY[my_func] == [("testing", "Reference 1")]
+
+    def test_registers_stacked_references(self, zero_overhead):
+        @add_reference(short_purpose="testing", reference="Reference 1")
+        @add_reference(short_purpose="testing", doi="10.5281/zenodo.1185316")
+        def my_func():
+            pass
+
+        assert REGISTRY[my_func] == [
+            ("testing", "https://doi.org/10.5281/zenodo.1185316"),
+            ("testing", "Reference 1"),
+        ]
+
+    def test_registers_static_and_class_methods(self, zero_overhead):
+        class Recipe:
+            @add_reference(short_purpose="testing", reference="Reference 1")
+            @staticmethod
+            def boil():
+                return "boiled"
+
+            @add_reference(short_purpose="testing", reference="Reference 2")
+            @classmethod
+            def roast(cls):
+                return cls
+
+        assert Recipe.boil() == "boiled"
+        assert Recipe.roast() is Recipe
+        assert REGISTRY[Recipe.boil] == [("testing", "Reference 1")]
+        assert REGISTRY[Recipe.roast.__func__] == [("testing", "Reference 2")]
+
+    def test_wraps_objects_that_cannot_be_registered(self, zero_overhead):
+        class Boil:
+            __slots__ = ()
+
+            def __call__(self):
+                return "boiled"
+
+        boil = Boil()
+        decorated = add_reference(short_purpose="testing", reference="Reference 1")(
+            boil
+        )
+
+        assert decorated is not boil
+        assert decorated() == "boiled"
+
+    def test_still_wraps_while_tracking(self, zero_overhead):
+        zero_overhead.tracking()
+
+        @add_reference(short_purpose="testing", reference="Reference 1")
+        def my_func():
+            pass
+
+        my_func()
+        zero_overhead.tracking(False)
+
+        assert my_func not in REGISTRY
+        assert zero_overhead.references == ["Reference 1"]
+
+    def test_enabled_from_environment(self):
+        code = "from r2t2 import BIBLIOGRAPHY; print(BIBLIOGRAPHY.zero_overhead)"
+        env = dict(os.environ, **{ZERO_OVERHEAD_ENV: "1"})
+        output = subprocess.run(
+            [sys.executable, "-c", code], env=env, stdout=subprocess.PIPE, check=True
+        ).stdout
+
+        assert output.strip() == b"True"
+
+
+class TestThreadSafety:
+    def test_records_each_reference_once_from_many_threads(self, bib_with_tracking):
+        @add_reference(short_purpose="Function 1", reference="Reference 1")
+        @add_reference(short_purpose="Function 1", reference="Reference 2")
+        def my_func_1():
+            pass
+
+        @add_reference(short_purpose="Function 2", reference="Reference 3")
+        def my_func_2():
+            pass
+
+        n_threads = 32
+        barrier = threading.Barrier(n_threads)
+
+        def worker():
+            barrier.wait()
+            for _ in range(500):
+                my_func_1()
+                my_func_2()
+
+        threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(bib_with_tracking) == 2
+        assert sorted(bib_with_tracking.references) == [
+            "Reference 1",
+            "Reference 2",
+            "Reference 3",
+        ]
+        for record in bib_with_tracking.values():
+            assert len(record.references) == len(set(record.references))
+            assert len(record.short_purpose) == len(record.references)
+
+    def test_merges_records_while_threads_are_running(self, bib_with_tracking):
+        @add_reference(short_purpose="testing", reference="Reference 1")
+        def my_func():
+            pass
+
+        called = threading.Event()
+        release = threading.Event()
+
+        def worker():
+            my_func()
+            called.set()
+            release.wait()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        called.wait()
+        try:
+            assert bib_with_tracking.references == ["Reference 1"]
+        finally:
+            release.set()
+            thread.join()
+
+
+class TestProfiling:
+    def test_does_not_time_by_default(self, bib_with_tracking, decorated_function):
+        decorated_function()
+        assert bib_with_tracking.timings == {}
+        assert "Calls:" not in str(bib_with_tracking)
+
+    def test_counts_calls_and_time(self, bib_with_profiling):
+        @add_reference(short_purpose="testing", reference="Reference 1")
+        def sleeper():
+            time.sleep(0.02)
+
+        for _ in range(3):
+            sleeper()
+
+        identifier = next(iter(bib_with_profiling))
+        timing = bib_with_profiling.timings[identifier]
+        assert timing.calls == 3
+        assert timing.wall >= 0.06
+        assert timing.cpu < timing.wall
+        assert 0 < bib_with_profiling.overhead < timing.wall
+
+    def test_times_the_outermost_recursive_call_only(self, bib_with_profiling):
+        @add_reference(short_purpose="testing", reference="Reference 1")
+        def countdown(n):
+            time.sleep(0.01)
+            if n > 1:
+                countdown(n - 1)
+
+        start = time.perf_counter()
+        countdown(3)
+        elapsed = time.perf_counter() - start
+
+        timing = next(iter(bib_with_profiling.timings.values()))
+        assert timing.calls == 3
+        assert 0.03 <= timing.wall <= elapsed
+
+    def test_adds_up_the_calls_of_all_threads(self, bib_with_profiling):
+        @add_reference(short_purpose="testing", reference="Reference 1")
+        def my_func():
+            pass
+
+        threads = [
+            threading.Thread(target=lambda: [my_func() for _ in range(100)])
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        my_func()
+
+        timing = next(iter(bib_with_profiling.timings.values()))
+        assert timing.calls == 801
+
+    def test_reports_calls_and_overhead(self, bib_with_profiling, decorated_function):
+        decorated_function()
+        report = str(bib_with_profiling)
+        assert "Calls: 1, wall time: " in report
+        assert "Overhead of r2t2: " in report
+
+        bib_with_profiling.clear()
+        assert bib_with_profiling.timings == {}
+        assert bib_with_profiling.overhead == 0
+
+
+class TestPendingRecords:
+    def test_records_again_after_pop(self, bib_with_tracking, decorated_function):
+        decorated_function()
+        identifier = next(iter(bib_with_tracking))
+        bib_with_tracking.pop(identifier)
+        assert identifier not in bib_with_tracking
+
+        decorated_function()
+        assert bib_with_tracking.references == ["Great British Roasts, 2019"]
+
+    def test_pending_records_are_merged_before_removal(
+        self, bib_with_tracking, decorated_function
+    ):
+        decorated_function()
+        bib_with_tracking.popitem()
+        assert len(bib_with_tracking) == 0
+
+    def test_records_again_after_del(self, bib_with_tracking, decorated_function):
+        decorated_function()
+        del bib_with_tracking[next(iter(bib_with_tracking))]
+
+        decorated_function()
+        assert len(bib_with_tracking) == 1
+
+    def test_copy_includes_pending_records(
+        self, bib_with_tracking, decorated_function
+    ):
+        decorated_function()
+        assert len(bib_with_tracking.copy()) == 1
+
+
+class TestIndex:
+    def test_merges_references_of_the_same_object(self, bibliography):
+        first = FunctionReference("f", 3, "a.py", ["p1"], ["Reference 1"])
+        second = FunctionReference(
+            "f", 3, "a.py", ["p1", "p2"], ["Reference 1", "Reference 2"]
+        )
+
+        identifier = bibliography.add(first)
+        assert bibliography.add(second) == identifier
+
+        assert len(bibliography) == 1
+        assert bibliography[identifier].references == ["Reference 1", "Reference 2"]
+        assert bibliography[identifier].short_purpose == ["p1", "p2"]
+
+    def test_finds_the_objects_citing_a_reference(self, bibliography):
+        bibliography.add(FunctionReference("f", 3, "a.py", ["p"], ["Reference 1"]))
+        bibliography.add(FunctionReference("g", 9, "a.py", ["p"], ["Reference 1"]))
+        bibliography.add(FunctionReference("h", 5, "b.py", ["p"], ["Reference 2"]))
+
+        assert [r.name for r in bibliography.cited_by("Reference 1")] == ["f", "g"]
+        assert bibliography.cited_by("Reference 3") == []
+
+    def test_forgets_references_of_removed_records(self, bibliography):
+        identifier = bibliography.add(
+            FunctionReference("f", 3, "a.py", ["p"], ["Reference 1"])
+        )
+        bibliography.add(FunctionReference("g", 9, "a.py", ["p"], ["Reference 2"]))
+
+        del bibliography[identifier]
+
+        assert bibliography.references == ["Reference 2"]
+        assert bibliography.cited_by("Reference 1") == []
+
+    def test_sorts_records_and_references(self, bibliography):
+        g = bibliography.add(FunctionReference("g", 9, "a.py", ["p"], ["Reference 2"]))
+        f = bibliography.add(
+            FunctionReference(
+                "f", 3, "a.py", ["p", "p"], ["Reference 1", "Reference 2"]
+            )
+        )
+        records = {g: bibliography[g], f: bibliography[f]}
+
+        bibliography.sort(key=[f, g].index)
+
+        assert list(bibliography.items()) == [(f, records[f]), (g, records[g])]
+        assert bibliography.references == ["Reference 1", "Reference 2"]
+        assert bibliography.cited_by("Reference 2") == [records[f], records[g]]
+
+    def test_identifier_ignores_relative_paths(self):
+        assert function_identifier("a.py", "f", 3) == function_identifier(
+            os.path.abspath("a.py"), "f", 3
+        )
+
+
+class TestCompactRecords:
+    def test_reads_copies_of_the_records(self, bibliography):
+        identifier = bibliography.add(
+            FunctionReference("f", 3, "a.py", ["p1"], ["Reference 1"])
+        )
+        record = bibliography[identifier]
+        record.short_purpose.append("p2")
+        record.references.append("Reference 2")
+        assert bibliography[identifier].references == ["Reference 1"]
+
+        bibliography[identifier] = record
+        assert bibliography[identifier].references == ["Reference 1", "Reference 2"]
+        assert bibliography.cited_by("Reference 2") == [record]
+
+    def test_stores_each_string_once(self, bibliography):
+        first = bibliography.add(
+            FunctionReference("f", 3, "a.py", ["purpose"], ["Reference 1"])
+        )
+        second = bibliography.add(
+            FunctionReference(
+                "g", 9, "a.py", ["".join("purpose")], ["".join("Reference 1")]
+            )
+        )
+        assert bibliography[first].references[0] is bibliography[
+            second
+        ].references[0]
+        assert bibliography[first].short_purpose[0] is bibliography[
+            second
+        ].short_purpose[0]
+
+    def test_keeps_every_field(self, bibliography):
+        records = {
+            "custom key": FunctionReference("f", None, "a.py", ["p"], ["Ref 1"]),
+            "a.py:g:-1": FunctionReference("h", -1, "a.py", ["p"], ["Ref 2"]),
+            function_identifier("b.py", "", 1): FunctionReference(
+                "", 1, "b.py", [], []
+            ),
+        }
+        for key, record in records.items():
+            bibliography[key] = record
+
+        assert bibliography == records
+        assert bibliography.copy() == records
+        assert dict(bibliography) == records
+        assert list(bibliography.values()) == list(records.values())
+        assert bibliography.pop("custom key") == records["custom key"]
+
 
 class TestAddSource:
 
@@ -110,3 +524,21 @@ class TestAddSource:
         bibliography.add_source(source)
         assert "tests" in bibliography._sources
         assert bibliography._sources["tests"] == source
+
+    def test_add_source_for_package(self, bibliography, tmp_path):
+        source = tmp_path / "my_source.bib"
+        source.open("w").close()
+        bibliography.add_source(source, package="other")
+        assert bibliography._sources["other"] == source
+
+    def test_citation(self, bibliography, tmp_path):
+        source = tmp_path / "my_source.bib"
+        source.write_text("@book{Smith2001,\n  year = 2001\n}\n")
+        bibliography.add_source(source)
+        entry = "@book{Smith2001,\n  year = 2001\n}"
+        assert bibliography.citation("Smith2001") == entry
+        assert bibliography.citation("Johnson2002") is None
+
+        bibliography.add(FunctionReference("f", 3, "a.py", ["p"], ["Smith2001"]))
+        report = str(bibliography)
+        assert "\t\t@book{Smith2001,\n\t\t  year = 2001\n\t\t}\n" in report
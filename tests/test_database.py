@@ -0,0 +1,117 @@
+import pytest
+
+from r2t2.__main__ import main
+from r2t2.core import Biblio, FunctionReference
+from r2t2.database import BiblioDatabase, reference_variants
+
+
+DOI = "10.5281/zenodo.1185316"
+
+
+@pytest.fixture
+def biblio(temp_dir):
+    src = temp_dir / "src"
+    biblio = Biblio()
+    biblio.add(FunctionReference("first", 3, str(src / "a.py"), ["p1"], ["Ref 1"]))
+    biblio.add(
+        FunctionReference(
+            "second", 9, str(src / "sub" / "b.py"), ["p2", "p3"],
+            ["Ref 1", f"https://doi.org/{DOI}"],
+        )
+    )
+    biblio.add(FunctionReference("first", 1, str(temp_dir / "src2.py"), ["p"], [DOI]))
+    return biblio
+
+
+@pytest.fixture
+def database(biblio, temp_dir):
+    with BiblioDatabase(temp_dir / "refs.sqlite") as database:
+        database.store(biblio)
+        yield database
+
+
+def names(found):
+    return [(record.name, record.line) for _, record in found]
+
+
+class TestBiblioDatabase:
+    def test_should_find_all_the_records(self, database, biblio):
+        assert dict(database.find()) == biblio
+
+    def test_should_find_records_citing_a_reference(self, database):
+        assert names(database.find(reference="Ref 1")) == [("first", 3), ("second", 9)]
+
+    @pytest.mark.parametrize("reference", [DOI, f"https://dx.doi.org/{DOI}"])
+    def test_should_find_doi_however_it_was_cited(self, database, reference):
+        found = names(database.find(reference=reference))
+        assert found == [("second", 9), ("first", 1)]
+
+    def test_should_find_records_under_a_folder(self, database, temp_dir):
+        assert names(database.find(path=temp_dir / "src")) == [
+            ("first", 3), ("second", 9)
+        ]
+        assert names(database.find(path=temp_dir / "src" / "sub")) == [("second", 9)]
+        assert names(database.find(path=temp_dir / "src2.py")) == [("first", 1)]
+
+    def test_should_combine_criteria(self, database, temp_dir):
+        assert names(database.find(reference=DOI, name="first")) == [("first", 1)]
+        assert names(database.find(reference="Ref 1", path=temp_dir / "src2.py")) == []
+
+    def test_should_add_references_to_stored_records(self, database, biblio):
+        record = next(iter(biblio.values()))
+        more = Biblio()
+        more.add(record._replace(short_purpose=["new"], references=["Ref 2"]))
+
+        database.store(more)
+
+        found = dict(database.find(name="first", reference="Ref 2"))
+        assert [r.references for r in found.values()] == [["Ref 1", "Ref 2"]]
+
+    def test_should_replace_records_of_files_analysed_again(
+        self, database, temp_dir
+    ):
+        changed = Biblio()
+        changed.add(
+            FunctionReference("moved", 4, str(temp_dir / "src" / "a.py"), ["p"], ["X"])
+        )
+
+        database.store(
+            changed, replace=[temp_dir / "src" / "a.py", temp_dir / "src2.py"]
+        )
+
+        assert names(database.find()) == [("moved", 4), ("second", 9)]
+        assert names(database.find(reference="Ref 1")) == [("second", 9)]
+
+
+def test_should_give_all_forms_of_a_doi():
+    assert set(reference_variants(DOI)) == set(
+        reference_variants(f"https://doi.org/{DOI}")
+    )
+    assert reference_variants("Great British Roasts, 2019") == [
+        "Great British Roasts, 2019"
+    ]
+
+
+@pytest.mark.usefixtures("bibliography")
+class TestQuerySubCommand:
+    def test_should_query_database_written_by_static(self, temp_dir, capsys):
+        database = temp_dir / "refs.sqlite"
+        main([
+            "static",
+            "--docstring",
+            f"--db={database}",
+            f"--output={temp_dir / 'references'}",
+            "--format=markdown",
+            "docs/examples",
+        ])
+
+        main(["query", str(database), "--cites", DOI])
+        records = capsys.readouterr().out
+        main(["query", str(database), "--under", "docs/examples", "--references"])
+        references = capsys.readouterr().out.splitlines()
+
+        first = "docs/examples/docstring_doi.py:1 my_great_function\n"
+        assert records.startswith(first)
+        assert f"from docstring - https://doi.org/{DOI}\n" in records
+        assert "Reference 2" in references
+        assert len(references) == len(set(references))
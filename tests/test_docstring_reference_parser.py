@@ -73,7 +73,16 @@ class TestParseAndAddDocstringReferencesFromFiles:
             [file_path],
             biblio=biblio
         )
-        assert biblio == {expected_identifier: existing_function_reference}
+        # the docstring references are added to the existing record
+        assert biblio == {
+            expected_identifier: FunctionReference(
+                name='other',
+                source='other.py',
+                line=-1,
+                short_purpose=['For testing', DOCSTRING_SHORT_PURPOSE],
+                references=['test/123', DOI_URL_HTTPS_PREFIX + DOI_1]
+            )
+        }
 
     def test_should_not_add_function_reference_without_references(
         self, temp_dir: Path
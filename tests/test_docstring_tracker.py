@@ -0,0 +1,128 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from r2t2.docstring_reference_parser import DOCSTRING_SHORT_PURPOSE
+from r2t2.docstring_tracker import (
+    DocstringTracker,
+    find_cited_functions,
+    index_cited_functions,
+)
+
+
+SOURCE = '''
+import functools
+
+
+def cited():
+    """Uses :cite:`Smith2001`."""
+    return 1
+
+
+def not_cited():
+    """No reference here."""
+    return 2
+
+
+@functools.lru_cache()
+def decorated():
+    """See https://doi.org/10.1000/xyz123 for details."""
+    return 3
+
+
+class Model:
+    def method(self):
+        """Uses :cite:`Johnson2002`."""
+        return 4
+'''
+
+
+@pytest.fixture
+def module(temp_dir: Path):
+    filename = temp_dir / "module.py"
+    filename.write_text(SOURCE)
+    namespace: dict = {}
+    exec(compile(SOURCE, str(filename), "exec"), namespace)
+    return filename, namespace
+
+
+class TestFindCitedFunctions:
+    def test_should_key_functions_by_code_object(self, module):
+        filename, namespace = module
+        found = dict(find_cited_functions(SOURCE, str(filename)))
+
+        for function in (namespace["cited"], namespace["decorated"].__wrapped__):
+            code = function.__code__
+            _, name, line, source, _ = found[
+                (str(filename), code.co_firstlineno, code.co_name)
+            ]
+            assert name == function.__name__
+            assert source == str(filename)
+        # the line of the record is that of the def, after the decorator
+        assert found[(str(filename), 15, "decorated")][2] == 16
+        assert len(found) == 3
+
+    def test_should_skip_files_without_references(self, temp_dir):
+        filename = temp_dir / "empty.py"
+        filename.write_text("def f():\n    'Nothing.'\n")
+        assert index_cited_functions([filename]) == {}
+
+
+class TestDocstringTracker:
+    def test_should_record_the_functions_that_run(self, bib_with_tracking, module):
+        filename, namespace = module
+        with DocstringTracker(index_cited_functions([filename])):
+            namespace["cited"]()
+            namespace["not_cited"]()
+            namespace["Model"]().method()
+
+        assert sorted(bib_with_tracking.references) == ["Johnson2002", "Smith2001"]
+        names = sorted(record.name for record in bib_with_tracking.values())
+        assert names == ["cited", "method"]
+        for record in bib_with_tracking.values():
+            assert record.short_purpose == [DOCSTRING_SHORT_PURPOSE]
+
+    def test_should_record_functions_run_by_other_threads(
+        self, bib_with_tracking, module
+    ):
+        filename, namespace = module
+        with DocstringTracker(index_cited_functions([filename])):
+            thread = threading.Thread(target=namespace["decorated"])
+            thread.start()
+            thread.join()
+
+        assert bib_with_tracking.references == ["https://doi.org/10.1000/xyz123"]
+
+    @pytest.mark.skipif(
+        hasattr(sys, "monitoring"), reason="sys.monitoring is used instead"
+    )
+    def test_should_stop_profiling_once_every_function_ran(
+        self, bib_with_tracking, module
+    ):
+        filename, namespace = module
+        tracker = DocstringTracker(index_cited_functions([filename]))
+        try:
+            tracker.start()
+            namespace["cited"]()
+            assert sys.getprofile() is not None
+            namespace["decorated"]()
+            namespace["Model"]().method()
+            namespace["not_cited"]()
+            assert sys.getprofile() is None
+        finally:
+            tracker.stop()
+
+    @pytest.mark.skipif(
+        not hasattr(sys, "monitoring"), reason="sys.monitoring is not available"
+    )
+    def test_should_free_the_monitoring_tool(self, bib_with_tracking, module):
+        filename, namespace = module
+        tracker = DocstringTracker(index_cited_functions([filename]))
+        with tracker:
+            tool = tracker._tool
+            assert sys.monitoring.get_tool(tool) == "r2t2"
+            namespace["cited"]()
+        assert sys.monitoring.get_tool(tool) is None
+        assert bib_with_tracking.references == ["Smith2001"]
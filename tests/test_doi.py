@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+
+from r2t2.__main__ import main
+from r2t2.core import FunctionReference
+from r2t2.doi import (
+    CSL_JSON,
+    DoiMetadata,
+    DoiResolver,
+    doi_from_reference,
+    resolve_bibliography,
+)
+
+
+DOI_1 = "10.1234/zenodo.1"
+DOI_2 = "10.1234/zenodo.2"
+UNKNOWN_DOI = "10.1234/unknown"
+
+CSL = {
+    "title": "A great paper",
+    "author": [{"given": "John", "family": "Smith"}, {"literal": "The Team"}],
+    "issued": {"date-parts": [[2001, 2, 3]]},
+}
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def stub():
+    """Local resolver, counting the requests for each DOI."""
+    state = {"requests": {}, "active": 0, "max_active": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            doi = self.path.lstrip("/")
+            with lock:
+                state["requests"][doi] = state["requests"].get(doi, 0) + 1
+                state["active"] += 1
+                state["max_active"] = max(state["max_active"], state["active"])
+            time.sleep(0.05)
+            with lock:
+                state["active"] -= 1
+            if doi == UNKNOWN_DOI or self.headers["Accept"] != CSL_JSON:
+                self.send_error(404)
+                return
+            body = json.dumps(dict(CSL, DOI=doi)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CSL_JSON)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = _Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True
+    )
+    thread.start()
+    state["endpoint"] = "http://127.0.0.1:%d" % server.server_address[1]
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def metadata(doi):
+    return DoiMetadata(doi, "A great paper", ["John Smith", "The Team"], 2001)
+
+
+class TestDoiResolver:
+    def test_should_resolve_each_doi_once(self, stub, temp_dir):
+        resolver = DoiResolver(temp_dir / "doi.sqlite", endpoint=stub["endpoint"])
+        results = resolver.resolve_all([DOI_1, DOI_2, DOI_1, UNKNOWN_DOI, DOI_2])
+
+        assert results == {
+            DOI_1: metadata(DOI_1), DOI_2: metadata(DOI_2), UNKNOWN_DOI: None
+        }
+        assert stub["requests"] == {DOI_1: 1, DOI_2: 1, UNKNOWN_DOI: 1}
+
+    def test_should_use_cache_across_runs(self, stub, temp_dir):
+        cache = temp_dir / "doi.sqlite"
+        DoiResolver(cache, endpoint=stub["endpoint"]).resolve_all([DOI_1, UNKNOWN_DOI])
+
+        resolver = DoiResolver(cache, endpoint=stub["endpoint"])
+        assert resolver.resolve_all([DOI_1, UNKNOWN_DOI]) == {
+            DOI_1: metadata(DOI_1), UNKNOWN_DOI: None
+        }
+        assert resolver.requests == 0
+
+    def test_should_only_use_cache_offline(self, stub, temp_dir):
+        cache = temp_dir / "doi.sqlite"
+        DoiResolver(cache, endpoint=stub["endpoint"]).resolve_all([DOI_1])
+
+        resolver = DoiResolver(cache, endpoint=stub["endpoint"], offline=True)
+        assert resolver.resolve_all([DOI_1, DOI_2]) == {
+            DOI_1: metadata(DOI_1), DOI_2: None
+        }
+        assert stub["requests"] == {DOI_1: 1}
+
+    def test_should_bound_concurrency(self, stub, temp_dir):
+        resolver = DoiResolver(
+            temp_dir / "doi.sqlite", endpoint=stub["endpoint"], concurrency=2
+        )
+        resolver.resolve_all([f"10.1234/zenodo.{i}" for i in range(8)])
+        assert resolver.requests == 8
+        assert stub["max_active"] <= 2
+
+    def test_should_not_cache_failures(self, temp_dir):
+        # nothing listens on port 9 of the local host
+        cache = temp_dir / "doi.sqlite"
+        resolver = DoiResolver(cache, endpoint="http://127.0.0.1:9", timeout=1)
+        assert resolver.resolve_all([DOI_1]) == {DOI_1: None}
+        assert DoiResolver(cache, offline=True).cache.get([DOI_1]) == {}
+
+
+def test_doi_from_reference():
+    assert doi_from_reference("https://doi.org/" + DOI_1) == DOI_1
+    assert doi_from_reference("Great British Roasts, 2019") is None
+
+
+def test_resolve_bibliography(stub, temp_dir, bibliography):
+    bibliography.add(FunctionReference(
+        "f", 3, "a.py", ["p", "p"], ["https://doi.org/" + DOI_1, "Smith2001"]
+    ))
+    resolver = DoiResolver(temp_dir / "doi.sqlite", endpoint=stub["endpoint"])
+
+    assert resolve_bibliography(bibliography, resolver) == 1
+    assert bibliography.citation("https://doi.org/" + DOI_1) == (
+        "John Smith, The Team (2001). A great paper"
+    )
+    assert "\t\tJohn Smith, The Team (2001). A great paper\n" in str(bibliography)
+
+
+def test_should_resolve_dois_from_command_line(stub, temp_dir, bibliography, capsys):
+    main([
+        "static",
+        "--docstring",
+        "--resolve-doi",
+        "--doi-endpoint",
+        stub["endpoint"],
+        "--doi-cache",
+        str(temp_dir / "doi.sqlite"),
+        "docs/examples/docstring_doi.py",
+    ])
+    assert "\t\tJohn Smith, The Team (2001). A great paper\n" in capsys.readouterr().out
@@ -0,0 +1,91 @@
+import json
+import tracemalloc
+
+import pytest
+
+from r2t2 import notebook
+from r2t2.notebook import iter_markdown_cells
+
+
+def write_notebook(path, cells, **kwargs):
+    path.write_text(
+        json.dumps({"cells": cells, "metadata": {"kernel": [1, 2.5, None]}}, **kwargs)
+    )
+    return path
+
+
+def markdown(source, **fields):
+    return dict(cell_type="markdown", metadata={}, source=source, **fields)
+
+
+def code(source, outputs=()):
+    return dict(
+        cell_type="code",
+        execution_count=1,
+        metadata={"tags": ["a", "{]"]},
+        outputs=list(outputs),
+        source=source,
+    )
+
+
+IMAGE = {
+    "data": {"image/png": "iVBORw0KGgo" * 1000, "text/plain": ["<Figure \"1\">"]},
+    "output_type": "display_data",
+}
+
+CELLS = [
+    markdown(["See \\cite{Smith2001}\n", "and doi:10.1234/zenodo.1234567"]),
+    code(["print('\"')\n"], outputs=[IMAGE]),
+    markdown("Unicode: \u00e9\u00e8 \U0001F600 \"quoted\" \\ end", attachments={
+        "image.png": {"image/png": "iVBORw0KGgo" * 100}
+    }),
+    markdown([]),
+    code("x = {'[': ']'}"),
+]
+
+
+class TestIterMarkdownCells:
+    @pytest.mark.parametrize("chunk_size", [1, 5, 7, 1 << 16])
+    @pytest.mark.parametrize("ensure_ascii", [True, False])
+    def test_should_return_markdown_sources(
+        self, temp_dir, monkeypatch, chunk_size, ensure_ascii
+    ):
+        # small chunks split the tokens and escape sequences at every position
+        monkeypatch.setattr(notebook, "_CHUNK_SIZE", chunk_size)
+        path = write_notebook(
+            temp_dir / "n.ipynb", CELLS, indent=1, ensure_ascii=ensure_ascii
+        )
+        assert list(iter_markdown_cells(path)) == [
+            (0, "See \\cite{Smith2001}\nand doi:10.1234/zenodo.1234567"),
+            (2, CELLS[2]["source"]),
+        ]
+
+    def test_should_accept_compact_json_with_unsorted_keys(self, temp_dir):
+        cell = {"source": ["Some text"], "cell_type": "markdown"}
+        path = write_notebook(temp_dir / "n.ipynb", [cell], separators=(",", ":"))
+        assert list(iter_markdown_cells(path)) == [(0, "Some text")]
+
+    def test_should_accept_notebook_without_cells(self, temp_dir):
+        (temp_dir / "n.ipynb").write_text('{"cells": [], "nbformat": 4}')
+        assert list(iter_markdown_cells(temp_dir / "n.ipynb")) == []
+
+    def test_should_fail_on_truncated_notebook(self, temp_dir):
+        path = write_notebook(temp_dir / "n.ipynb", CELLS)
+        path.write_text(path.read_text()[:-20])
+        with pytest.raises(ValueError):
+            list(iter_markdown_cells(path))
+
+    def test_should_not_keep_outputs_in_memory(self, temp_dir):
+        output = dict(IMAGE, data={"image/png": "iVBORw0KGgo" * 1000000})
+        path = write_notebook(
+            temp_dir / "n.ipynb", [code("plot()", outputs=[output]), markdown("x")]
+        )
+
+        tracemalloc.start()
+        try:
+            assert list(iter_markdown_cells(path)) == [(1, "x")]
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # the output alone is more than 10 MB
+        assert peak < 1000000
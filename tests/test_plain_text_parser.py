@@ -1,5 +1,6 @@
 from r2t2.plain_text_parser import (
-    parse_plain_text_references
+    parse_plain_text_references,
+    parse_plain_text_references_batch
 )
 
 
@@ -68,3 +69,35 @@ class TestParsePlainTextReferences:
         assert parse_plain_text_references(
             r'\\cite ' + REF_NAME_1
         ) == [REF_NAME_1]
+
+    def test_should_keep_order_of_kinds(self):
+        assert parse_plain_text_references(
+            r'\\cite ' + REF_NAME_2 + r' :cite:`' + REF_NAME_1 + r'` ' + DOI_1
+        ) == [DOI_URL_HTTPS_PREFIX + DOI_1, REF_NAME_1, REF_NAME_2]
+
+    def test_should_find_overlapping_references_of_different_kinds(self):
+        assert parse_plain_text_references(
+            r':cite:`' + DOI_1 + r'`'
+        ) == [DOI_URL_HTTPS_PREFIX + DOI_1 + '`', DOI_1]
+
+    def test_should_scan_unclosed_citations_in_linear_time(self):
+        # each attempt would otherwise search up to the end of the text
+        assert parse_plain_text_references(r'\\cite{' * 100000) == []
+        assert parse_plain_text_references(r'\\cite[' * 100000) == []
+
+
+class TestParsePlainTextReferencesBatch:
+    def test_should_return_references_of_each_text_in_order(self):
+        assert parse_plain_text_references_batch([
+            r':cite:`' + REF_NAME_1 + r'`',
+            'description of some function',
+            DOI_1,
+        ]) == [[REF_NAME_1], [], [DOI_URL_HTTPS_PREFIX + DOI_1]]
+
+    def test_should_not_match_across_texts(self):
+        assert parse_plain_text_references_batch(
+            [r'\\cite{' + REF_NAME_1, r'}', r'\\cite', REF_NAME_2]
+        ) == [[], [], [], []]
+
+    def test_should_return_empty_list_for_no_text(self):
+        assert parse_plain_text_references_batch([]) == []
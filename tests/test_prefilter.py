@@ -0,0 +1,43 @@
+import pytest
+
+from r2t2 import static_parser
+from r2t2.prefilter import may_contain_references
+
+
+class TestMayContainReferences:
+    def test_should_skip_empty_file(self, temp_dir):
+        (temp_dir / "empty.py").write_bytes(b"")
+        assert not may_contain_references(temp_dir / "empty.py", docstrings=True)
+
+    def test_should_skip_file_without_tokens(self, temp_dir):
+        (temp_dir / "plain.py").write_text('def f():\n    """No citation."""\n')
+        assert not may_contain_references(temp_dir / "plain.py", docstrings=True)
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "import r2t2 as r\n@r.add_reference(short_purpose='p', reference='r')\n",
+            '"""See :cite:`Smith2001`."""\n',
+            '"""See \\\\cite{Smith2001}."""\n',
+            '"""See \\\\cite Smith2001."""\n',
+            '"""See doi:10.1234/zenodo.1234567."""\n',
+        ],
+    )
+    def test_should_keep_file_with_token(self, temp_dir, text):
+        (temp_dir / "cited.py").write_text(text)
+        assert may_contain_references(temp_dir / "cited.py", docstrings=True)
+
+    def test_should_ignore_citations_without_docstrings(self, temp_dir):
+        (temp_dir / "cited.py").write_text('"""See :cite:`Smith2001`."""\n')
+        assert not may_contain_references(temp_dir / "cited.py")
+
+    def test_should_keep_files_in_other_encodings(self, temp_dir):
+        (temp_dir / "utf16.py").write_text('"""\\cite{A}"""', encoding="utf-16")
+        assert may_contain_references(temp_dir / "utf16.py", encoding="utf-16")
+
+    def test_should_not_parse_skipped_files(self, temp_dir, monkeypatch):
+        (temp_dir / "plain.py").write_text("def f():\n    pass\n")
+        monkeypatch.setattr(static_parser, "find_references_in_source", None)
+        assert static_parser.find_references_in_file(
+            temp_dir / "plain.py", "utf-8"
+        ) == []
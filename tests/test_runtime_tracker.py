@@ -0,0 +1,103 @@
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+from r2t2.runtime_tracker import runtime_tracker
+
+
+SCRIPT = """
+import concurrent.futures
+import multiprocessing
+
+from r2t2 import add_reference
+
+
+@add_reference(short_purpose="Pool worker", reference="Reference 1")
+def pool_kernel(x):
+    return x + 1
+
+
+@add_reference(short_purpose="Executor worker", reference="Reference 2")
+def executor_kernel(x):
+    return x * 2
+
+
+if __name__ == "__main__":
+    context = multiprocessing.get_context("{method}")
+    # time out rather than hang if the workers cannot start
+    with context.Pool(2) as pool:
+        result = pool.map_async(pool_kernel, range(10)).get(timeout=60)
+        assert result == list(range(1, 11))
+    with concurrent.futures.ProcessPoolExecutor(2, mp_context=context) as executor:
+        result = list(executor.map(executor_kernel, range(10), timeout=60))
+        assert result == list(range(0, 20, 2))
+"""
+
+
+@pytest.mark.parametrize(
+    "method",
+    [
+        method
+        for method in ("fork", "spawn")
+        if method in multiprocessing.get_all_start_methods()
+    ],
+)
+def test_collects_references_from_worker_processes(
+    bibliography, temp_dir: Path, method: str
+):
+    script = temp_dir / "script.py"
+    script.write_text(SCRIPT.format(method=method))
+
+    runtime_tracker(str(script), [], encoding="utf-8")
+
+    assert sorted(bibliography.references) == ["Reference 1", "Reference 2"]
+    assert sorted(record.name for record in bibliography.values()) == [
+        "executor_kernel",
+        "pool_kernel",
+    ]
+
+
+@pytest.mark.parametrize(
+    "method",
+    [
+        method
+        for method in ("fork", "spawn")
+        if method in multiprocessing.get_all_start_methods()
+    ],
+)
+def test_profiles_worker_processes(bibliography, temp_dir: Path, method: str):
+    script = temp_dir / "script.py"
+    script.write_text(SCRIPT.format(method=method))
+
+    try:
+        runtime_tracker(str(script), [], encoding="utf-8", profile=True)
+    finally:
+        bibliography.profile(False)
+
+    # the pool is terminated, so its workers only leave their counters behind
+    calls = {
+        bibliography[identifier].name: timing.calls
+        for identifier, timing in bibliography.timings.items()
+    }
+    assert calls == {"pool_kernel": 10, "executor_kernel": 10}
+    assert bibliography.overhead > 0
+
+
+def test_tracks_functions_citing_references_in_docstrings(
+    bibliography, temp_dir: Path
+):
+    (temp_dir / "helpers.py").write_text(
+        "def used():\n"
+        "    '''Implements :cite:`Used2020`.'''\n"
+        "\n"
+        "\n"
+        "def unused():\n"
+        "    '''Implements :cite:`Unused2020`.'''\n"
+    )
+    script = temp_dir / "script.py"
+    script.write_text("import helpers\n\nhelpers.used()\n")
+
+    runtime_tracker(str(script), [], encoding="utf-8", docstring_paths=[])
+
+    assert bibliography.references == ["Used2020"]
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from r2t2 import static_parser
+from r2t2.scan_cache import ScanCache
+from r2t2.static_parser import locate_references
+
+
+SOURCE = (
+    "from r2t2 import add_reference\n\n\n"
+    '@add_reference(short_purpose="p", reference="{reference}")\n'
+    "def function():\n"
+    "    pass\n"
+)
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Names of the files actually parsed."""
+    names = []
+    find = static_parser.find_references_in_file
+
+    def counting(filename, *args, **kwargs):
+        names.append(os.path.basename(filename))
+        return find(filename, *args, **kwargs)
+
+    monkeypatch.setattr(static_parser, "find_references_in_file", counting)
+    return names
+
+
+def write(path, reference, mtime=1_000_000_000):
+    path.write_text(SOURCE.format(reference=reference))
+    # an old modification time, so the file is not considered as still changing
+    os.utime(path, (mtime, mtime))
+
+
+class TestScanCache:
+    def test_should_only_parse_changed_files(self, bibliography, temp_dir, parsed):
+        source, cache = temp_dir / "src", temp_dir / "cache"
+        source.mkdir()
+        write(source / "a.py", "Reference A")
+        write(source / "b.py", "Reference B")
+
+        locate_references(source, cache=cache)
+        write(source / "b.py", "Reference C", mtime=1_000_000_100)
+        bibliography.clear()
+        locate_references(source, cache=cache)
+
+        assert parsed == ["a.py", "b.py", "b.py"]
+        assert bibliography.references == ["Reference A", "Reference C"]
+
+    def test_should_parse_identical_files_once(self, bibliography, temp_dir, parsed):
+        write(temp_dir / "a.py", "Reference A")
+        write(temp_dir / "b.py", "Reference A")
+
+        locate_references(temp_dir, cache=temp_dir / "cache")
+
+        assert parsed == ["a.py"]
+        sources = sorted(os.path.basename(r.source) for r in bibliography.values())
+        assert sources == ["a.py", "b.py"]
+
+    def test_should_not_read_unchanged_files(self, temp_dir):
+        write(temp_dir / "a.py", "Reference A")
+        cache = ScanCache(temp_dir / "cache")
+        digest = cache.digest(temp_dir / "a.py")
+        cache.save()
+
+        # same size and modification time: the new content goes unnoticed
+        write(temp_dir / "a.py", "Reference B")
+        assert ScanCache(temp_dir / "cache").digest(temp_dir / "a.py") == digest
+
+    def test_should_separate_options(self, temp_dir):
+        with_docstrings = ScanCache(temp_dir, docstring=True)
+        without_docstrings = ScanCache(temp_dir, docstring=False)
+        assert with_docstrings.path != without_docstrings.path
+
+    def test_should_ignore_invalid_cache(self, temp_dir):
+        cache = ScanCache(temp_dir)
+        cache.path.write_text("not json")
+        assert ScanCache(temp_dir).get("0" * 64, "a.py") is None
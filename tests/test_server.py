@@ -0,0 +1,147 @@
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from r2t2.__main__ import main
+from r2t2.client import PROTOCOL, ServerError, send_request
+from r2t2.server import ReferenceServer
+
+
+def write_module(path, reference):
+    path.write_text(
+        "from r2t2 import add_reference\n\n\n"
+        f'@add_reference(short_purpose="p", reference="{reference}")\n'
+        "def function():\n"
+        "    pass\n"
+    )
+
+
+@pytest.fixture
+def tree(temp_dir):
+    for i in range(3):
+        write_module(temp_dir / f"module_{i}.py", f"Reference {i}")
+    return temp_dir
+
+
+@pytest.fixture
+def socket_path():
+    # the path of a Unix domain socket is limited to about a hundred characters
+    folder = tempfile.mkdtemp(prefix="r2t2-")
+    yield Path(folder) / "server.sock"
+    shutil.rmtree(folder)
+
+
+@pytest.fixture
+def server(socket_path):
+    server = ReferenceServer(socket_path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    # the socket is bound once the server answers
+    while True:
+        try:
+            send_request(socket_path, dict(command="ping"))
+            break
+        except OSError:
+            time.sleep(0.01)
+    yield server
+    send_request(socket_path, dict(command="shutdown"))
+    thread.join(timeout=10)
+    assert not socket_path.exists()
+
+
+def static_request(tree, output, **kwargs):
+    return dict(
+        dict(
+            command="static",
+            target=str(tree),
+            format="markdown",
+            output=str(output),
+            protocol=PROTOCOL,
+        ),
+        **kwargs,
+    )
+
+
+class TestReferenceServer:
+    def test_should_analyse_again_only_changed_files(self, tree, temp_dir):
+        server = ReferenceServer(temp_dir / "unused.sock")
+        output = temp_dir / "references.md"
+
+        assert server.handle(static_request(tree, output)) == {}
+        assert "Reference 1" in output.read_text()
+
+        write_module(tree / "module_1.py", "Changed reference")
+        assert server.handle(static_request(tree, output)) == {}
+
+        text = output.read_text()
+        assert "Reference 1" not in text
+        assert text.index("Reference 0") < text.index("Changed reference")
+        assert text.index("Changed reference") < text.index("Reference 2")
+        assert len(server._roots) == 1
+
+    def test_should_answer_errors(self, temp_dir):
+        server = ReferenceServer(temp_dir / "unused.sock")
+
+        assert "error" in server.handle(dict(command="static", protocol=PROTOCOL))
+        assert "error" in server.handle(dict(command="other", protocol=PROTOCOL))
+        assert "error" in server.handle(dict(command="ping", protocol=0))
+
+
+@pytest.mark.usefixtures("bibliography")
+class TestConnect:
+    def test_should_write_output_from_server(self, server, tree, socket_path):
+        main([
+            "static",
+            f"--connect={socket_path}",
+            "--format=markdown",
+            str(tree),
+        ])
+
+        assert "Reference 2" in (tree / "references.md").read_text()
+        roots = send_request(socket_path, dict(command="ping"))["roots"]
+        assert roots == [str(tree)]
+
+    def test_should_print_terminal_report(self, server, tree, socket_path, capsys):
+        main(["static", f"--connect={socket_path}", str(tree)])
+
+        assert "Reference 0" in capsys.readouterr().out
+
+    def test_should_report_errors_of_server(self, server, tree, socket_path):
+        with pytest.raises(ServerError, match="does not exist"):
+            main([
+                "static",
+                f"--connect={socket_path}",
+                f"--bib={tree / 'missing.bib'}",
+                str(tree),
+            ])
+
+    def test_should_analyse_here_without_server(
+        self, bibliography, tree, socket_path, capsys
+    ):
+        main(["static", f"--connect={socket_path}", str(tree)])
+
+        assert "Reference 0" in capsys.readouterr().out
+        assert len(bibliography) == 3
+
+
+def test_should_replace_socket_of_killed_server(socket_path):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(socket_path))
+    stale.close()
+
+    server = ReferenceServer(socket_path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    while True:
+        try:
+            assert send_request(socket_path, dict(command="ping")) == dict(roots=[])
+            break
+        except OSError:
+            time.sleep(0.01)
+    send_request(socket_path, dict(command="shutdown"))
+    thread.join(timeout=10)
@@ -0,0 +1,143 @@
+import pytest
+
+from r2t2.__main__ import main
+from r2t2.core import Biblio, FunctionReference
+from r2t2.snapshot import Snapshot, SnapshotError, merge_snapshots, write_snapshot
+from r2t2.static_parser import locate_references, select_shard
+
+
+def write_tree(root, count):
+    for i in range(count):
+        package = root / f"package_{i % 3}"
+        package.mkdir(exist_ok=True)
+        (package / f"module_{i}.py").write_text(
+            "from r2t2 import add_reference\n\n\n"
+            f'@add_reference(short_purpose="p{i}", reference="Reference {i}")\n'
+            f"def function_{i}():\n"
+            "    pass\n"
+        )
+
+
+@pytest.fixture
+def biblio():
+    biblio = Biblio()
+    biblio.add(FunctionReference("first", 3, "/src/a.py", ["Purpose"], ["Ref 1"]))
+    biblio.add(
+        FunctionReference("cell_1", None, "/src/b.ipynb", ["Cell", "Cell"], ["é", "x"])
+    )
+    biblio.add(FunctionReference("renamed", 7, "/src/c.py", ["p"], ["Ref 1"]), "key")
+    biblio.add(FunctionReference("empty", 1, "/src/d.py", [], []))
+    biblio.add_timing("key", 4, 0.5, 0.25, 0.01)
+    return biblio
+
+
+class TestSnapshot:
+    def test_should_round_trip_records_and_timings(self, biblio, temp_dir):
+        biblio.save(temp_dir / "refs.r2t2")
+
+        loaded = Biblio()
+        loaded.load(temp_dir / "refs.r2t2")
+
+        assert loaded == biblio
+        assert list(loaded) == list(biblio)
+        assert loaded.timings == biblio.timings
+        assert loaded.overhead == pytest.approx(0.01)
+        assert loaded.cited_by("Ref 1") == biblio.cited_by("Ref 1")
+
+    def test_should_know_whether_sorted_by_source(self, biblio, temp_dir):
+        write_snapshot(temp_dir / "sorted.r2t2", biblio.items())
+        write_snapshot(temp_dir / "unsorted.r2t2", reversed(list(biblio.items())))
+
+        with Snapshot(temp_dir / "sorted.r2t2") as snapshot:
+            assert snapshot.sorted
+        with Snapshot(temp_dir / "unsorted.r2t2") as snapshot:
+            assert not snapshot.sorted
+
+    def test_should_add_timings_of_several_snapshots(self, biblio, temp_dir):
+        biblio.save(temp_dir / "1.r2t2")
+        biblio.save(temp_dir / "2.r2t2")
+
+        merged = Biblio()
+        merge_snapshots([temp_dir / "1.r2t2", temp_dir / "2.r2t2"], merged)
+
+        assert merged == biblio
+        assert merged.timings["key"] == (8, 1.0, 0.5)
+
+    def test_should_fail_on_truncated_snapshot(self, biblio, temp_dir):
+        path = temp_dir / "refs.r2t2"
+        biblio.save(path)
+        path.write_bytes(path.read_bytes()[:-20])
+
+        with pytest.raises(SnapshotError):
+            Biblio().load(path)
+
+    @pytest.mark.parametrize("content", [b"", b"R2T2", b"# references\n"])
+    def test_should_fail_on_other_files(self, content, temp_dir):
+        path = temp_dir / "refs.r2t2"
+        path.write_bytes(content)
+
+        with pytest.raises(SnapshotError):
+            Biblio().load(path)
+
+
+class TestShards:
+    def test_should_split_files_in_disjoint_shards(self, temp_dir):
+        write_tree(temp_dir, 30)
+        filenames = sorted(temp_dir.rglob("*.py"))
+
+        shards = [select_shard(filenames, temp_dir, i, 4) for i in range(1, 5)]
+
+        assert sorted(f for shard in shards for f in shard) == filenames
+        assert sum(len(shard) for shard in shards) == len(filenames)
+        assert shards == [select_shard(filenames, temp_dir, i, 4) for i in range(1, 5)]
+
+    def test_should_merge_shards_in_the_order_of_a_single_scan(
+        self, bibliography, temp_dir
+    ):
+        write_tree(temp_dir, 30)
+        locate_references(temp_dir)
+        expected = list(bibliography.items())
+
+        for i in range(1, 4):
+            bibliography.clear()
+            locate_references(temp_dir, shard=(i, 3))
+            bibliography.save(temp_dir / f"shard_{i}.r2t2")
+        merged = Biblio()
+        merge_snapshots([temp_dir / f"shard_{i}.r2t2" for i in range(1, 4)], merged)
+
+        assert list(merged.items()) == expected
+
+    def test_should_merge_shards_from_the_command_line(
+        self, bibliography, temp_dir, capsys
+    ):
+        write_tree(temp_dir, 10)
+        tree = temp_dir / "tree"
+        tree.mkdir()
+        for package in temp_dir.glob("package_*"):
+            package.rename(tree / package.name)
+        for i in (1, 2):
+            main([
+                "static",
+                f"--shard={i}/2",
+                "--format=snapshot",
+                f"--output={temp_dir / f'shard_{i}'}",
+                str(tree),
+            ])
+            bibliography.clear()
+
+        main([
+            "merge",
+            "--format=markdown",
+            f"--output={temp_dir / 'references'}",
+            str(temp_dir / "shard_1.r2t2"),
+            str(temp_dir / "shard_2.r2t2"),
+        ])
+
+        assert len(bibliography) == 10
+        text = (temp_dir / "references.md").read_text()
+        assert all(f"Reference {i}" in text for i in range(10))
+
+    @pytest.mark.parametrize("value", ["0/2", "3/2", "1", "a/b"])
+    def test_should_reject_invalid_shards(self, value):
+        with pytest.raises(SystemExit):
+            main(["static", f"--shard={value}", "docs/examples"])
@@ -1,11 +1,16 @@
+import shutil
 from pathlib import Path
 
-from r2t2.static_parser import locate_references
+import pytest
+
+from r2t2.core import Biblio
+from r2t2.static_parser import IncrementalScan, locate_references
 
 
 HERE = Path(__file__).parent
 FIXTURES = HERE / "fixtures"
 SAMPLE_PATH = FIXTURES / "sample_code.py"
+NOTEBOOK_PATH = FIXTURES / "notebook_doi.ipynb"
 
 
 class TestLocateReferences:
@@ -20,3 +25,111 @@ class TestLocateReferences:
     def test_globs_for_folder(self, bib_with_tracking):
         locate_references(FIXTURES)
         assert "Great British Roasts, 2019" in bib_with_tracking.references
+
+    def test_shares_records_with_runtime_tracking(self, bib_with_tracking):
+        from tests.fixtures.sample_code import sample_function_1
+
+        locate_references(SAMPLE_PATH)
+        sample_function_1()
+
+        assert len(bib_with_tracking) == 1
+        assert bib_with_tracking.references == ["Great British Roasts, 2019"]
+        record = next(iter(bib_with_tracking.values()))
+        assert record.line == 7
+
+    def test_same_order_with_several_jobs(self, bibliography, temp_dir):
+        for i in range(6):
+            (temp_dir / f"module_{i}.py").write_text(
+                "from r2t2 import add_reference\n\n\n"
+                f'@add_reference(short_purpose="p", reference="Reference {i}")\n'
+                f"def function_{i}():\n"
+                "    pass\n"
+            )
+
+        locate_references(temp_dir, jobs=3)
+
+        assert bibliography.references == [f"Reference {i}" for i in range(6)]
+
+    def test_finds_notebooks_in_folder(self, bibliography, temp_dir):
+        for folder in ["a", "b", "b/.ipynb_checkpoints"]:
+            (temp_dir / folder).mkdir()
+            shutil.copy(NOTEBOOK_PATH, temp_dir / folder / "notebook.ipynb")
+        shutil.copy(SAMPLE_PATH, temp_dir / "a")
+
+        locate_references(temp_dir, jobs=2, notebook=True)
+
+        assert [(r.source, r.name, r.line) for r in bibliography.values()] == [
+            (str(temp_dir / folder / "notebook.ipynb"), name, None)
+            for folder in ["a", "b"]
+            for name in ["cell_0", "cell_4"]
+        ]
+
+
+def write_module(path, index, line=1):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        "from r2t2 import add_reference\n" + "\n" * line
+        + f'@add_reference(short_purpose="p", reference="Reference {index}")\n'
+        f"def function_{index}():\n"
+        f'    """See 10.5281/zenodo.{index:07d} too."""\n'
+    )
+
+
+class TestIncrementalScan:
+    @pytest.fixture
+    def tree(self, temp_dir):
+        for i in range(6):
+            write_module(temp_dir / f"package_{i % 2}" / f"module_{i}.py", i)
+        return temp_dir
+
+    def full_scan(self, tree, bibliography):
+        bibliography.clear()
+        locate_references(tree, docstring=True)
+        return list(bibliography.items()), bibliography.references
+
+    def test_should_scan_like_locate_references(self, bibliography, tree):
+        expected = self.full_scan(tree, bibliography)
+        biblio = Biblio()
+
+        analysed = IncrementalScan(tree, docstring=True, biblio=biblio).scan()
+
+        assert (list(biblio.items()), biblio.references) == expected
+        assert len(analysed) == 6
+
+    def test_should_update_like_a_full_scan(self, bibliography, tree):
+        biblio = Biblio()
+        scan = IncrementalScan(tree, docstring=True, biblio=biblio)
+        scan.scan()
+
+        moved = tree / "package_0" / "module_2.py"
+        write_module(moved, 20, line=5)
+        removed = tree / "package_1" / "module_3.py"
+        removed.unlink()
+        created = tree / "package_0" / "module_10.py"
+        write_module(created, 10)
+        updated = scan.update([moved, removed, created])
+
+        assert sorted(updated) == sorted([moved, removed, created])
+        assert (list(biblio.items()), biblio.references) == self.full_scan(
+            tree, bibliography
+        )
+
+    def test_should_remove_records_of_removed_folder(self, bibliography, tree):
+        biblio = Biblio()
+        scan = IncrementalScan(tree, biblio=biblio)
+        scan.scan()
+
+        shutil.rmtree(tree / "package_1")
+        updated = scan.update([tree / "package_1"])
+
+        assert len(updated) == 3
+        assert biblio.references == [f"Reference {i}" for i in (0, 2, 4)]
+
+    def test_should_ignore_files_of_other_shards(self, bibliography, tree):
+        biblio = Biblio()
+        scan = IncrementalScan(tree, shard=(1, 2), biblio=biblio)
+        analysed = scan.scan()
+        others = [f for f in tree.rglob("*.py") if f not in analysed]
+
+        assert scan.update(others) == []
+        assert len(biblio) == len(analysed)
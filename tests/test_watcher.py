@@ -0,0 +1,137 @@
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from r2t2.watcher import InotifyWatcher, PollingWatcher
+
+
+WATCHERS = [
+    pytest.param(lambda target: PollingWatcher(target, interval=0.01), id="polling"),
+    pytest.param(
+        InotifyWatcher,
+        id="inotify",
+        marks=pytest.mark.skipif(
+            not sys.platform.startswith("linux"), reason="inotify is Linux only"
+        ),
+    ),
+]
+
+
+def later(func, delay=0.05):
+    timer = threading.Timer(delay, func)
+    timer.start()
+    return timer
+
+
+@pytest.fixture
+def tree(temp_dir):
+    (temp_dir / "package").mkdir()
+    (temp_dir / "package" / "module.py").write_text("x = 1\n")
+    (temp_dir / "README.md").write_text("readme\n")
+    return temp_dir
+
+
+@pytest.mark.parametrize("create", WATCHERS)
+class TestWatchers:
+    def test_should_report_changed_file(self, create, tree):
+        watcher = create(tree)
+        module = tree / "package" / "module.py"
+        # a different size, as the modification time may not change that fast
+        later(lambda: module.write_text("x = 12\n"))
+
+        assert watcher.wait(timeout=5) == {module.absolute()}
+        watcher.close()
+
+    def test_should_report_created_and_removed_files(self, create, tree):
+        watcher = create(tree)
+        created = tree / "package" / "new.py"
+        module = tree / "package" / "module.py"
+
+        def change():
+            created.write_text("y = 2\n")
+            module.unlink()
+
+        later(change)
+        changed = watcher.wait(timeout=5)
+        while len(changed) < 2:
+            changed |= watcher.wait(timeout=1)
+
+        assert changed == {created.absolute(), module.absolute()}
+        watcher.close()
+
+    def test_should_ignore_other_files(self, create, tree):
+        watcher = create(tree)
+        later(lambda: (tree / "README.md").write_text("changed readme\n"))
+
+        start = time.monotonic()
+        assert watcher.wait(timeout=0.3) == set()
+        assert time.monotonic() - start >= 0.3
+        watcher.close()
+
+    def test_should_watch_a_single_file(self, create, tree):
+        module = tree / "package" / "module.py"
+        watcher = create(module)
+
+        def change():
+            (tree / "package" / "other.py").write_text("z = 3\n")
+            module.write_text("x = 123\n")
+
+        later(change)
+        changed = watcher.wait(timeout=5)
+
+        assert changed == {module.absolute()}
+        watcher.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only")
+def test_should_watch_new_folders(tree):
+    watcher = InotifyWatcher(tree)
+    folder = tree / "package" / "sub"
+
+    def create():
+        folder.mkdir()
+        (folder / "module.py").write_text("x = 1\n")
+
+    later(create)
+    changed = watcher.wait(timeout=5)
+    if not changed:
+        changed = watcher.wait(timeout=1)
+    assert folder.absolute() / "module.py" in changed
+    # the files created later in the new folder are reported too
+    later(lambda: (folder / "module.py").write_text("x = 12\n"))
+    assert watcher.wait(timeout=5) == {folder.absolute() / "module.py"}
+    watcher.close()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses SIGINT")
+def test_should_write_output_again_when_files_change(tree):
+    output = tree / "references.md"
+    module = tree / "package" / "module.py"
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "r2t2", "static", "--watch", "--docstring",
+            "--format=markdown", f"--output={output}", str(tree),
+        ],
+        cwd=Path(__file__).parent.parent,
+    )
+    try:
+        wait_for(output.exists)
+        assert "10.5281" not in output.read_text()
+
+        module.write_text('def f():\n    """See 10.5281/zenodo.1185316."""\n')
+        wait_for(lambda: "10.5281/zenodo.1185316" in output.read_text())
+    finally:
+        process.send_signal(signal.SIGINT)
+        assert process.wait(timeout=10) == 0
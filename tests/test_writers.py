@@ -1,3 +1,6 @@
+import os
+
+
 def test_register_writer():
     from r2t2.writers import register_writer, REGISTERED_WRITERS
 
@@ -6,3 +9,139 @@ def test_register_writer():
         pass
 
     assert REGISTERED_WRITERS["test"] is test_writer
+
+
+def test_terminal_streams_the_report(capsys, bibliography):
+    from r2t2.core import FunctionReference
+    from r2t2.writers import terminal
+
+    bibliography.add(FunctionReference("f", 3, "a.py", ["p"], ["Reference 1"]))
+    bibliography.add(FunctionReference("g", None, "b.py", ["p"], ["Reference 2"]))
+
+    terminal("unused")
+
+    assert capsys.readouterr().out == str(bibliography) + "\n"
+    assert str(bibliography) == "".join(
+        [
+            "Referenced in: f\nSource file: a.py\nLine: 3\n\t[1] p - Reference 1\n\n",
+            "Referenced in: g\nSource file: b.py\n\t[1] p - Reference 2\n\n",
+        ]
+    )
+
+
+def test_markdown_writes_one_entry_per_record(bibliography, temp_dir):
+    from r2t2.core import FunctionReference
+    from r2t2.writers import markdown
+
+    source = temp_dir / "src" / "a.py"
+    bibliography.add(
+        FunctionReference("f", 3, str(source), ["p1", "p2"], ["Ref 1", "Ref 2"])
+    )
+
+    markdown(temp_dir / "references")
+
+    relative = os.path.join("src", "a.py")
+    assert (temp_dir / "references.md").read_text() == (
+        "Referenced in: f  \n"
+        f"Source: [{relative}]({relative}:3)  \n"
+        "Line: 3\n\n"
+        "\t[1] p1 - Ref 1  \n"
+        "\t[2] p2 - Ref 2  \n"
+    )
+
+
+def test_markdown_shows_the_timings(bibliography, temp_dir, decorated_function):
+    from r2t2.writers import markdown
+
+    bibliography.tracking()
+    bibliography.profile()
+    try:
+        decorated_function()
+        decorated_function()
+    finally:
+        bibliography.tracking(False)
+        bibliography.profile(False)
+
+    markdown(temp_dir / "references")
+
+    text = (temp_dir / "references.md").read_text()
+    assert "\nCalls: 2, wall time: " in text
+    assert text.endswith(" s\n")
+    assert "\nOverhead of r2t2: " in text
+
+
+def test_jsonl_writes_a_line_per_record_of_the_given_bibliography(temp_dir):
+    import json
+    from r2t2.core import Biblio, FunctionReference
+    from r2t2.writers import jsonl
+
+    biblio = Biblio()
+    biblio.add(
+        FunctionReference("f", 3, str(temp_dir / "a.py"), ["p1", "p2"], ["R1", "R2"])
+    )
+    biblio.add(FunctionReference("cell_0", None, str(temp_dir / "n.ipynb"), [], []))
+    biblio.describe("R2", "Smith (2001). Title")
+
+    jsonl(temp_dir / "references", biblio)
+
+    lines = (temp_dir / "references.jsonl").read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {
+            "identifier": next(iter(biblio)),
+            "name": "f",
+            "source": "a.py",
+            "line": 3,
+            "references": [
+                {"short_purpose": "p1", "reference": "R1", "citation": None},
+                {
+                    "short_purpose": "p2",
+                    "reference": "R2",
+                    "citation": "Smith (2001). Title",
+                },
+            ],
+        },
+        {
+            "identifier": list(biblio)[1],
+            "name": "cell_0",
+            "source": "n.ipynb",
+            "line": None,
+            "references": [],
+        },
+    ]
+
+
+def test_csv_writes_a_row_per_reference(bibliography, temp_dir, decorated_function):
+    import csv
+    from r2t2.writers import CSV_COLUMNS, csv_table
+
+    bibliography.tracking()
+    bibliography.profile()
+    try:
+        decorated_function()
+    finally:
+        bibliography.tracking(False)
+        bibliography.profile(False)
+
+    csv_table(temp_dir / "references.csv", bibliography)
+
+    with open(temp_dir / "references.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == CSV_COLUMNS
+    assert len(rows) == 1
+    assert rows[0]["name"] == "roasted_chicken"
+    assert rows[0]["reference"] == "Great British Roasts, 2019"
+    assert rows[0]["citation"] == ""
+    assert rows[0]["calls"] == "1"
+    assert float(rows[0]["wall_time"]) >= 0
+    assert float(rows[0]["cpu_time"]) >= 0
+
+
+def test_relative_paths_are_computed_once_per_source(temp_dir):
+    from unittest import mock
+    from r2t2.writers import relative_paths
+
+    relative = relative_paths(temp_dir)
+    with mock.patch("os.path.relpath", wraps=os.path.relpath) as relpath:
+        assert relative(str(temp_dir / "a.py")) == "a.py"
+        assert relative(str(temp_dir / "a.py")) == "a.py"
+    assert relpath.call_count == 1